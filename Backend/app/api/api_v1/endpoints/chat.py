@@ -2,10 +2,15 @@
 Chat Endpoints
 RAG-based chat with documents using MongoDB
 """
-from fastapi import APIRouter, Depends
+import json
+import logging
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.api.api_v1.endpoints.auth import get_current_user
-from app.services.rag_service import RAGService
+from app.services.rag_service import RAGService, get_rag_service
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -13,15 +18,15 @@ router = APIRouter()
 @router.post("/", response_model=ChatResponse)
 async def chat(
     chat_request: ChatRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service)
 ):
     """Chat with documents using RAG"""
-    rag_service = RAGService()
-    
     answer, source_documents = await rag_service.chat(
         query=chat_request.query,
         document_id=chat_request.document_id,
-        use_company_policy=chat_request.use_company_policy
+        use_company_policy=chat_request.use_company_policy,
+        user_id=str(current_user["_id"])
     )
     
     return ChatResponse(
@@ -29,3 +34,35 @@ async def chat(
         source_documents=source_documents,
         return_source_documents=True
     )
+
+
+@router.post("/stream")
+async def chat_stream(
+    chat_request: ChatRequest,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service)
+):
+    """Chat with documents using RAG, streaming tokens as Server-Sent Events"""
+    async def event_stream():
+        events = rag_service.chat_stream(
+            query=chat_request.query,
+            document_id=chat_request.document_id,
+            use_company_policy=chat_request.use_company_policy,
+            user_id=str(current_user["_id"])
+        )
+        try:
+            async for event, data in events:
+                if await request.is_disconnected():
+                    logger.info("Client disconnected, aborting the stream")
+                    break
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # Closing the generator aborts the in-flight LLM request
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
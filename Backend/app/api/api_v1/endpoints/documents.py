@@ -2,20 +2,42 @@
 Document Management Endpoints
 Upload and manage documents for RAG using MongoDB
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
-from typing import List
+import logging
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
 from app.db.session import get_database
 from app.api.api_v1.endpoints.auth import get_current_user
-from app.services.rag_service import RAGService
+from app.services.corpus_state import corpus_state
+from app.core.config import settings
+from app.services.job_queue import job_queue, job_status, UploadTooLarge, PROCESS, UPDATE
+from app.services.rag_service import RAGService, get_rag_service
+from app.services.vector_reconciler import vector_reconciler
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+async def store_upload(file: UploadFile):
+    """Stream the upload into GridFS for the worker, enforcing MAX_UPLOAD_BYTES"""
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File too large (max {settings.MAX_UPLOAD_BYTES // (1024 * 1024)} MB)"
+    )
+    if file.size is not None and file.size > settings.MAX_UPLOAD_BYTES:
+        raise too_large
+    try:
+        return await job_queue.store_upload(file.filename, file, settings.MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        raise too_large
+    finally:
+        await file.close()
+
+
 @router.post("/upload")
 async def upload_document(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     is_company_policy: bool = False,
     current_user: dict = Depends(get_current_user)
@@ -27,8 +49,8 @@ async def upload_document(
     if f'.{file_extension}' not in allowed_extensions:
         raise HTTPException(status_code=400, detail="Unsupported file type")
     
-    # Read file content
-    content = await file.read()
+    # Stream file content to GridFS (never held in memory whole)
+    file_id, file_size = await store_upload(file)
     
     # Create document record in MongoDB
     db = get_database()
@@ -36,33 +58,34 @@ async def upload_document(
         "filename": file.filename,
         "original_filename": file.filename,
         "file_type": file_extension,
-        "file_size": len(content),
+        "file_size": file_size,
         "is_company_policy": is_company_policy,
         "uploaded_by": str(current_user["_id"]),
         "status": "processing",
         "created_at": datetime.utcnow(),
         "updated_at": None
     }
-    result = await db.documents.insert_one(document)
+    try:
+        result = await db.documents.insert_one(document)
+    except Exception:
+        await job_queue.discard_upload(file_id)
+        raise
     document_id = str(result.inserted_id)
     
-    # Process document in background
-    async def process_doc():
-        rag_service = RAGService()
-        success = await rag_service.process_document(
-            content, 
-            file.filename, 
-            document_id,
-            is_company_policy
+    # Queue document for the ingestion worker (python -m app.worker)
+    try:
+        job_id = await job_queue.enqueue(
+            PROCESS, document_id, file.filename, file_id, is_company_policy, document["uploaded_by"]
         )
-        await db.documents.update_one(
-            {"_id": ObjectId(document_id)},
-            {"$set": {"status": "completed" if success else "failed", "updated_at": datetime.utcnow()}}
-        )
-    
-    background_tasks.add_task(process_doc)
+    except Exception:
+        # Nothing would ever process it: drop the record and the stored file
+        logger.exception("Could not queue document %s", document_id)
+        await db.documents.delete_one({"_id": result.inserted_id})
+        await job_queue.discard_upload(file_id)
+        raise
     
     document["id"] = document_id
+    document["job_id"] = job_id
     document.pop("_id", None)
     return document
 
@@ -100,10 +123,110 @@ async def get_document(
     return document
 
 
+@router.get("/{document_id}/status")
+async def get_document_status(
+    document_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get processing status and progress of a document and its latest ingestion job"""
+    db = get_database()
+    document = await db.documents.find_one({"_id": ObjectId(document_id)})
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    job = await job_queue.latest_for_document(document_id)
+    return {
+        "id": document_id,
+        "status": document.get("status"),
+        "chunks_done": document.get("chunks_done"),
+        "chunks_total": document.get("chunks_total"),
+        "job": job_status(job) if job else None
+    }
+
+
+@router.put("/{document_id}")
+async def update_document(
+    document_id: str,
+    file: UploadFile = File(...),
+    is_company_policy: Optional[bool] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Upload a new version of a document, re-indexing only changed chunks"""
+    allowed_extensions = ['.pdf', '.docx', '.doc', '.txt']
+    file_extension = file.filename.split('.')[-1].lower()
+    if f'.{file_extension}' not in allowed_extensions:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+    
+    db = get_database()
+    document = await db.documents.find_one({"_id": ObjectId(document_id)})
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    # One version at a time: a second job would race the one still indexing
+    busy = {
+        "processing": HTTPException(status_code=409, detail="Document is still being processed"),
+        "deleting": HTTPException(status_code=409, detail="Document is being deleted")
+    }
+    if document.get("status") in busy:
+        raise busy[document["status"]]
+    
+    if is_company_policy is None:
+        is_company_policy = document.get("is_company_policy", False)
+    metadata_changed = (
+        file.filename != document.get("filename")
+        or is_company_policy != document.get("is_company_policy", False)
+    )
+    
+    # Stream file content to GridFS (never held in memory whole)
+    file_id, file_size = await store_upload(file)
+    
+    update = {
+        "filename": file.filename,
+        "file_type": file_extension,
+        "file_size": file_size,
+        "is_company_policy": is_company_policy,
+        "status": "processing",
+        "chunks_done": 0,
+        "updated_at": datetime.utcnow()
+    }
+    # Claimed atomically, so two concurrent PUTs cannot both queue a job
+    claimed = await db.documents.find_one_and_update(
+        {"_id": ObjectId(document_id), "status": {"$nin": list(busy)}},
+        {"$set": update}
+    )
+    if claimed is None:
+        await job_queue.discard_upload(file_id)
+        current = await db.documents.find_one({"_id": ObjectId(document_id)}, {"status": 1})
+        if current is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        raise busy.get(current.get("status"), busy["processing"])
+    
+    # Queue re-indexing for the ingestion worker
+    try:
+        job_id = await job_queue.enqueue(
+            UPDATE, document_id, file.filename, file_id, is_company_policy,
+            document.get("uploaded_by"), metadata_changed
+        )
+    except Exception:
+        # Nothing would ever process it: fail the version and drop the stored file
+        logger.exception("Could not queue re-indexing of document %s", document_id)
+        await db.documents.update_one(
+            {"_id": ObjectId(document_id)},
+            {"$set": {"status": "failed", "error": "Could not queue re-indexing", "updated_at": datetime.utcnow()}}
+        )
+        await job_queue.discard_upload(file_id)
+        raise
+    
+    document.update(update)
+    document["id"] = str(document.pop("_id"))
+    document["job_id"] = job_id
+    return document
+
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service)
 ):
     """Delete a document"""
     db = get_database()
@@ -111,11 +234,29 @@ async def delete_document(
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Delete embeddings from MongoDB vector store
-    rag_service = RAGService()
-    await rag_service.delete_document_embeddings(document_id)
+    # Mark the record first: a running job will not complete it, and the
+    # reconciler finishes the delete if this request fails part way
+    await db.documents.update_one(
+        {"_id": ObjectId(document_id)},
+        {"$set": {"status": "deleting", "updated_at": datetime.utcnow()}}
+    )
+    await job_queue.cancel_for_document(document_id)
     
-    # Delete document record
+    # Delete embeddings from PGVector store (one indexed transaction)
+    try:
+        chunks_deleted = await rag_service.delete_document_embeddings(document_id, document.get("uploaded_by"))
+    except Exception:
+        logger.exception("Error deleting embeddings of document %s", document_id)
+        raise HTTPException(status_code=503, detail="Could not delete document embeddings, it will be retried")
+    await corpus_state.bump()
+    
+    # Delete document record only once its chunks are gone
     await db.documents.delete_one({"_id": ObjectId(document_id)})
     
-    return {"message": "Document deleted successfully"}
+    return {"message": "Document deleted successfully", "chunks_deleted": chunks_deleted}
+
+
+@router.get("/maintenance/reconciler")
+async def get_reconciler_stats(current_user: dict = Depends(get_current_user)):
+    """Counters of the vector reconciler (rows reclaimed, documents failed or deleted) and its last run"""
+    return await vector_reconciler.stats()
@@ -8,6 +8,8 @@ from app.db.session import get_database
 from app.api.api_v1.endpoints.auth import get_current_user
 from app.core.config import settings as app_settings
 from app.schemas.settings import RAGSettingsUpdate, RAGSettingsResponse
+from app.services.rag_service import RAGService, get_rag_service
+from app.services.settings_cache import rag_settings_cache
 
 router = APIRouter()
 
@@ -27,6 +29,14 @@ async def get_settings(current_user: dict = Depends(get_current_user)):
             "top_p": app_settings.TOP_P,
             "top_k": app_settings.TOP_K,
             "model_name": app_settings.MODEL_NAME,
+            "search_type": app_settings.SEARCH_TYPE,
+            "hybrid_fetch_k": app_settings.HYBRID_FETCH_K,
+            "rrf_k": app_settings.RRF_K,
+            "hnsw_ef_search": app_settings.HNSW_EF_SEARCH,
+            "ivfflat_probes": app_settings.IVFFLAT_PROBES,
+            "rerank_enabled": app_settings.RERANK_ENABLED,
+            "rerank_fetch_k": app_settings.RERANK_FETCH_K,
+            "rerank_min_score": app_settings.RERANK_MIN_SCORE,
             "created_at": datetime.utcnow()
         }
         result = await db.rag_settings.insert_one(rag_settings)
@@ -40,18 +50,29 @@ async def get_settings(current_user: dict = Depends(get_current_user)):
         "temperature": rag_settings.get("temperature", app_settings.TEMPERATURE),
         "top_p": rag_settings.get("top_p", app_settings.TOP_P),
         "top_k": rag_settings.get("top_k", app_settings.TOP_K),
-        "model_name": rag_settings.get("model_name", app_settings.MODEL_NAME)
+        "model_name": rag_settings.get("model_name", app_settings.MODEL_NAME),
+        "search_type": rag_settings.get("search_type", app_settings.SEARCH_TYPE),
+        "hybrid_fetch_k": rag_settings.get("hybrid_fetch_k", app_settings.HYBRID_FETCH_K),
+        "rrf_k": rag_settings.get("rrf_k", app_settings.RRF_K),
+        "hnsw_ef_search": rag_settings.get("hnsw_ef_search", app_settings.HNSW_EF_SEARCH),
+        "ivfflat_probes": rag_settings.get("ivfflat_probes", app_settings.IVFFLAT_PROBES),
+        "rerank_enabled": rag_settings.get("rerank_enabled", app_settings.RERANK_ENABLED),
+        "rerank_fetch_k": rag_settings.get("rerank_fetch_k", app_settings.RERANK_FETCH_K),
+        "rerank_min_score": rag_settings.get("rerank_min_score", app_settings.RERANK_MIN_SCORE)
     }
 
 
 @router.put("/")
 async def update_settings(
     settings_update: RAGSettingsUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service)
 ):
     """Update RAG settings in database"""
     if not current_user.get("is_superuser", False):
         raise HTTPException(status_code=403, detail="Only superusers can update settings")
+    if settings_update.rerank_enabled and not rag_service.reranker.available:
+        raise HTTPException(status_code=400, detail="Reranking needs the fastembed package installed on the server")
     
     db = get_database()
     rag_settings = await db.rag_settings.find_one()
@@ -65,6 +86,14 @@ async def update_settings(
             "top_p": app_settings.TOP_P,
             "top_k": app_settings.TOP_K,
             "model_name": app_settings.MODEL_NAME,
+            "search_type": app_settings.SEARCH_TYPE,
+            "hybrid_fetch_k": app_settings.HYBRID_FETCH_K,
+            "rrf_k": app_settings.RRF_K,
+            "hnsw_ef_search": app_settings.HNSW_EF_SEARCH,
+            "ivfflat_probes": app_settings.IVFFLAT_PROBES,
+            "rerank_enabled": app_settings.RERANK_ENABLED,
+            "rerank_fetch_k": app_settings.RERANK_FETCH_K,
+            "rerank_min_score": app_settings.RERANK_MIN_SCORE,
             "created_at": datetime.utcnow()
         }
         result = await db.rag_settings.insert_one(rag_settings)
@@ -84,16 +113,34 @@ async def update_settings(
         update_data["top_k"] = settings_update.top_k
     if settings_update.model_name is not None:
         update_data["model_name"] = settings_update.model_name
+    if settings_update.search_type is not None:
+        update_data["search_type"] = settings_update.search_type
+    if settings_update.hybrid_fetch_k is not None:
+        update_data["hybrid_fetch_k"] = settings_update.hybrid_fetch_k
+    if settings_update.rrf_k is not None:
+        update_data["rrf_k"] = settings_update.rrf_k
+    if settings_update.hnsw_ef_search is not None:
+        update_data["hnsw_ef_search"] = settings_update.hnsw_ef_search
+    if settings_update.ivfflat_probes is not None:
+        update_data["ivfflat_probes"] = settings_update.ivfflat_probes
+    if settings_update.rerank_enabled is not None:
+        update_data["rerank_enabled"] = settings_update.rerank_enabled
+    if settings_update.rerank_fetch_k is not None:
+        update_data["rerank_fetch_k"] = settings_update.rerank_fetch_k
+    if settings_update.rerank_min_score is not None:
+        update_data["rerank_min_score"] = settings_update.rerank_min_score
     
     update_data["updated_at"] = datetime.utcnow()
     
+    # Bump the version so cached copies in every worker are replaced
     await db.rag_settings.update_one(
         {"_id": rag_settings["_id"]},
-        {"$set": update_data}
+        {"$set": update_data, "$inc": {"version": 1}}
     )
     
     # Get and return updated settings
     updated = await db.rag_settings.find_one({"_id": rag_settings["_id"]})
+    rag_settings_cache.update(updated)
     return {
         "id": str(updated["_id"]),
         "chunk_size": updated.get("chunk_size", app_settings.CHUNK_SIZE),
@@ -101,5 +148,13 @@ async def update_settings(
         "temperature": updated.get("temperature", app_settings.TEMPERATURE),
         "top_p": updated.get("top_p", app_settings.TOP_P),
         "top_k": updated.get("top_k", app_settings.TOP_K),
-        "model_name": updated.get("model_name", app_settings.MODEL_NAME)
+        "model_name": updated.get("model_name", app_settings.MODEL_NAME),
+        "search_type": updated.get("search_type", app_settings.SEARCH_TYPE),
+        "hybrid_fetch_k": updated.get("hybrid_fetch_k", app_settings.HYBRID_FETCH_K),
+        "rrf_k": updated.get("rrf_k", app_settings.RRF_K),
+        "hnsw_ef_search": updated.get("hnsw_ef_search", app_settings.HNSW_EF_SEARCH),
+        "ivfflat_probes": updated.get("ivfflat_probes", app_settings.IVFFLAT_PROBES),
+        "rerank_enabled": updated.get("rerank_enabled", app_settings.RERANK_ENABLED),
+        "rerank_fetch_k": updated.get("rerank_fetch_k", app_settings.RERANK_FETCH_K),
+        "rerank_min_score": updated.get("rerank_min_score", app_settings.RERANK_MIN_SCORE)
     }
@@ -0,0 +1,158 @@
+"""
+Logging
+Structured (JSON or text) logs written by a background thread, with the request ID
+and per-request stage timings (spans) carried in context variables
+"""
+import atexit
+import json
+import logging
+import queue
+import re
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterator, Optional
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+# Client-supplied request IDs are used only if they look like one (no log injection)
+_REQUEST_ID_PATTERN = re.compile(r"[\w.:-]{1,128}")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_trace_var: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+_listener: Optional[QueueListener] = None
+
+
+class RequestTrace:
+    """Seconds spent per stage of one request; stages run more than once add up"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 2)
+
+    def spans_ms(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000, 2) for name, seconds in self.spans.items()}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[RequestTrace]:
+    """
+    Run the block as one request: its logs carry request_id (a new one if
+    missing or malformed) and its spans go to the yielded trace
+    """
+    if not request_id or not _REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = new_request_id()
+    trace = RequestTrace(request_id)
+    id_token = request_id_var.set(trace.request_id)
+    trace_token = _trace_var.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace_var.reset(trace_token)
+        request_id_var.reset(id_token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _trace_var.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the block as stage name of the current request (a no-op outside one)"""
+    trace = _trace_var.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - start)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the request ID in the caller's context, before they are queued"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per line, or a plain line with key=value fields"""
+
+    def __init__(self, json_lines: bool = True):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+        timestamp = datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+        request_id = getattr(record, "request_id", None)
+        if self.json_lines:
+            entry = {
+                "time": timestamp,
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage()
+            }
+            if request_id:
+                entry["request_id"] = request_id
+            entry.update(fields)
+            return json.dumps(entry, default=str)
+        line = f"{timestamp} {record.levelname:<7} {record.name}"
+        if request_id:
+            line += f" [{request_id}]"
+        line += f" {record.getMessage()}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def setup_logging(level: str = "INFO", log_format: str = "json"):
+    """
+    Route all logging through a queue to a stdout handler on a background
+    thread, so a log call only formats the message and enqueues it. Records
+    below level are dropped before their message is formatted. Idempotent.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(StructuredFormatter(json_lines=log_format != "text"))
+    handler = QueueHandler(records)
+    handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+    # Per-request HTTP client lines only when debugging
+    if root.level > logging.DEBUG:
+        for name in ("httpx", "httpcore", "openai"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+    _listener = QueueListener(records, stream)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the logging thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,168 @@
+"""
+Metrics
+Prometheus metrics: chat stage latencies, ingestion throughput, cache hit counters,
+connection pool usage and LLM token counts
+"""
+from typing import Any, Callable, Dict, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+INGEST_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+CHAT_SECONDS = Histogram(
+    "rag_chat_duration_seconds",
+    "End-to-end RAGService chat time",
+    ["mode", "cached"],
+    buckets=LATENCY_BUCKETS
+)
+CHAT_STAGE_SECONDS = Histogram(
+    "rag_chat_stage_seconds",
+    "Time per chat stage (settings, embed, search, retrieve, rerank, pack, llm)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+CHAT_ERRORS = Counter("rag_chat_errors", "Chats that failed", ["mode"])
+CHAT_COALESCED = Counter(
+    "rag_chat_coalesced", "Chats that shared the answer of an identical in-flight chat", ["mode"]
+)
+INGEST_SECONDS = Histogram(
+    "rag_ingest_duration_seconds",
+    "Time to parse, embed and store one document",
+    ["job_type"],
+    buckets=INGEST_BUCKETS
+)
+INGEST_DOCUMENTS = Counter("rag_ingest_documents", "Documents ingested", ["job_type", "outcome"])
+INGEST_PAGES = Counter("rag_ingest_pages", "Pages (or sections) parsed")
+INGEST_CHUNKS = Counter("rag_ingest_chunks", "Chunks split from ingested documents", ["job_type"])
+INGEST_CHUNKS_EMBEDDED = Counter("rag_ingest_chunks_embedded", "Chunks embedded and stored")
+LLM_TOKENS = Counter("rag_llm_tokens", "LLM tokens used", ["model_name", "kind"])
+
+
+def observe_chat(mode: str, cached: bool, seconds: float, spans: Optional[Dict[str, float]]):
+    CHAT_SECONDS.labels(mode, "true" if cached else "false").observe(seconds)
+    for stage, stage_seconds in (spans or {}).items():
+        CHAT_STAGE_SECONDS.labels(stage).observe(stage_seconds)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Counts prompt and completion tokens the LLM reports, by model_name"""
+
+    run_inline = True
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.labels(self.model_name, "prompt").inc(usage.get("input_tokens", 0))
+                    LLM_TOKENS.labels(self.model_name, "completion").inc(usage.get("output_tokens", 0))
+
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """Open and checked-out MongoDB connections, from the driver's pool events"""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.wait_failures = 0
+
+    def connection_created(self, event):
+        self.open += 1
+
+    def connection_closed(self, event):
+        self.open -= 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def connection_check_out_failed(self, event):
+        self.wait_failures += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+mongo_pool_monitor = MongoPoolMonitor()
+
+
+class RAGServiceCollector:
+    """
+    Read at scrape time from counters the services already keep: embedding
+    and answer cache hits and misses, Postgres pool usage (SQLAlchemy) and
+    MongoDB pool usage (mongo_pool_monitor)
+    """
+
+    def __init__(self, get_service: Callable[[], Any]):
+        self.get_service = get_service
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        hits = CounterMetricFamily("rag_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("rag_cache_misses", "Cache misses", labels=["cache"])
+        service = self.get_service()
+        if service is not None:
+            embeddings = service.embeddings
+            tiers = [("query_memory", embeddings.cache), ("query_mongo", embeddings.store),
+                     ("chunk_embedding", embeddings.document_store), ("answer", service.answer_cache)]
+            for cache, tier in tiers:
+                if tier is not None:
+                    hits.add_metric([cache], tier.hits)
+                    misses.add_metric([cache], tier.misses)
+        yield hits
+        yield misses
+
+        if service is not None and service.engine is not None:
+            pool = service.engine.pool
+            pg = GaugeMetricFamily("rag_pg_pool_connections", "Postgres pool connections", labels=["state"])
+            pg.add_metric(["checked_out"], pool.checkedout())
+            pg.add_metric(["idle"], pool.checkedin())
+            pg.add_metric(["overflow"], max(pool.overflow(), 0))
+            yield pg
+            yield GaugeMetricFamily("rag_pg_pool_size", "Postgres pool size (without overflow)", value=pool.size())
+
+        mongo = GaugeMetricFamily("rag_mongo_pool_connections", "MongoDB pool connections", labels=["state"])
+        mongo.add_metric(["open"], mongo_pool_monitor.open)
+        mongo.add_metric(["checked_out"], mongo_pool_monitor.checked_out)
+        yield mongo
+        yield CounterMetricFamily(
+            "rag_mongo_pool_checkout_failures", "MongoDB connection check-outs that failed or timed out",
+            value=mongo_pool_monitor.wait_failures
+        )
+
+
+_collector: Optional[RAGServiceCollector] = None
+
+
+def register_service_collector(get_service: Callable[[], Any]):
+    """Export the shared service's cache and pool metrics (once per process)"""
+    global _collector
+    if _collector is None:
+        _collector = RAGServiceCollector(get_service)
+        REGISTRY.register(_collector)
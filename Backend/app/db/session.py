@@ -2,8 +2,12 @@
 MongoDB Database Connection
 Simple async MongoDB connection using Motor driver
 """
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.core.metrics import mongo_pool_monitor
+
+logger = logging.getLogger(__name__)
 
 class Database:
     client: AsyncIOMotorClient = None
@@ -13,14 +17,15 @@ db = Database()
 
 async def connect_to_mongo():
     """Connect to MongoDB on startup"""
-    db.client = AsyncIOMotorClient(settings.MONGODB_URI)
+    # Pool events feed the rag_mongo_pool_* metrics
+    db.client = AsyncIOMotorClient(settings.MONGODB_URI, event_listeners=[mongo_pool_monitor])
     db.db = db.client[settings.MONGODB_DB_NAME]
-    print(f"Connected to MongoDB: {settings.MONGODB_DB_NAME}")
+    logger.info("Connected to MongoDB: %s", settings.MONGODB_DB_NAME)
 
 async def close_mongo_connection():
     """Close MongoDB connection on shutdown"""
     db.client.close()
-    print("Closed MongoDB connection")
+    logger.info("Closed MongoDB connection")
 
 def get_database():
     """Get MongoDB database instance"""
@@ -0,0 +1,578 @@
+"""
+PGVector SQL Helpers
+Direct queries against the tables managed by langchain_postgres.PGVector
+"""
+import logging
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+from langchain_core.documents import Document
+from langchain_postgres import PGVector
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.dialects.postgresql import ARRAY, VARCHAR
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+# Text search configuration for keyword retrieval; must match the GIN index expression
+TEXT_SEARCH_CONFIG = "english"
+TEXT_SEARCH_INDEX = "ix_langchain_pg_embedding_document_tsv"
+# Approximate nearest neighbour index types (cosine distance, as PGVector queries use)
+ANN_INDEX_TYPES = ("hnsw", "ivfflat")
+# Chunks of one partition / one document within it
+PARTITION_INDEX = "ix_langchain_pg_embedding_collection_document"
+# Predicate of the partial company-policy ANN index; queries must repeat it verbatim
+COMPANY_POLICY_PREDICATE = "({alias}cmetadata->>'is_company_policy') = 'true'"
+# Collection name suffix of the partition shared by all users
+COMPANY_POLICY_PARTITION = "company_policy"
+# Advisory lock key held while one process builds indexes and migrates chunks
+MAINTENANCE_LOCK_KEY = 0x5241475F494458  # "RAG_IDX"
+
+
+class Partition(NamedTuple):
+    """
+    A PGVector collection holding one slice of the chunks: the shared company
+    policy partition or one uploader's documents. Each is searched as its own
+    leg of a query.
+    """
+    collection_name: str
+    company_policy: bool = False
+
+
+def partition_collection(base_collection: str, is_company_policy: bool, uploaded_by: Optional[str]) -> str:
+    """Collection a document's chunks are stored in"""
+    if is_company_policy:
+        return f"{base_collection}__{COMPANY_POLICY_PARTITION}"
+    if uploaded_by:
+        return f"{base_collection}__user_{uploaded_by}"
+    return base_collection
+
+
+async def ensure_vector_store(vector_store: PGVector):
+    """
+    Create the pgvector extension, tables and collection now (async PGVector
+    does it lazily on first use). Another process creating the same
+    collection at the same time is tolerated.
+    """
+    try:
+        await vector_store.acreate_collection()
+    except IntegrityError:
+        # The other process inserted the collection row first; now it is found
+        await vector_store.acreate_collection()
+
+
+@asynccontextmanager
+async def maintenance_lock(engine: AsyncEngine) -> AsyncIterator[bool]:
+    """
+    Hold the session-level maintenance advisory lock for the block if no other
+    process does; yields whether it was acquired. Postgres releases it if the
+    connection dies.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        locked = (await conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+        )).scalar()
+        try:
+            yield locked
+        finally:
+            if locked:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+
+
+_VALID_INDEX_QUERY = text("""
+    SELECT i.indisvalid FROM pg_index i
+    WHERE i.indexrelid = to_regclass(:index_name)
+""")
+
+
+async def _create_index_concurrently(engine: AsyncEngine, index_name: str, definition: str):
+    """CREATE INDEX CONCURRENTLY unless a valid one exists, replacing the leftover of an interrupted build"""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        valid = (await conn.execute(_VALID_INDEX_QUERY, {"index_name": index_name})).scalar()
+        if valid:
+            return
+        if valid is False:
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+        logger.info("Building index %s", index_name)
+        await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} {definition}"))
+
+
+async def ensure_text_search_index(engine: AsyncEngine):
+    """
+    GIN index over chunk text so the keyword half of hybrid search does not
+    scan every chunk, plus a partial one over company policy chunks for
+    policy-scoped searches. Built CONCURRENTLY, so ingestion keeps writing.
+    """
+    for index_name, predicate in (
+        (TEXT_SEARCH_INDEX, ""),
+        (f"{TEXT_SEARCH_INDEX}_policy", f"WHERE {COMPANY_POLICY_PREDICATE.format(alias='')}")
+    ):
+        await _create_index_concurrently(
+            engine,
+            index_name,
+            f"ON {EMBEDDING_TABLE} USING gin (to_tsvector('{TEXT_SEARCH_CONFIG}', document)) {predicate}"
+        )
+
+
+def ann_index_name(index_type: str, table: str = EMBEDDING_TABLE, partial: str = "") -> str:
+    return f"ix_{table}_embedding_{index_type}{partial}"
+
+
+async def ensure_embedding_dimensions(engine: AsyncEngine, dimensions: int, table: str = EMBEDDING_TABLE) -> bool:
+    """
+    Type the embedding column as vector(dimensions); ANN indexes need a fixed
+    dimension and tables created by older PGVector setups use plain vector.
+    Returns False if existing rows have other dimensions.
+    """
+    query = text("""
+        SELECT atttypmod FROM pg_attribute
+        WHERE attrelid = to_regclass(:table) AND attname = 'embedding'
+    """)
+    async with engine.begin() as conn:
+        typmod = (await conn.execute(query, {"table": table})).scalar()
+        if typmod == dimensions:
+            return True
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN embedding TYPE vector({dimensions})"))
+    except DBAPIError as e:
+        logger.warning("Cannot type %s.embedding as vector(%d): %s", table, dimensions, e.orig)
+        return False
+    logger.info("Typed %s.embedding as vector(%d)", table, dimensions)
+    return True
+
+
+async def ensure_ann_index(
+    engine: AsyncEngine,
+    index_type: str,
+    table: str = EMBEDDING_TABLE,
+    hnsw_m: int = 16,
+    hnsw_ef_construction: int = 64,
+    ivfflat_lists: int = 100,
+    maintenance_work_mem: Optional[str] = None,
+    company_policy_index: bool = True
+):
+    """
+    Build the HNSW or IVFFlat index on the embedding column (CONCURRENTLY, so
+    ingestion keeps writing) and drop the other type's indexes. index_type
+    "none" drops them all. Invalid leftovers of interrupted builds are rebuilt.
+    With company_policy_index a second, partial index covers only company
+    policy chunks, so policy-scoped searches never wade through other documents.
+    IVFFlat picks its list centroids from existing rows, so build it after
+    the initial load rather than on an empty table.
+    """
+    if index_type not in ANN_INDEX_TYPES + ("none",):
+        raise ValueError(f"Unknown vector index type: {index_type}")
+    options = {
+        "hnsw": f"WITH (m = {int(hnsw_m)}, ef_construction = {int(hnsw_ef_construction)})",
+        "ivfflat": f"WITH (lists = {int(ivfflat_lists)})"
+    }
+    variants = [("", "")]
+    if company_policy_index:
+        variants.append(("_policy", f"WHERE {COMPANY_POLICY_PREDICATE.format(alias='')}"))
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for candidate in ANN_INDEX_TYPES:
+            for partial, _ in variants:
+                index_name = ann_index_name(candidate, table, partial)
+                valid = (await conn.execute(_VALID_INDEX_QUERY, {"index_name": index_name})).scalar()
+                if valid is None or (candidate == index_type and valid):
+                    continue
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+        if index_type == "none":
+            return
+        if maintenance_work_mem:
+            await conn.execute(
+                text("SELECT set_config('maintenance_work_mem', :value, false)"),
+                {"value": maintenance_work_mem}
+            )
+        try:
+            for partial, predicate in variants:
+                index_name = ann_index_name(index_type, table, partial)
+                if (await conn.execute(_VALID_INDEX_QUERY, {"index_name": index_name})).scalar():
+                    continue
+                logger.info("Building %s index %s", index_type, index_name)
+                await conn.execute(text(f"""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name}
+                    ON {table} USING {index_type} (embedding vector_cosine_ops) {options[index_type]}
+                    {predicate}
+                """))
+                logger.info("Built %s", index_name)
+        finally:
+            if maintenance_work_mem:
+                await conn.execute(text("RESET maintenance_work_mem"))
+
+
+async def ensure_metadata_indexes(engine: AsyncEngine):
+    """
+    B-tree index on (collection_id, cmetadata->>'document_id'): scans of one
+    partition, document-scoped search, re-indexing and partition-local deletes.
+    Built CONCURRENTLY, so ingestion keeps writing.
+    """
+    await _create_index_concurrently(
+        engine, PARTITION_INDEX, f"ON {EMBEDDING_TABLE} (collection_id, (cmetadata->>'document_id'))"
+    )
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        # Superseded by the partition index
+        await conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_langchain_pg_embedding_document_id"))
+
+
+def metadata_filter_clause(filter: Optional[dict], alias: str = "e") -> Tuple[str, dict]:
+    """
+    SQL condition and bind params for a metadata filter, written so Postgres
+    can use the document_id B-tree index and the partial company-policy ANN
+    index (its predicate has to appear literally in the query). Other keys
+    fall back to JSONB containment.
+    """
+    conditions, params, rest = [], {}, {}
+    for key, value in (filter or {}).items():
+        if key == "document_id":
+            conditions.append(f"{alias}.cmetadata->>'document_id' = :filter_document_id")
+            params["filter_document_id"] = str(value)
+        elif key == "is_company_policy" and value is True:
+            conditions.append(COMPANY_POLICY_PREDICATE.format(alias=f"{alias}."))
+        else:
+            rest[key] = value
+    if rest:
+        conditions.append(f"{alias}.cmetadata @> CAST(:filter_metadata AS jsonb)")
+        params["filter_metadata"] = json.dumps(rest)
+    return " AND ".join(conditions) or "TRUE", params
+
+
+def scoped_chunks(leg: int, partition: Partition, filter: Optional[dict]) -> Tuple[str, dict]:
+    """
+    Subquery over one partition's chunks matching filter, and its bind params,
+    for a nearest-neighbour ORDER BY. The company-policy partition repeats the
+    partial index predicate, so it is searched through its own ANN index. An
+    uploader's partition or a single document is read through the partition
+    index and ranked exactly: OFFSET 0 keeps the planner from pushing the
+    ORDER BY into the table-wide ANN index, whose scan stops after ef_search
+    candidates (nearly all from other partitions) and would return fewer
+    than k chunks.
+    """
+    filter_sql, params = metadata_filter_clause(filter)
+    conditions = [filter_sql]
+    if partition.company_policy:
+        conditions.append(COMPANY_POLICY_PREDICATE.format(alias="e."))
+    exact = not partition.company_policy or (filter and "document_id" in filter)
+    fence = "OFFSET 0" if exact else ""
+    params[f"collection_{leg}"] = partition.collection_name
+    return f"""(
+        SELECT e.* FROM {EMBEDDING_TABLE} e
+        WHERE e.collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection_{leg})
+          AND {" AND ".join(conditions)}
+        {fence}
+    )""", params
+
+
+def keyword_chunks(leg: int, partition: Partition, filter: Optional[dict]) -> Tuple[str, dict]:
+    """
+    Subquery over one partition's chunks matching keyword_query.q and filter,
+    and its bind params. The partition and the keywords are matched first,
+    through a BitmapAnd of the partition and full-text indexes (the partial
+    one for company policy), so only this partition's matching rows are read
+    and other users' chunks cost nothing. OFFSET 0 applies the metadata filter
+    afterwards: with a document_id pushed down, the planner reads the
+    document's chunks through the partition index instead and runs
+    to_tsvector on each of them.
+    """
+    filter_sql, params = metadata_filter_clause(filter, alias="m")
+    conditions = [f"to_tsvector('{TEXT_SEARCH_CONFIG}', e.document) @@ keyword_query.q"]
+    if partition.company_policy:
+        conditions.append(COMPANY_POLICY_PREDICATE.format(alias="e."))
+    params[f"collection_{leg}"] = partition.collection_name
+    return f"""(
+        SELECT m.* FROM (
+            SELECT e.* FROM {EMBEDDING_TABLE} e, keyword_query
+            WHERE e.collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection_{leg})
+              AND {" AND ".join(conditions)}
+            OFFSET 0
+        ) m
+        WHERE {filter_sql}
+    )""", params
+
+
+def nearest_legs(partitions: Sequence[Partition], filter: Optional[dict], limit: str) -> Tuple[str, dict]:
+    """UNION ALL of each partition's nearest chunks (id, document, cmetadata, distance) to :embedding"""
+    legs, params = [], {}
+    for leg, partition in enumerate(partitions):
+        chunks_sql, leg_params = scoped_chunks(leg, partition, filter)
+        params.update(leg_params)
+        legs.append(f"""(
+            SELECT e.id, e.document, e.cmetadata, e.embedding <=> CAST(:embedding AS vector) AS distance
+            FROM {chunks_sql} e
+            ORDER BY distance
+            LIMIT {limit}
+        )""")
+    return " UNION ALL ".join(legs), params
+
+
+class VectorSearchParams:
+    """
+    Query-time ANN settings (hnsw.ef_search, ivfflat.probes) for every pooled
+    connection of an engine. A connection runs SET only when it is checked out
+    with values older than the current ones, so steady-state queries pay no
+    extra round-trip.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.values = {}
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+
+    def update(self, ef_search: int, probes: int):
+        values = {"hnsw.ef_search": int(ef_search), "ivfflat.probes": int(probes)}
+        if values != self.values:
+            self.values = values
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        values = self.values
+        if not values or connection_record.info.get("vector_search_params") == values:
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in values.items():
+            cursor.execute(f"SET {name} = {value}")
+        cursor.close()
+        # Commit so the pool's rollback-on-return does not undo the SETs
+        dbapi_connection.commit()
+        connection_record.info["vector_search_params"] = values
+
+
+async def get_document_chunk_ids(engine: AsyncEngine, collection_names: List[str], document_id: str) -> Set[str]:
+    """IDs of all chunks stored for a document in any of the given partitions"""
+    query = text(f"""
+        SELECT e.id
+        FROM {EMBEDDING_TABLE} e
+        WHERE e.collection_id IN (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = ANY(:collection_names))
+          AND e.cmetadata->>'document_id' = :document_id
+    """).bindparams(bindparam("collection_names", type_=ARRAY(VARCHAR)))
+    async with engine.connect() as conn:
+        result = await conn.execute(query, {"collection_names": collection_names, "document_id": document_id})
+        return {row[0] for row in result}
+
+
+async def get_collection_document_ids(engine: AsyncEngine, collection_name: str) -> List[str]:
+    """Distinct document_ids with chunks in a collection"""
+    query = text(f"""
+        SELECT DISTINCT e.cmetadata->>'document_id'
+        FROM {EMBEDDING_TABLE} e
+        WHERE e.collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection_name)
+    """)
+    async with engine.connect() as conn:
+        result = await conn.execute(query, {"collection_name": collection_name})
+        return [row[0] for row in result if row[0]]
+
+
+async def update_chunk_metadata(engine: AsyncEngine, chunk_ids: List[str], metadata: dict):
+    """Merge metadata fields into existing chunks without re-embedding them"""
+    query = text(f"""
+        UPDATE {EMBEDDING_TABLE}
+        SET cmetadata = cmetadata || CAST(:metadata AS jsonb)
+        WHERE id = ANY(:chunk_ids)
+    """).bindparams(bindparam("chunk_ids", type_=ARRAY(VARCHAR)))
+    async with engine.begin() as conn:
+        await conn.execute(query, {"chunk_ids": chunk_ids, "metadata": json.dumps(metadata)})
+
+
+async def move_document_chunks(
+    engine: AsyncEngine,
+    document_id: str,
+    from_collections: List[str],
+    to_collection: str
+) -> int:
+    """Move a document's chunks into another partition (the target collection must exist)"""
+    query = text(f"""
+        UPDATE {EMBEDDING_TABLE}
+        SET collection_id = (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :to_collection)
+        WHERE collection_id IN (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = ANY(:from_collections))
+          AND cmetadata->>'document_id' = :document_id
+    """).bindparams(bindparam("from_collections", type_=ARRAY(VARCHAR)))
+    async with engine.begin() as conn:
+        result = await conn.execute(query, {
+            "document_id": document_id,
+            "from_collections": from_collections,
+            "to_collection": to_collection
+        })
+        return result.rowcount
+
+
+async def delete_document_chunks(engine: AsyncEngine, collection_names: List[str], document_id: str) -> int:
+    """Delete a document's chunks from the given partitions through the partition index"""
+    query = text(f"""
+        DELETE FROM {EMBEDDING_TABLE}
+        WHERE collection_id IN (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = ANY(:collection_names))
+          AND cmetadata->>'document_id' = :document_id
+    """).bindparams(bindparam("collection_names", type_=ARRAY(VARCHAR)))
+    async with engine.begin() as conn:
+        result = await conn.execute(query, {"collection_names": collection_names, "document_id": document_id})
+        return result.rowcount
+
+
+async def delete_chunks(
+    engine: AsyncEngine, collection_names: List[str], document_id: str, chunk_ids: List[str]
+) -> int:
+    """Delete chunks of a document by ID from the given partitions"""
+    query = text(f"""
+        DELETE FROM {EMBEDDING_TABLE}
+        WHERE collection_id IN (SELECT uuid FROM {COLLECTION_TABLE} WHERE name = ANY(:collection_names))
+          AND cmetadata->>'document_id' = :document_id
+          AND id = ANY(:chunk_ids)
+    """).bindparams(
+        bindparam("collection_names", type_=ARRAY(VARCHAR)),
+        bindparam("chunk_ids", type_=ARRAY(VARCHAR))
+    )
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            query, {"collection_names": collection_names, "document_id": document_id, "chunk_ids": chunk_ids}
+        )
+        return result.rowcount
+
+
+def _partitions_of(base_collection: str) -> Tuple[str, dict]:
+    """Subquery of the collection IDs of a base collection and all its partitions"""
+    return (
+        f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :base_collection OR starts_with(name, :partition_prefix)",
+        {"base_collection": base_collection, "partition_prefix": f"{base_collection}__"}
+    )
+
+
+async def get_partitioned_document_ids(engine: AsyncEngine, base_collection: str) -> Set[str]:
+    """Distinct document_ids with chunks in a base collection or any of its partitions"""
+    partitions, params = _partitions_of(base_collection)
+    query = text(f"""
+        SELECT DISTINCT e.cmetadata->>'document_id'
+        FROM {EMBEDDING_TABLE} e
+        WHERE e.collection_id IN ({partitions})
+    """)
+    async with engine.connect() as conn:
+        result = await conn.execute(query, params)
+        return {row[0] for row in result if row[0]}
+
+
+async def delete_partitioned_chunks(engine: AsyncEngine, base_collection: str, document_ids: List[str]) -> int:
+    """Delete the chunks of several documents from every partition in one transaction"""
+    partitions, params = _partitions_of(base_collection)
+    query = text(f"""
+        DELETE FROM {EMBEDDING_TABLE}
+        WHERE collection_id IN ({partitions})
+          AND cmetadata->>'document_id' = ANY(:document_ids)
+    """).bindparams(bindparam("document_ids", type_=ARRAY(VARCHAR)))
+    async with engine.begin() as conn:
+        result = await conn.execute(query, {**params, "document_ids": document_ids})
+        return result.rowcount
+
+
+def vector_literal(embedding: List[float]) -> str:
+    return "[" + ",".join(str(float(value)) for value in embedding) + "]"
+
+
+async def similarity_search(
+    engine: AsyncEngine,
+    partitions: Sequence[Partition],
+    embedding: List[float],
+    k: int,
+    filter: Optional[dict] = None
+) -> List[Tuple[Document, float]]:
+    """
+    Nearest chunks by cosine distance across the given partitions in one
+    round-trip: each partition's top k (see scoped_chunks), merged. The filter
+    is pushed into every leg so scoped searches use the metadata indexes.
+    """
+    if not partitions:
+        return []
+    legs_sql, params = nearest_legs(partitions, filter, ":k")
+    query_sql = text(f"""
+        SELECT id, document, cmetadata, distance
+        FROM ({legs_sql}) nearest
+        ORDER BY distance
+        LIMIT :k
+    """)
+    params.update({"embedding": vector_literal(embedding), "k": k})
+    async with engine.connect() as conn:
+        result = await conn.execute(query_sql, params)
+        return [
+            (Document(id=row.id, page_content=row.document, metadata=row.cmetadata), float(row.distance))
+            for row in result
+        ]
+
+
+async def hybrid_search(
+    engine: AsyncEngine,
+    partitions: Sequence[Partition],
+    query: str,
+    embedding: List[float],
+    k: int,
+    fetch_k: int,
+    rrf_k: int,
+    filter: Optional[dict] = None
+) -> List[Tuple[Document, float]]:
+    """
+    Keyword (full-text) and vector search across the given partitions in one
+    round-trip, fused with reciprocal rank fusion: score = sum over both
+    rankings of 1 / (rrf_k + rank). Each ranking contributes its best fetch_k
+    chunks. The keyword query ORs the question's stemmed terms, so chunks need
+    not contain every word. filter restricts both rankings (see scoped_chunks and
+    keyword_chunks).
+    """
+    if not partitions:
+        return []
+    legs_sql, params = nearest_legs(partitions, filter, ":fetch_k")
+    keyword_legs = []
+    for leg, partition in enumerate(partitions):
+        chunks_sql, leg_params = keyword_chunks(leg, partition, filter)
+        params.update(leg_params)
+        keyword_legs.append(f"""(
+            SELECT e.id, ts_rank_cd(to_tsvector('{TEXT_SEARCH_CONFIG}', e.document), keyword_query.q) AS score
+            FROM {chunks_sql} e, keyword_query
+            ORDER BY score DESC
+            LIMIT :fetch_k
+        )""")
+    query_sql = text(f"""
+        WITH vector_hits AS (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+            FROM ({legs_sql}) nearest
+            ORDER BY rank
+            LIMIT :fetch_k
+        ),
+        keyword_query AS (
+            SELECT CAST(replace(CAST(plainto_tsquery('{TEXT_SEARCH_CONFIG}', :query) AS text), '&', '|') AS tsquery) AS q
+        ),
+        keyword_hits AS (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+            FROM ({" UNION ALL ".join(keyword_legs)}) matched
+            ORDER BY rank
+            LIMIT :fetch_k
+        ),
+        fused AS (
+            SELECT id, SUM(1.0 / (:rrf_k + rank)) AS score
+            FROM (
+                SELECT id, rank FROM vector_hits
+                UNION ALL
+                SELECT id, rank FROM keyword_hits
+            ) ranked
+            GROUP BY id
+        )
+        SELECT e.id, e.document, e.cmetadata, fused.score
+        FROM fused
+        JOIN {EMBEDDING_TABLE} e ON e.id = fused.id
+        ORDER BY fused.score DESC, e.id
+        LIMIT :k
+    """)
+    params.update({
+        "query": query,
+        "embedding": vector_literal(embedding),
+        "k": k,
+        "fetch_k": fetch_k,
+        "rrf_k": rrf_k
+    })
+    async with engine.connect() as conn:
+        result = await conn.execute(query_sql, params)
+        return [
+            (Document(id=row.id, page_content=row.document, metadata=row.cmetadata), float(row.score))
+            for row in result
+        ]
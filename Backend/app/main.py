@@ -10,11 +10,24 @@ warnings.filterwarnings(
     category=UserWarning,
 )
 
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.core.config import settings
+from app.core.logging import request_context, setup_logging
+from app.core.metrics import register_service_collector
 from app.api.api_v1.api import api_router
 from app.db.session import connect_to_mongo, close_mongo_connection
+from app.services.corpus_state import corpus_state
+from app.services.job_queue import job_queue
+from app.services.rag_service import init_rag_service, close_rag_service, get_rag_service
+from app.services.settings_cache import rag_settings_cache
+
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+logger = logging.getLogger(__name__)
+register_service_collector(get_rag_service)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -33,13 +46,47 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
-# MongoDB connection lifecycle
+# Reject oversized request bodies before they are read and spooled to disk
+# (multipart framing gets 1 MB on top of the upload cap)
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.MAX_UPLOAD_BYTES + 1024 * 1024:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
+
+# Every request runs with a request ID (the client's X-Request-ID or a new one) that its
+# logs carry and the response echoes; one access line per request with its stage timings
+# (streamed responses log when streaming starts, the chat logs its own completion)
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    with request_context(request.headers.get("x-request-id")) as trace:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = trace.request_id
+        logger.info(
+            "%s %s %d",
+            request.method,
+            request.url.path,
+            response.status_code,
+            extra={"duration_ms": trace.elapsed_ms(), "spans_ms": trace.spans_ms()}
+        )
+    return response
+
+# MongoDB connection and shared RAG service lifecycle
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
+    await init_rag_service()
+    await rag_settings_cache.start_watching()
+    await job_queue.ensure_indexes()
+    # Cached answers are dropped whenever any process changes the indexed documents
+    await corpus_state.start_watching(get_rag_service().invalidate_answers)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await corpus_state.stop_watching()
+    await rag_settings_cache.stop_watching()
+    await close_rag_service()
     await close_mongo_connection()
 
 # Include API router
@@ -57,3 +104,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": settings.PROJECT_NAME}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: chat stage latencies, ingestion, caches, connection pools, LLM tokens"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
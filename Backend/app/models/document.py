@@ -33,6 +33,14 @@ class Document(BaseModel):
     is_company_policy: bool = False
     uploaded_by: str  # User ID as string
     status: str = "pending"  # pending, processing, completed, failed
+    chunks_done: Optional[int] = None
+    chunks_total: Optional[int] = None
+    chunk_count: Optional[int] = None
+    chunks_added: Optional[int] = None
+    chunks_removed: Optional[int] = None
+    chunks_unchanged: Optional[int] = None
+    embedding_cache_hits: Optional[int] = None
+    embedding_cache_hit_ratio: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = None
 
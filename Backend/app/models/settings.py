@@ -31,6 +31,14 @@ class RAGSettings(BaseModel):
     top_p: float = 1.0
     top_k: int = 4
     model_name: str = "gpt-3.5-turbo"
+    search_type: str = "hybrid"
+    hybrid_fetch_k: int = 20
+    rrf_k: int = 60
+    hnsw_ef_search: int = 40
+    ivfflat_probes: int = 10
+    rerank_enabled: bool = False
+    rerank_fetch_k: int = 20
+    rerank_min_score: float = 0.1
 
     model_config = {
         "populate_by_name": True,
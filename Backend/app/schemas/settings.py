@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 
 class RAGSettingsBase(BaseModel):
@@ -9,6 +9,14 @@ class RAGSettingsBase(BaseModel):
     top_p: float = Field(default=1.0, ge=0.0, le=1.0)
     top_k: int = Field(default=4, ge=1)
     model_name: str = "gpt-3.5-turbo"
+    search_type: Literal["similarity", "hybrid"] = "hybrid"
+    hybrid_fetch_k: int = Field(default=20, ge=1, le=200)
+    rrf_k: int = Field(default=60, ge=1)
+    hnsw_ef_search: int = Field(default=40, ge=1, le=1000)
+    ivfflat_probes: int = Field(default=10, ge=1, le=1000)
+    rerank_enabled: bool = False
+    rerank_fetch_k: int = Field(default=20, ge=1, le=200)
+    rerank_min_score: float = Field(default=0.1, ge=0.0, le=1.0)
 
 
 class RAGSettingsCreate(RAGSettingsBase):
@@ -22,6 +30,14 @@ class RAGSettingsUpdate(BaseModel):
     top_p: Optional[float] = Field(None, ge=0.0, le=1.0)
     top_k: Optional[int] = Field(None, ge=1)
     model_name: Optional[str] = None
+    search_type: Optional[Literal["similarity", "hybrid"]] = None
+    hybrid_fetch_k: Optional[int] = Field(None, ge=1, le=200)
+    rrf_k: Optional[int] = Field(None, ge=1)
+    hnsw_ef_search: Optional[int] = Field(None, ge=1, le=1000)
+    ivfflat_probes: Optional[int] = Field(None, ge=1, le=1000)
+    rerank_enabled: Optional[bool] = None
+    rerank_fetch_k: Optional[int] = Field(None, ge=1, le=200)
+    rerank_min_score: Optional[float] = Field(None, ge=0.0, le=1.0)
 
 
 class RAGSettingsResponse(RAGSettingsBase):
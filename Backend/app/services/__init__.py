@@ -1,3 +1,4 @@
 from app.services.user_service import user_service
+from app.services.settings_cache import rag_settings_cache
 
-__all__ = ["user_service"]
+__all__ = ["user_service", "rag_settings_cache"]
@@ -0,0 +1,138 @@
+"""
+Semantic Answer Cache
+Reuses recent answers for near-identical questions asked against the same corpus and settings
+"""
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+
+# Scopes are (settings version, document_id, use_company_policy, user_id or None for company policy)
+MAX_SCOPES = 64
+
+
+class CachedAnswer:
+    def __init__(self, answer: str, source_documents: List[str], created_at: float):
+        self.answer = answer
+        self.source_documents = source_documents
+        self.created_at = created_at
+
+
+class _ScopeIndex:
+    """Question vectors and answers for one scope, oldest first"""
+
+    def __init__(self):
+        self.vectors: List[np.ndarray] = []
+        self.answers: List[CachedAnswer] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack(self.vectors)
+        return self._matrix
+
+    def add(self, vector: np.ndarray, answer: CachedAnswer, max_entries: int):
+        self.vectors.append(vector)
+        self.answers.append(answer)
+        if len(self.vectors) > max_entries:
+            del self.vectors[0]
+            del self.answers[0]
+        self._matrix = None
+
+
+class SemanticAnswerCache:
+    """
+    Small in-process vector index of answered questions.
+
+    A question hits when its embedding has cosine similarity >= threshold with
+    a cached question in the same scope and the entry is younger than ttl_seconds.
+    Any settings change bumps the settings version and so changes the scope,
+    and invalidate() drops everything when documents are uploaded or deleted.
+    An answer computed before an invalidate() is not stored: callers read
+    generation when they look up and pass it back to store().
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._scopes: "OrderedDict[tuple, _ScopeIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def scope(
+        rag_settings: dict,
+        document_id: Optional[str],
+        use_company_policy: bool,
+        user_id: Optional[str] = None
+    ) -> tuple:
+        # Answers from company policies alone are shared; others used the user's own documents
+        return (
+            rag_settings.get("version", 0),
+            document_id,
+            use_company_policy,
+            None if use_company_policy else user_id
+        )
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def lookup(self, scope: tuple, query_vector: List[float]) -> Optional[CachedAnswer]:
+        index = self._scopes.get(scope)
+        if index is None or not index.vectors:
+            self.misses += 1
+            return None
+        self._scopes.move_to_end(scope)
+        similarities = index.matrix() @ self._unit(query_vector)
+        best = int(np.argmax(similarities))
+        entry = index.answers[best]
+        if similarities[best] < self.threshold or time.monotonic() - entry.created_at > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    @property
+    def generation(self) -> int:
+        return self.invalidations
+
+    def store(
+        self,
+        scope: tuple,
+        query_vector: List[float],
+        answer: str,
+        source_documents: List[str],
+        generation: Optional[int] = None
+    ):
+        if generation is not None and generation != self.invalidations:
+            # The corpus changed while this answer was being computed
+            return
+        index = self._scopes.get(scope)
+        if index is None:
+            index = self._scopes[scope] = _ScopeIndex()
+            if len(self._scopes) > MAX_SCOPES:
+                self._scopes.popitem(last=False)
+        self._scopes.move_to_end(scope)
+        index.add(
+            self._unit(query_vector),
+            CachedAnswer(answer=answer, source_documents=source_documents, created_at=time.monotonic()),
+            self.max_entries
+        )
+
+    def invalidate(self):
+        """Forget all answers (corpus changed)"""
+        self._scopes.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": sum(len(index.answers) for index in self._scopes.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,244 @@
+"""
+Context Builder
+Packs retrieved chunks into the prompt context: merges overlapping chunks of the same
+document, drops near-duplicates and fits the result to the model's token budget
+"""
+import logging
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import tiktoken
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Context window (prompt + completion tokens) by model name prefix; the longest match wins
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16_385,
+    "gpt-3.5-turbo-instruct": 4_096,
+    "gpt-4": 8_192,
+    "gpt-4-32k": 32_768,
+    "gpt-4-turbo": 128_000,
+    "gpt-4-1106": 128_000,
+    "gpt-4-0125": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-5": 400_000,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+}
+DEFAULT_CONTEXT_WINDOW = 8_192
+SEPARATOR = "\n\n"
+# Seconds before a model whose tokenizer failed to load is tried again
+TOKENIZER_RETRY_SECONDS = 300
+
+# model name -> (count function, monotonic time it expires or None)
+_token_counters: Dict[str, Tuple[Callable[[str], int], Optional[float]]] = {}
+
+
+def context_window(model_name: str) -> int:
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if model_name.startswith(prefix)]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def cached_token_counter(model_name: str) -> Optional[Callable[[str], int]]:
+    """The loaded token count function for a model, None if it needs loading"""
+    cached = _token_counters.get(model_name)
+    if cached is None:
+        return None
+    count, expires = cached
+    if expires is not None and time.monotonic() >= expires:
+        return None
+    return count
+
+
+def token_counter(model_name: str) -> Callable[[str], int]:
+    """
+    Token count function for a model (tiktoken BPE). Falls back to ~4
+    characters per token when the encoding cannot be loaded (tiktoken
+    downloads it on first use); the load is retried after
+    TOKENIZER_RETRY_SECONDS. May block: call it off the event loop unless
+    cached_token_counter has it.
+    """
+    count = cached_token_counter(model_name)
+    if count is not None:
+        return count
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("No tokenizer for %s (%s), estimating 4 characters per token", model_name, type(e).__name__)
+        count = lambda text: len(text) // 4
+        _token_counters[model_name] = (count, time.monotonic() + TOKENIZER_RETRY_SECONDS)
+        return count
+    count = lambda text: len(encoding.encode_ordinary(text))
+    _token_counters[model_name] = (count, None)
+    return count
+
+
+class PackedContext(NamedTuple):
+    text: str
+    docs: List[Document]   # retrieved chunks that made it into text
+    chunks: int            # retrieved chunks
+    blocks: int            # passages in text after merging
+    raw_tokens: int        # all retrieved chunks joined as-is
+    tokens: int
+    budget: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.raw_tokens - self.tokens
+
+
+class _Block:
+    """A passage of one document (page) built from one or more retrieved chunks"""
+
+    def __init__(self, rank: int, doc: Document):
+        self.rank = rank
+        self.key = (doc.metadata.get("document_id"), doc.metadata.get("page"))
+        self.text = doc.page_content
+        self.ranked_docs = [(rank, doc)]
+        self._shingles = None
+
+    @property
+    def shingles(self) -> set:
+        if self._shingles is None:
+            words = self.text.lower().split()
+            self._shingles = {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+        return self._shingles
+
+    def absorb(self, other: "_Block", text: str):
+        self.rank = min(self.rank, other.rank)
+        self.text = text
+        self.ranked_docs.extend(other.ranked_docs)
+        self._shingles = None
+
+
+def _overlap(head: str, tail: str, min_overlap: int) -> int:
+    """Length of the longest suffix of head that is a prefix of tail (0 if under min_overlap)"""
+    if len(tail) < min_overlap or len(head) < min_overlap:
+        return 0
+    probe = tail[:min_overlap]
+    start = max(0, len(head) - len(tail))
+    index = head.find(probe, start)
+    while index != -1:
+        if tail.startswith(head[index:]):
+            return len(head) - index
+        index = head.find(probe, index + 1)
+    return 0
+
+
+class ContextBuilder:
+    """
+    Turns retrieved chunks (in rank order) into the prompt context:
+    - chunks of the same document and page whose text overlaps (chunk_overlap)
+      or contains one another are merged into one passage
+    - passages whose word 3-shingles are at least dedup_threshold similar
+      (Jaccard) to a better-ranked one are dropped
+    - passages are added in rank order while they fit the token budget: the
+      model's context window minus the completion reserve and the rest of the
+      prompt, capped at max_tokens when set
+    """
+
+    def __init__(
+        self,
+        response_tokens: int = 1024,
+        max_tokens: int = 0,
+        dedup_threshold: float = 0.9,
+        min_overlap: int = 20
+    ):
+        self.response_tokens = response_tokens
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        self.min_overlap = min_overlap
+
+    def budget(self, model_name: str, prompt_tokens: int) -> int:
+        budget = context_window(model_name) - self.response_tokens - prompt_tokens
+        if self.max_tokens:
+            budget = min(budget, self.max_tokens)
+        return max(budget, 0)
+
+    def _merge(self, block: _Block, other: _Block) -> Optional[str]:
+        """Text of block and other merged, or None if they do not overlap"""
+        if block.key != other.key or block.key[0] is None:
+            return None
+        if other.text in block.text:
+            return block.text
+        if block.text in other.text:
+            return other.text
+        overlap = _overlap(block.text, other.text, self.min_overlap)
+        if overlap:
+            return block.text + other.text[overlap:]
+        overlap = _overlap(other.text, block.text, self.min_overlap)
+        if overlap:
+            return other.text + block.text[overlap:]
+        return None
+
+    def _is_duplicate(self, block: _Block, kept: List[_Block]) -> bool:
+        for other in kept:
+            if block.text in other.text:
+                return True
+            union = len(block.shingles | other.shingles)
+            if union and len(block.shingles & other.shingles) / union >= self.dedup_threshold:
+                return True
+        return False
+
+    def _blocks(self, docs: List[Document]) -> List[_Block]:
+        blocks: List[_Block] = []
+        for rank, doc in enumerate(docs):
+            block = _Block(rank, doc)
+            merged = True
+            # A new chunk can bridge two passages, so merge until nothing changes
+            while merged:
+                merged = False
+                for other in blocks:
+                    text = self._merge(other, block)
+                    if text is not None:
+                        blocks.remove(other)
+                        other.absorb(block, text)
+                        block = other
+                        merged = True
+                        break
+            blocks.append(block)
+        kept: List[_Block] = []
+        # Passages are ranked by their best chunk
+        for block in sorted(blocks, key=lambda block: block.rank):
+            if not self._is_duplicate(block, kept):
+                kept.append(block)
+        return kept
+
+    def build(
+        self,
+        docs: List[Document],
+        model_name: str,
+        prompt: str = "",
+        count: Optional[Callable[[str], int]] = None
+    ) -> PackedContext:
+        """
+        Pack docs for model_name; prompt is the rest of the prompt (template and
+        question), count the model's token counter if already loaded
+        """
+        count = count or token_counter(model_name)
+        budget = self.budget(model_name, count(prompt) if prompt else 0)
+        raw_tokens = count(SEPARATOR.join(doc.page_content for doc in docs)) if docs else 0
+        texts, used, tokens = [], [], 0
+        separator_tokens = count(SEPARATOR)
+        for block in self._blocks(docs):
+            block_tokens = count(block.text) + (separator_tokens if texts else 0)
+            if tokens + block_tokens > budget:
+                continue
+            texts.append(block.text)
+            used.extend(block.ranked_docs)
+            tokens += block_tokens
+        text = SEPARATOR.join(texts)
+        return PackedContext(
+            text=text,
+            docs=[doc for _, doc in sorted(used, key=lambda ranked: ranked[0])],
+            chunks=len(docs),
+            blocks=len(texts),
+            raw_tokens=raw_tokens,
+            tokens=count(text) if texts else 0,
+            budget=budget
+        )
@@ -0,0 +1,89 @@
+"""
+Corpus State
+Version counter bumped whenever indexed documents change, followed by every API worker
+"""
+import asyncio
+import logging
+from typing import Callable, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from app.core.config import settings
+from app.db.session import get_database
+
+logger = logging.getLogger(__name__)
+
+CORPUS_STATE_ID = "corpus"
+
+
+class CorpusState:
+    """
+    Tracks the `rag_state` corpus version. Any process that changes indexed
+    documents calls bump(); API workers register a callback (e.g. clearing
+    the semantic answer cache) that runs when the version moves, learned via a
+    change stream or, on standalone MongoDB, by polling every poll_seconds.
+    """
+
+    def __init__(self, poll_seconds: float):
+        self.poll_seconds = poll_seconds
+        self.version = None
+        self._on_change: Optional[Callable[[], None]] = None
+        self._watch_task: Optional[asyncio.Task] = None
+
+    async def bump(self) -> int:
+        """Record a corpus change and return the new version"""
+        db = get_database()
+        state = await db.rag_state.find_one_and_update(
+            {"_id": CORPUS_STATE_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._observe(state["version"])
+        return state["version"]
+
+    def _observe(self, version: int):
+        if self.version is not None and version != self.version and self._on_change is not None:
+            self._on_change()
+        self.version = version
+
+    async def _load(self):
+        db = get_database()
+        state = await db.rag_state.find_one({"_id": CORPUS_STATE_ID})
+        self._observe(state["version"] if state else 0)
+
+    async def start_watching(self, on_change: Callable[[], None]):
+        """Call on_change whenever another process bumps the corpus version"""
+        self._on_change = on_change
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        db = get_database()
+        try:
+            pipeline = [{"$match": {"documentKey._id": CORPUS_STATE_ID}}]
+            async with db.rag_state.watch(pipeline, full_document="updateLookup") as stream:
+                await self._load()
+                async for change in stream:
+                    full_document = change.get("fullDocument")
+                    if full_document:
+                        self._observe(full_document["version"])
+        except PyMongoError as e:
+            logger.warning("rag_state change stream unavailable, polling every %ss: %s", self.poll_seconds, e)
+        while True:
+            try:
+                await self._load()
+            except PyMongoError as e:
+                logger.warning("rag_state poll failed: %s", e)
+            await asyncio.sleep(self.poll_seconds)
+
+
+corpus_state = CorpusState(poll_seconds=settings.RAG_SETTINGS_CACHE_TTL)
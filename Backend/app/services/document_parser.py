@@ -0,0 +1,124 @@
+"""
+Document Parser
+CPU-bound parsing and chunking, run in a process pool off the event loop thread
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from pypdf import PdfReader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import Docx2txtLoader, TextLoader
+
+# Pages per process-pool task when parsing PDFs
+PDF_PAGES_PER_TASK = 16
+
+
+def _split(documents: List[Document], chunk_size: int, chunk_overlap: int) -> List[Document]:
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    return text_splitter.split_documents(documents)
+
+
+def parse_pdf_pages(
+    path: str,
+    source: str,
+    first_page: int,
+    last_page: int,
+    chunk_size: int,
+    chunk_overlap: int
+) -> List[Document]:
+    """Extract and split pages [first_page, last_page) of a PDF (same metadata shape as PyPDFLoader)"""
+    reader = PdfReader(path)
+    total_pages = len(reader.pages)
+    pages = []
+    for page_number in range(first_page, min(last_page, total_pages)):
+        text = reader.pages[page_number].extract_text(extraction_mode="plain").strip()
+        pages.append(Document(
+            page_content=text,
+            metadata={
+                "source": source,
+                "page": page_number,
+                "page_label": reader.page_labels[page_number],
+                "total_pages": total_pages
+            }
+        ))
+    return _split(pages, chunk_size, chunk_overlap)
+
+
+def parse_file(path: str, source: str, file_extension: str, chunk_size: int, chunk_overlap: int) -> List[Document]:
+    """Load and split a whole .docx/.doc/.txt/.pdf file"""
+    if file_extension == '.pdf':
+        return parse_pdf_pages(path, source, 0, len(PdfReader(path).pages), chunk_size, chunk_overlap)
+    if file_extension in ['.docx', '.doc']:
+        loader = Docx2txtLoader(path)
+    elif file_extension == '.txt':
+        loader = TextLoader(path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+    documents = loader.load()
+    for document in documents:
+        document.metadata["source"] = source
+    return _split(documents, chunk_size, chunk_overlap)
+
+
+def count_pdf_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+class DocumentParser:
+    """
+    Parses and chunks files in a ProcessPoolExecutor so large uploads do not
+    stall the event loop. PDFs are split into page ranges parsed in parallel.
+    With processes=0 parsing runs inline on the calling thread.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._executor is None and self.processes > 0:
+            # spawn: forking a process that runs an event loop and DB pools is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.executor is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def parse(
+        self,
+        path: str,
+        source: str,
+        chunk_size: int,
+        chunk_overlap: int
+    ) -> Tuple[int, List[Document]]:
+        """Return (pages/sections loaded, chunks) for the file at path"""
+        file_extension = os.path.splitext(source)[1].lower()
+        if file_extension != '.pdf' or self.executor is None:
+            chunks = await self._run(parse_file, path, source, file_extension, chunk_size, chunk_overlap)
+            pages = len({chunk.metadata.get("page", 0) for chunk in chunks})
+            return pages, chunks
+
+        total_pages = await self._run(count_pdf_pages, path)
+        ranges = [(first, first + PDF_PAGES_PER_TASK) for first in range(0, total_pages, PDF_PAGES_PER_TASK)]
+        results = await asyncio.gather(*(
+            self._run(parse_pdf_pages, path, source, first, last, chunk_size, chunk_overlap)
+            for first, last in ranges
+        ))
+        return total_pages, [chunk for chunks in results for chunk in chunks]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,247 @@
+"""
+Embedding Caches
+Query embeddings: in-memory LRU (bounded by bytes) with an optional MongoDB tier shared across workers
+Document chunks: persistent MongoDB cache keyed by content hash, so unchanged chunks are never re-embedded
+"""
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import Binary
+from pymongo import ReplaceOne
+from pymongo.errors import PyMongoError
+from langchain_core.embeddings import Embeddings
+from app.db.session import get_database
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry overhead of the key, OrderedDict node and array header
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_query(text: str) -> str:
+    """Case-fold and collapse whitespace so trivially different questions share an entry"""
+    return " ".join(text.casefold().split())
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    """Model identifier used to keep cache entries of different models apart"""
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+class LRUByteCache:
+    """LRU mapping of key -> float32 vector, evicting once max_bytes is exceeded"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, array]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(key: str, vector: array) -> int:
+        return len(key) + vector.itemsize * len(vector) + ENTRY_OVERHEAD_BYTES
+
+    def get(self, key: str) -> Optional[List[float]]:
+        vector = self._entries.get(key)
+        if vector is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return vector.tolist()
+
+    def put(self, key: str, vector: List[float]):
+        packed = array("f", vector)
+        size = self._entry_size(key, packed)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= self._entry_size(key, previous)
+        self._entries[key] = packed
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self.current_bytes -= self._entry_size(old_key, old_vector)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _pack(vector: List[float]) -> Binary:
+    return Binary(array("f", vector).tobytes())
+
+
+def _unpack(data: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(bytes(data))
+    return vector.tolist()
+
+
+class MongoEmbeddingStore:
+    """Persistent embedding tier in MongoDB, vectors stored as packed float32"""
+
+    def __init__(self, collection_name: str, ttl_days: Optional[int] = None):
+        self.collection_name = collection_name
+        self.ttl_days = ttl_days
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def collection(self):
+        return get_database()[self.collection_name]
+
+    async def ensure_indexes(self):
+        """Expire entries ttl_days after they were written (kept forever if ttl_days is None)"""
+        if self.ttl_days is not None:
+            await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_days * 86400)
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        try:
+            entry = await self.collection.find_one({"_id": key}, {"vector": 1})
+        except PyMongoError as e:
+            self.errors += 1
+            logger.warning("MongoDB embedding cache lookup failed: %s", e)
+            return None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _unpack(entry["vector"])
+
+    async def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Fetch all cached vectors for keys in one query"""
+        try:
+            cursor = self.collection.find({"_id": {"$in": list(set(keys))}}, {"vector": 1})
+            found = {entry["_id"]: _unpack(entry["vector"]) async for entry in cursor}
+        except PyMongoError as e:
+            self.errors += 1
+            logger.warning("MongoDB embedding cache lookup failed: %s", e)
+            return {}
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    async def put(self, key: str, vector: List[float], model: str):
+        await self.put_many({key: vector}, model)
+
+    async def put_many(self, vectors: Dict[str, List[float]], model: str):
+        if not vectors:
+            return
+        now = datetime.utcnow()
+        requests = [
+            ReplaceOne({"_id": key}, {"vector": _pack(vector), "model": model, "created_at": now}, upsert=True)
+            for key, vector in vectors.items()
+        ]
+        try:
+            await self.collection.bulk_write(requests, ordered=False)
+        except PyMongoError as e:
+            self.errors += 1
+            logger.warning("MongoDB embedding cache write failed: %s", e)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings instance and caches query embeddings keyed by
+    normalized query text and embedding model. Document chunks are cached
+    by exact content hash through aembed_documents_cached.
+    """
+
+    def __init__(
+        self,
+        underlying_embeddings: Embeddings,
+        cache: LRUByteCache,
+        store: Optional[MongoEmbeddingStore] = None,
+        document_store: Optional[MongoEmbeddingStore] = None
+    ):
+        self.underlying_embeddings = underlying_embeddings
+        self.cache = cache
+        self.store = store
+        self.document_store = document_store
+        self.model = embedding_model_name(underlying_embeddings)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{normalize_query(text)}".encode()).hexdigest()
+
+    def chunk_hash(self, text: str) -> str:
+        """SHA-256 of the embedding model and the exact chunk text"""
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying_embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.underlying_embeddings.aembed_documents(texts)
+
+    async def aembed_documents_cached(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """
+        Embed document chunks, reusing vectors of chunks whose content hash is
+        already in the document store. Returns (vectors, number of cache hits).
+        """
+        if self.document_store is None:
+            return await self.aembed_documents(texts), 0
+        keys = [self.chunk_hash(text) for text in texts]
+        cached = await self.document_store.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            new_vectors = await self.underlying_embeddings.aembed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            await self.document_store.put_many(fresh, self.model)
+            cached.update(fresh)
+        hits = sum(1 for key in keys if key not in missing)
+        return [cached[key] for key in keys], hits
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.underlying_embeddings.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self.cache.get(key)
+        if vector is not None:
+            return vector
+        if self.store is not None:
+            vector = await self.store.get(key)
+        if vector is None:
+            vector = await self.underlying_embeddings.aembed_query(text)
+            if self.store is not None:
+                await self.store.put(key, vector, self.model)
+        self.cache.put(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters for both tiers"""
+        stats = {
+            "memory_entries": len(self.cache),
+            "memory_bytes": self.cache.current_bytes,
+            "memory_hits": self.cache.hits,
+            "memory_misses": self.cache.misses,
+            "memory_evictions": self.cache.evictions
+        }
+        if self.store is not None:
+            stats.update({
+                "persistent_hits": self.store.hits,
+                "persistent_misses": self.store.misses,
+                "persistent_errors": self.store.errors
+            })
+        if self.document_store is not None:
+            stats.update({
+                "document_hits": self.document_store.hits,
+                "document_misses": self.document_store.misses,
+                "document_errors": self.document_store.errors
+            })
+        return stats
@@ -0,0 +1,83 @@
+"""
+Ingestion Pipeline
+Batched, bounded-concurrency embedding and insertion of document chunks
+"""
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, List, Optional, TypeVar
+import openai
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors worth retrying: rate limits, timeouts and transient server failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+async def with_backoff(
+    operation: Callable[[], Awaitable[T]],
+    max_retries: int = None,
+    base_delay: float = None,
+    max_delay: float = None
+) -> T:
+    """Run operation, retrying retryable OpenAI errors with exponential backoff and jitter"""
+    max_retries = settings.INGEST_MAX_RETRIES if max_retries is None else max_retries
+    base_delay = settings.INGEST_BACKOFF_BASE if base_delay is None else base_delay
+    max_delay = settings.INGEST_BACKOFF_MAX if max_delay is None else max_delay
+    attempt = 0
+    while True:
+        try:
+            return await operation()
+        except RETRYABLE_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            logger.warning("%s, retry %d/%d in %.1fs", type(e).__name__, attempt, max_retries, delay)
+            await asyncio.sleep(delay)
+
+
+async def run_batches(
+    items: List[T],
+    process_batch: Callable[[List[T]], Awaitable[int]],
+    batch_size: int,
+    concurrency: int,
+    progress: Optional[ProgressCallback] = None
+) -> int:
+    """
+    Split items into batches and run process_batch on at most `concurrency`
+    batches at a time. process_batch returns a count (e.g. cache hits) that is
+    summed. progress(done, total) is awaited after every finished batch.
+    """
+    total = len(items)
+    batches = [items[i:i + batch_size] for i in range(0, total, batch_size)]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = 0
+
+    async def run(batch: List[T]) -> int:
+        nonlocal done
+        async with semaphore:
+            count = await process_batch(batch)
+        done += len(batch)
+        if progress is not None:
+            await progress(done, total)
+        return count
+
+    tasks = [asyncio.create_task(run(batch)) for batch in batches]
+    try:
+        return sum(await asyncio.gather(*tasks))
+    except BaseException:
+        # One failed batch fails the document; stop the others
+        for task in tasks:
+            task.cancel()
+        raise
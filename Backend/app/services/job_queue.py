@@ -0,0 +1,303 @@
+"""
+Ingestion Job Queue
+Durable MongoDB-backed queue of document processing jobs, file content kept in GridFS
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from app.core.config import settings
+from app.core.logging import request_id_var
+from app.db.session import get_database
+
+JOBS_COLLECTION = "ingestion_jobs"
+UPLOADS_BUCKET = "ingestion_uploads"
+
+# Job types
+PROCESS = "process"  # first upload: RAGService.process_document
+UPDATE = "update"    # new version: RAGService.update_document
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class UploadTooLarge(ValueError):
+    """Upload exceeded the size cap while it was being stored"""
+
+
+class IngestionJobQueue:
+    """
+    Jobs are claimed atomically with a lease, one running job per document.
+    A worker extends the lease with heartbeats while it processes the job; if
+    the worker dies the lease runs out and another worker reclaims the job.
+    Failed attempts are retried with exponential backoff up to max_attempts.
+    """
+
+    def __init__(self, lease_seconds: int, max_attempts: int, retry_base_seconds: float):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+    @property
+    def jobs(self):
+        return get_database()[JOBS_COLLECTION]
+
+    @property
+    def uploads(self) -> AsyncIOMotorGridFSBucket:
+        return AsyncIOMotorGridFSBucket(get_database(), bucket_name=UPLOADS_BUCKET)
+
+    async def ensure_indexes(self):
+        await self.jobs.create_index([("status", ASCENDING), ("run_after", ASCENDING)])
+        await self.jobs.create_index([("status", ASCENDING), ("lease_until", ASCENDING)])
+        await self.jobs.create_index([("document_id", ASCENDING), ("created_at", DESCENDING)])
+
+    async def store_upload(self, filename: str, file, max_bytes: int) -> Tuple[ObjectId, int]:
+        """
+        Stream an upload (anything with an async read(size), e.g. UploadFile)
+        into GridFS chunk by chunk, returning (file_id, size). Raises
+        UploadTooLarge, leaving nothing stored, once more than max_bytes arrive.
+        """
+        grid_in = self.uploads.open_upload_stream(filename)
+        size = 0
+        try:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                await grid_in.write(chunk)
+        except BaseException:
+            await grid_in.abort()
+            raise
+        await grid_in.close()
+        return grid_in._id, size
+
+    async def enqueue(
+        self,
+        job_type: str,
+        document_id: str,
+        filename: str,
+        file_id: ObjectId,
+        is_company_policy: bool,
+        uploaded_by: Optional[str] = None,
+        metadata_changed: bool = False
+    ) -> str:
+        """
+        Queue a job for an upload stored with store_upload, returning the job
+        ID. The job records the current request ID for the worker's logs.
+        """
+        now = datetime.utcnow()
+        job = {
+            "type": job_type,
+            "document_id": document_id,
+            "filename": filename,
+            "file_id": file_id,
+            "is_company_policy": is_company_policy,
+            "uploaded_by": uploaded_by,
+            "metadata_changed": metadata_changed,
+            "request_id": request_id_var.get(),
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "run_after": now,
+            "lease_until": None,
+            "worker_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await self.jobs.insert_one(job)
+        return str(result.inserted_id)
+
+    async def discard_upload(self, file_id: ObjectId):
+        """Remove a stored upload that will not be queued"""
+        await self.uploads.delete(file_id)
+
+    async def claim(self, worker_id: str) -> Optional[dict]:
+        """
+        Lease the oldest runnable job (queued and due, or running with an
+        expired lease) of a document that has no other job running, so jobs
+        of one document never run at the same time
+        """
+        now = datetime.utcnow()
+        busy = await self.jobs.distinct("document_id", {"status": RUNNING, "lease_until": {"$gte": now}})
+        job = await self.jobs.find_one_and_update(
+            {
+                "document_id": {"$nin": busy},
+                "$or": [
+                    {"status": QUEUED, "run_after": {"$lte": now}},
+                    {
+                        "status": RUNNING,
+                        "lease_until": {"$lt": now},
+                        "$expr": {"$lt": ["$attempts", "$max_attempts"]}
+                    }
+                ]
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "worker_id": worker_id,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            return None
+        # Another worker may have claimed a job of the same document since `busy` was read;
+        # whoever sees the other running backs off (both may, neither keeps a conflicting claim)
+        other = await self.jobs.find_one({
+            "document_id": job["document_id"],
+            "_id": {"$ne": job["_id"]},
+            "status": RUNNING,
+            "lease_until": {"$gte": now}
+        }, {"_id": 1})
+        if other is not None:
+            await self._release(job)
+            return None
+        return job
+
+    async def _release(self, job: dict):
+        """Give a claimed job back to the queue without counting an attempt"""
+        now = datetime.utcnow()
+        await self.jobs.update_one(
+            {"_id": job["_id"], "worker_id": job["worker_id"], "status": RUNNING},
+            {
+                "$set": {
+                    "status": QUEUED,
+                    "run_after": now + timedelta(seconds=random.uniform(0, settings.INGEST_JOB_POLL_INTERVAL)),
+                    "lease_until": None,
+                    "worker_id": None,
+                    "updated_at": now
+                },
+                "$inc": {"attempts": -1}
+            }
+        )
+
+    async def heartbeat(self, job: dict) -> bool:
+        """Extend the lease; False means the job was reclaimed by another worker"""
+        now = datetime.utcnow()
+        result = await self.jobs.update_one(
+            {"_id": job["_id"], "worker_id": job["worker_id"], "status": RUNNING},
+            {"$set": {"lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+        )
+        return result.modified_count == 1
+
+    async def download_to(self, job: dict, path: str):
+        """Write the job's upload to path one GridFS chunk at a time"""
+        with open(path, "wb") as destination:
+            await self.uploads.download_to_stream(job["file_id"], destination)
+
+    async def complete(self, job: dict, stats: dict) -> bool:
+        """Mark the job completed; False means another worker reclaimed it meanwhile"""
+        result = await self.jobs.update_one(
+            {"_id": job["_id"], "worker_id": job["worker_id"], "status": RUNNING},
+            {"$set": {"status": COMPLETED, "stats": stats, "error": None, "updated_at": datetime.utcnow()}}
+        )
+        if not result.modified_count:
+            # The new owner still needs the upload
+            return False
+        await self.uploads.delete(job["file_id"])
+        return True
+
+    async def fail(self, job: dict, error: str) -> Optional[bool]:
+        """
+        Record a failed attempt; returns True if the job will be retried,
+        False if it failed for good and None if another worker reclaimed it
+        """
+        now = datetime.utcnow()
+        owned = {"_id": job["_id"], "worker_id": job["worker_id"], "status": RUNNING}
+        if job["attempts"] < job["max_attempts"]:
+            delay = self.retry_base_seconds * 2 ** (job["attempts"] - 1)
+            result = await self.jobs.update_one(
+                owned,
+                {"$set": {
+                    "status": QUEUED,
+                    "run_after": now + timedelta(seconds=delay),
+                    "lease_until": None,
+                    "error": error,
+                    "updated_at": now
+                }}
+            )
+            return True if result.modified_count else None
+        result = await self.jobs.update_one(owned, {"$set": {"status": FAILED, "error": error, "updated_at": now}})
+        if not result.modified_count:
+            return None
+        await self.uploads.delete(job["file_id"])
+        return False
+
+    async def fail_abandoned(self) -> list:
+        """
+        Fail jobs whose lease expired on their last attempt (the worker died
+        every time), returning their document IDs.
+        """
+        now = datetime.utcnow()
+        document_ids = []
+        cursor = self.jobs.find({
+            "status": RUNNING,
+            "lease_until": {"$lt": now},
+            "$expr": {"$gte": ["$attempts", "$max_attempts"]}
+        })
+        async for job in cursor:
+            result = await self.jobs.update_one(
+                {"_id": job["_id"], "status": RUNNING, "lease_until": job["lease_until"]},
+                {"$set": {"status": FAILED, "error": "Lease expired on final attempt", "updated_at": now}}
+            )
+            if result.modified_count:
+                await self.uploads.delete(job["file_id"])
+                document_ids.append(job["document_id"])
+        return document_ids
+
+    async def cancel_for_document(self, document_id: str):
+        """Cancel queued jobs of a deleted document"""
+        cursor = self.jobs.find({"document_id": document_id, "status": QUEUED}, {"file_id": 1})
+        async for job in cursor:
+            result = await self.jobs.update_one(
+                {"_id": job["_id"], "status": QUEUED},
+                {"$set": {"status": CANCELLED, "updated_at": datetime.utcnow()}}
+            )
+            if result.modified_count:
+                await self.uploads.delete(job["file_id"])
+
+    async def active_document_ids(self, document_ids: list) -> set:
+        """Which of the documents have a queued or running job"""
+        cursor = self.jobs.find(
+            {"document_id": {"$in": document_ids}, "status": {"$in": [QUEUED, RUNNING]}},
+            {"document_id": 1}
+        )
+        return {job["document_id"] async for job in cursor}
+
+    async def latest_for_document(self, document_id: str) -> Optional[dict]:
+        return await self.jobs.find_one({"document_id": document_id}, sort=[("created_at", DESCENDING)])
+
+
+def job_status(job: dict) -> dict:
+    """Public view of a job for the status API"""
+    return {
+        "id": str(job["_id"]),
+        "type": job["type"],
+        "document_id": job["document_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "error": job.get("error"),
+        "stats": job.get("stats"),
+        "run_after": job.get("run_after"),
+        "created_at": job["created_at"],
+        "updated_at": job.get("updated_at")
+    }
+
+
+job_queue = IngestionJobQueue(
+    lease_seconds=settings.INGEST_JOB_LEASE_SECONDS,
+    max_attempts=settings.INGEST_JOB_MAX_ATTEMPTS,
+    retry_base_seconds=settings.INGEST_JOB_RETRY_BASE
+)
@@ -0,0 +1,70 @@
+"""
+PGVector Retriever
+Similarity or hybrid (full-text + vector, reciprocal rank fusion) search over the
+partitions a user may see, with filters pushed into SQL
+"""
+from typing import Any, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from app.core.logging import span
+from app.db.vector_store import Partition, hybrid_search, similarity_search
+
+
+class PGVectorRetriever(BaseRetriever):
+    """
+    Retriever over the PGVector partitions using the SQL in app.db.vector_store.
+    search_type "hybrid" ranks chunks by both keyword match and embedding
+    similarity, so exact policy terms ("casual leave", holiday names) are found
+    even when their embeddings rank them low; "similarity" is vector only.
+    Only the given partitions (collections) are searched, and filter
+    (document_id / is_company_policy) is applied inside the query so scoped
+    searches use the metadata indexes. Both can be overridden per call
+    (ainvoke(query, partitions=..., filter=...)), so one retriever serves
+    every user and scope. Async only, like the chat path.
+    """
+
+    engine: Any
+    embeddings: Embeddings
+    partitions: List[Partition] = []
+    search_type: str = "hybrid"
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    filter: Optional[dict] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        raise NotImplementedError("PGVectorRetriever is async only, use ainvoke()")
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        partitions: Optional[List[Partition]] = None,
+        filter: Optional[dict] = None
+    ) -> List[Document]:
+        with span("embed"):
+            embedding = await self.embeddings.aembed_query(query)
+        partitions = partitions if partitions is not None else self.partitions
+        filter = filter if filter is not None else self.filter
+        with span("search"):
+            if self.search_type == "hybrid":
+                results = await hybrid_search(
+                    self.engine,
+                    partitions,
+                    query,
+                    embedding,
+                    k=self.k,
+                    fetch_k=max(self.fetch_k, self.k),
+                    rrf_k=self.rrf_k,
+                    filter=filter
+                )
+            else:
+                results = await similarity_search(
+                    self.engine, partitions, embedding, k=self.k, filter=filter
+                )
+        return [doc for doc, _ in results]
@@ -2,38 +2,175 @@
 RAG Service for MongoDB
 Handles document processing and RAG-based chat
 """
-import os
-import tempfile
-from typing import List, Optional
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from contextlib import aclosing
+from typing import Any, AsyncIterator, List, Optional, Set
+import httpx
+from bson import ObjectId
+from sqlalchemy.ext.asyncio import create_async_engine
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_postgres import PGVector
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
 from app.core.config import settings
+from app.core.logging import current_trace, span
+from app.core.metrics import (
+    CHAT_COALESCED,
+    CHAT_ERRORS,
+    INGEST_CHUNKS,
+    INGEST_CHUNKS_EMBEDDED,
+    INGEST_DOCUMENTS,
+    INGEST_PAGES,
+    INGEST_SECONDS,
+    TokenUsageCallback,
+    observe_chat
+)
 from app.db.session import get_database
+from app.db.vector_store import (
+    Partition,
+    VectorSearchParams,
+    delete_chunks,
+    delete_document_chunks,
+    delete_partitioned_chunks,
+    ensure_ann_index,
+    ensure_embedding_dimensions,
+    ensure_metadata_indexes,
+    ensure_text_search_index,
+    ensure_vector_store,
+    get_collection_document_ids,
+    get_document_chunk_ids,
+    get_partitioned_document_ids,
+    maintenance_lock,
+    move_document_chunks,
+    partition_collection,
+    update_chunk_metadata
+)
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.context_builder import ContextBuilder, PackedContext, cached_token_counter, token_counter
+from app.services.document_parser import DocumentParser
+from app.services.ingestion import ProgressCallback, run_batches, with_backoff
+from app.services.pg_retriever import PGVectorRetriever
+from app.services.reranker import CrossEncoderReranker, RerankingRetriever
+from app.services.embedding_cache import CachedEmbeddings, LRUByteCache, MongoEmbeddingStore, normalize_query
+from app.services.single_flight import SingleFlight
+from app.services.settings_cache import rag_settings_cache, default_rag_settings, LLM_FIELDS, RETRIEVAL_FIELDS
+
+logger = logging.getLogger(__name__)
+
+RAG_PROMPT_TEMPLATE = """You are a helpful AI assistant that answers questions based on provided documents.
+
+Use the following context to answer the user's question. If the context doesn't contain relevant information, say so clearly.
+
+Context:
+{context}
+
+Question: {question}
+
+Answer:"""
+# Parsed once; every chain shares it
+RAG_PROMPT = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
 
 
 class RAGService:
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings(openai_api_key=settings.OPENAI_API_KEY)
-        
-        # PGVector connection for vector store
-        if not settings.PGVECTOR_CONNECTION or not settings.PGVECTOR_COLLECTION:
-            raise ValueError("PGVECTOR_CONNECTION and PGVECTOR_COLLECTION must be set in .env")
-        self.vector_store = PGVector(
-            connection=settings.PGVECTOR_CONNECTION,
-            collection_name=settings.PGVECTOR_COLLECTION,
-            embeddings=self.embeddings,
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        vector_store: Optional[VectorStore] = None
+    ):
+        # Shared HTTP connection pools for all OpenAI calls (embeddings + chat)
+        limits = httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS
+        )
+        self.http_client = httpx.Client(limits=limits)
+        self.http_async_client = httpx.AsyncClient(limits=limits)
+
+        # Embeddings and vector store can be injected (benchmarks use local stand-ins)
+        embeddings = embeddings or OpenAIEmbeddings(
+            openai_api_key=settings.OPENAI_API_KEY,
+            openai_api_base=settings.OPENAI_BASE_URL or None,
+            check_embedding_ctx_length=settings.OPENAI_EMBEDDING_TOKENIZE,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client
         )
+        # Repeated questions reuse their query embedding instead of calling the API
+        self.embeddings = CachedEmbeddings(
+            embeddings,
+            LRUByteCache(settings.EMBEDDING_CACHE_MAX_BYTES),
+            MongoEmbeddingStore(settings.EMBEDDING_CACHE_COLLECTION, settings.EMBEDDING_CACHE_TTL_DAYS)
+            if settings.EMBEDDING_CACHE_PERSISTENT else None,
+            # Unchanged chunks of re-uploaded documents reuse their stored vectors
+            MongoEmbeddingStore(settings.DOCUMENT_EMBEDDING_CACHE_COLLECTION, settings.DOCUMENT_EMBEDDING_CACHE_TTL_DAYS)
+            if settings.DOCUMENT_EMBEDDING_CACHE_ENABLED else None
+        )
+        
+        self.engine = None
+        self.search_params = None
+        if vector_store is None:
+            # PGVector connection for vector store
+            if not settings.PGVECTOR_CONNECTION or not settings.PGVECTOR_COLLECTION:
+                raise ValueError("PGVECTOR_CONNECTION and PGVECTOR_COLLECTION must be set in .env")
+            # One pooled async engine (psycopg) for the whole process instead of one per request
+            self.engine = create_async_engine(
+                settings.PGVECTOR_CONNECTION,
+                pool_size=settings.PGVECTOR_POOL_SIZE,
+                max_overflow=settings.PGVECTOR_MAX_OVERFLOW,
+                pool_recycle=settings.PGVECTOR_POOL_RECYCLE,
+                pool_pre_ping=True
+            )
+            # hnsw.ef_search / ivfflat.probes follow rag_settings on every pooled connection
+            self.search_params = VectorSearchParams(self.engine)
+            vector_store = PGVector(
+                connection=self.engine,
+                collection_name=settings.PGVECTOR_COLLECTION,
+                embeddings=self.embeddings,
+                embedding_length=settings.EMBEDDING_DIMENSIONS,
+            )
+        self.vector_store = vector_store
+        # PGVector stores of the per-uploader / company-policy partitions, by collection name
+        self._partition_stores = {}
+        self._partition_locks = defaultdict(asyncio.Lock)
         
-        # Create LLM instance
+        # LLM and the RAG chain over it, rebuilt only when the LLM settings change
         self.llm = None
-        self._initialize_llm()
-        # Keep last retrieved docs for debugging/inspection (not returned in API response)
-        self.last_retrieved_docs = []
+        self.rag_chain = None
+        self._llm_key = None
+        self._ensure_llm(default_rag_settings())
+        # One retriever for every user and scope, rebuilt only when the retrieval settings change
+        self._retriever_key = None
+        self._retriever = None
+        # Recent answers reused for near-identical questions (cleared when documents change)
+        self.answer_cache = SemanticAnswerCache(
+            threshold=settings.ANSWER_CACHE_THRESHOLD,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.ANSWER_CACHE_TTL
+        ) if settings.ANSWER_CACHE_ENABLED else None
+        # Identical questions in flight at the same time are answered once
+        self.chat_flights = SingleFlight() if settings.CHAT_COALESCING_ENABLED else None
+        # Cross-encoder for the optional rerank stage (model loaded on first use)
+        self.reranker = CrossEncoderReranker(
+            settings.RERANK_MODEL,
+            batch_size=settings.RERANK_BATCH_SIZE,
+            threads=settings.RERANK_THREADS or None,
+            cache_dir=settings.RERANK_CACHE_DIR or None
+        )
+        # Retrieved chunks are merged, deduplicated and fitted to the model's context window
+        self.context_builder = ContextBuilder(
+            response_tokens=settings.CONTEXT_RESPONSE_TOKENS,
+            max_tokens=settings.CONTEXT_MAX_TOKENS,
+            dedup_threshold=settings.CONTEXT_DEDUP_THRESHOLD
+        )
+        # Parsing/chunking runs in worker processes, off the event loop
+        self.parser = DocumentParser(processes=settings.PARSER_PROCESSES)
+        # Index builds and the legacy chunk migration, run in the background after startup
+        self._maintenance: Optional[asyncio.Task] = None
     
     def _initialize_llm(self, model_name: str = None, temperature: float = None, top_p: float = None):
         """Initialize the LLM with specified settings"""
@@ -41,245 +178,869 @@ class RAGService:
         temperature = temperature if temperature is not None else settings.TEMPERATURE
         top_p = top_p if top_p is not None else settings.TOP_P
         
-        # Log the LLM initialization with parameters
-        print(f"\n[LLM INIT] Initializing ChatOpenAI with:")
-        print(f"  - model_name: {model_name}")
-        print(f"  - temperature: {temperature}")
-        print(f"  - top_p: {top_p}")
-        
+        logger.info(
+            "Initializing ChatOpenAI",
+            extra={"model_name": model_name, "temperature": temperature, "top_p": top_p}
+        )
         self.llm = ChatOpenAI(
             model_name=model_name,
             temperature=temperature,
             top_p=top_p,
-            openai_api_key=settings.OPENAI_API_KEY
+            openai_api_key=settings.OPENAI_API_KEY,
+            openai_api_base=settings.OPENAI_BASE_URL or None,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            # Token usage is reported for streamed answers too
+            stream_usage=True,
+            callbacks=[TokenUsageCallback(model_name)]
         )
-        print(f"[LLM INIT] ChatOpenAI initialized successfully\n")
+
+    async def close(self):
+        """Release pooled Postgres and HTTP connections and parser processes"""
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            try:
+                await self._maintenance
+            except asyncio.CancelledError:
+                pass
+            self._maintenance = None
+        if self.engine is not None:
+            await self.engine.dispose()
+        self.parser.close()
+        self.http_client.close()
+        await self.http_async_client.aclose()
         
+    def _ensure_llm(self, rag_settings: dict):
+        """Rebuild the LLM and RAG chain only when model_name, temperature or top_p changed"""
+        llm_key = tuple(rag_settings.get(field) for field in LLM_FIELDS)
+        if llm_key == self._llm_key:
+            return
+        self._initialize_llm(
+            model_name=rag_settings.get("model_name"),
+            temperature=rag_settings.get("temperature"),
+            top_p=rag_settings.get("top_p")
+        )
+        self.rag_chain = self._create_rag_chain(self.llm)
+        self._llm_key = llm_key
+
+    @staticmethod
+    async def _token_counter(model_name: str):
+        """The model's token counter, loaded off the event loop (tiktoken may download it)"""
+        count = cached_token_counter(model_name)
+        if count is None:
+            count = await asyncio.to_thread(token_counter, model_name)
+        return count
+
     async def get_settings(self) -> dict:
-        """Get current RAG settings or return defaults"""
-        db = get_database()
-        rag_settings = await db.rag_settings.find_one()
-        
-        if not rag_settings:
-            # Return default settings
-            return {
-                "chunk_size": settings.CHUNK_SIZE,
-                "chunk_overlap": settings.CHUNK_OVERLAP,
-                "temperature": settings.TEMPERATURE,
-                "top_p": settings.TOP_P,
-                "top_k": settings.TOP_K,
-                "model_name": settings.MODEL_NAME
-            }
-        return rag_settings
-    
-    def _create_retriever(self, top_k: int, filter_dict: Optional[dict] = None):
-        """Create a retriever with optional filtering"""
-        print(f"\n[RETRIEVER] Creating retriever with:")
-        print(f"  - top_k (num documents to retrieve): {top_k}")
+        """Get current RAG settings (cached) or return defaults"""
+        return await rag_settings_cache.get()
+
+    @staticmethod
+    def _chat_filter(document_id: Optional[str], use_company_policy: bool) -> Optional[dict]:
+        """Metadata filter for a chat request (None searches every document)"""
+        filter_dict = {}
+        if document_id:
+            filter_dict["document_id"] = document_id
+        if use_company_policy:
+            filter_dict["is_company_policy"] = True
+        return filter_dict or None
+
+    @staticmethod
+    def _visible_partitions(user_id: Optional[str], use_company_policy: bool) -> List[Partition]:
+        """Partitions a chat may search: the shared company-policy one plus the user's own uploads"""
+        partitions = [Partition(partition_collection(settings.PGVECTOR_COLLECTION, True, None), company_policy=True)]
+        if user_id and not use_company_policy:
+            partitions.append(Partition(partition_collection(settings.PGVECTOR_COLLECTION, False, user_id)))
+        return partitions
+
+    def _get_retriever(self, rag_settings: dict):
+        """
+        Get the retriever for the current retrieval settings (rebuilt only when
+        top_k or the search settings change). It is shared by every request:
+        the partitions and filter of a request are passed when it is invoked,
+        see _search_kwargs.
+        """
+        retriever_key = tuple(rag_settings.get(field) for field in RETRIEVAL_FIELDS)
+        if retriever_key != self._retriever_key:
+            self._retriever = self._create_retriever(rag_settings)
+            self._retriever_key = retriever_key
+        return self._retriever
+
+    @staticmethod
+    def _document_search_partitions(uploaded_by: Optional[str]) -> List[Partition]:
+        """
+        Partitions to search for one document of uploaded_by: both it can be
+        in, in case a metadata update is moving it between them
+        """
+        return [
+            Partition(partition_collection(settings.PGVECTOR_COLLECTION, False, uploaded_by)),
+            Partition(partition_collection(settings.PGVECTOR_COLLECTION, True, None), company_policy=True)
+        ]
+
+    async def _document_chat_partitions(self, document_id: str) -> List[Partition]:
+        """
+        Partitions a chat about one document searches: that document's, whoever
+        uploaded it, as every signed-in user can list and open all documents
+        """
+        if not ObjectId.is_valid(document_id):
+            return []
+        document = await get_database().documents.find_one(
+            {"_id": ObjectId(document_id)}, {"uploaded_by": 1}
+        )
+        if document is None:
+            return []
+        return self._document_search_partitions(document.get("uploaded_by"))
+
+    async def _search_kwargs(
+        self,
+        document_id: Optional[str] = None,
+        use_company_policy: bool = False,
+        user_id: Optional[str] = None
+    ) -> dict:
+        """Per-request retriever arguments: the partitions the user may see and the chat filter"""
+        search_kwargs = {}
+        filter_dict = self._chat_filter(document_id, use_company_policy)
         if filter_dict:
-            print(f"  - filter: {filter_dict}")
+            search_kwargs["filter"] = filter_dict
+        if self.engine is not None:
+            if document_id:
+                search_kwargs["partitions"] = await self._document_chat_partitions(document_id)
+            else:
+                search_kwargs["partitions"] = self._visible_partitions(user_id, use_company_policy)
+        return search_kwargs
+
+    async def retrieve(
+        self,
+        query: str,
+        rag_settings: dict,
+        document_id: Optional[str] = None,
+        use_company_policy: bool = False,
+        user_id: Optional[str] = None
+    ) -> List[Document]:
+        """Retrieve the chunks for query from the partitions the user may see"""
+        retriever = self._get_retriever(rag_settings)
+        if self.search_params is not None:
+            self.search_params.update(
+                rag_settings.get("hnsw_ef_search", settings.HNSW_EF_SEARCH),
+                rag_settings.get("ivfflat_probes", settings.IVFFLAT_PROBES)
+            )
+        with span("retrieve"):
+            search_kwargs = await self._search_kwargs(document_id, use_company_policy, user_id)
+            return await retriever.ainvoke(query, **search_kwargs)
+    
+    def _create_retriever(self, rag_settings: dict):
+        """
+        Create a retriever for the retrieval settings, searching the shared
+        partition unless the caller passes partitions / filter per call
+        """
+        top_k = rag_settings.get("top_k", settings.TOP_K)
+        rerank = rag_settings.get("rerank_enabled", settings.RERANK_ENABLED)
+        if rerank and not self.reranker.available:
+            logger.warning("Reranking is enabled but fastembed is not installed; retrieving without it")
+            rerank = False
+        # With reranking, over-fetch candidates; the reranker keeps at most top_k of them
+        fetch = max(rag_settings.get("rerank_fetch_k", settings.RERANK_FETCH_K), top_k) if rerank else top_k
+        search_type = rag_settings.get("search_type", settings.SEARCH_TYPE)
+        if self.engine is None:
+            # Keyword search needs the Postgres tables; injected vector stores use similarity only
+            search_type = "similarity"
+        logger.info(
+            "Creating retriever",
+            extra={
+                "top_k": top_k,
+                "search_type": search_type,
+                "rerank_fetch_k": fetch if rerank else None,
+                "rerank_min_score": rag_settings.get("rerank_min_score", settings.RERANK_MIN_SCORE) if rerank else None
+            }
+        )
         
-        if filter_dict:
-            retriever = self.vector_store.as_retriever(
-                search_type="similarity",
-                search_kwargs={
-                    "k": top_k,
-                    "filter": filter_dict
-                }
+        if self.engine is not None:
+            # Filters go into the SQL so they can use the metadata indexes
+            retriever = PGVectorRetriever(
+                engine=self.engine,
+                embeddings=self.embeddings,
+                partitions=self._visible_partitions(None, False),
+                search_type=search_type,
+                k=fetch,
+                fetch_k=rag_settings.get("hybrid_fetch_k", settings.HYBRID_FETCH_K),
+                rrf_k=rag_settings.get("rrf_k", settings.RRF_K)
             )
         else:
             retriever = self.vector_store.as_retriever(
                 search_type="similarity",
-                search_kwargs={"k": top_k}
+                search_kwargs={"k": fetch}
+            )
+        if rerank:
+            retriever = RerankingRetriever(
+                base_retriever=retriever,
+                reranker=self.reranker,
+                top_n=top_k,
+                min_score=rag_settings.get("rerank_min_score", settings.RERANK_MIN_SCORE)
             )
-        print(f"[RETRIEVER] Retriever created successfully\n")
         return retriever
     
-    def _create_rag_chain(self, retriever, llm_instance):
-        """Create a RAG chain using LCEL (LangChain Expression Language)"""
-        # Define the prompt template
-        template = """You are a helpful AI assistant that answers questions based on provided documents.
+    def _create_rag_chain(self, llm_instance):
+        """
+        Create a RAG chain using LCEL (LangChain Expression Language).
+        The chain takes {"context": str, "question": str}: documents are
+        retrieved and packed once by the caller, which reuses them for sources.
+        Built once per LLM (see _ensure_llm) and shared by every request.
+        """
+        return RAG_PROMPT | llm_instance | StrOutputParser()
+    
+    async def _split_document(
+        self,
+        file_path: str,
+        filename: str,
+        document_id: str,
+        is_company_policy: bool
+    ) -> List[Document]:
+        """Load the file at file_path and split it into chunks tagged with document metadata"""
+        # Get current settings for dynamic chunk configuration
+        rag_settings = await self.get_settings()
+        chunk_size = rag_settings.get("chunk_size", settings.CHUNK_SIZE)
+        chunk_overlap = rag_settings.get("chunk_overlap", settings.CHUNK_OVERLAP)
+        
+        # Parse and split in the process pool (PDF pages in parallel)
+        with span("parse"):
+            pages, splits = await self.parser.parse(file_path, filename, chunk_size, chunk_overlap)
+        INGEST_PAGES.inc(pages)
+        logger.info(
+            "Split %s into %d chunks",
+            filename,
+            len(splits),
+            extra={
+                "document_id": document_id,
+                "pages": pages,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "is_company_policy": is_company_policy
+            }
+        )
+        
+        # Add metadata to each chunk
+        for split in splits:
+            split.metadata.update({
+                "document_id": document_id,
+                "filename": filename,
+                "is_company_policy": is_company_policy
+            })
+        return splits
 
-Use the following context to answer the user's question. If the context doesn't contain relevant information, say so clearly.
+    def _chunk_ids(self, document_id: str, splits: List[Document]) -> List[str]:
+        """
+        Stable chunk IDs derived from document_id and chunk content hash, so the
+        same text in a later version of the document keeps its ID.
+        """
+        ids = []
+        occurrences = {}
+        for split in splits:
+            chunk_hash = self.embeddings.chunk_hash(split.page_content)
+            occurrence = occurrences.get(chunk_hash, 0)
+            occurrences[chunk_hash] = occurrence + 1
+            ids.append(str(uuid.uuid5(uuid.NAMESPACE_URL, f"{document_id}/{chunk_hash}/{occurrence}")))
+        return ids
 
-Context:
-{context}
+    async def _partition_store(self, collection_name: str) -> VectorStore:
+        """PGVector store of one partition, its collection created on first use"""
+        if self.engine is None:
+            return self.vector_store
+        store = self._partition_stores.get(collection_name)
+        if store is not None:
+            return store
+        # Concurrent uploads of a new uploader create its collection once
+        async with self._partition_locks[collection_name]:
+            store = self._partition_stores.get(collection_name)
+            if store is None:
+                store = PGVector(
+                    connection=self.engine,
+                    collection_name=collection_name,
+                    embeddings=self.embeddings,
+                    embedding_length=settings.EMBEDDING_DIMENSIONS,
+                    create_extension=False
+                )
+                await ensure_vector_store(store)
+                self._partition_stores[collection_name] = store
+        return store
 
-Question: {question}
+    @staticmethod
+    def _document_partitions(uploaded_by: Optional[str]) -> List[str]:
+        """Collections a document's chunks can be in: its uploader's partition or the company-policy one"""
+        return list(dict.fromkeys(
+            partition_collection(settings.PGVECTOR_COLLECTION, is_company_policy, uploaded_by)
+            for is_company_policy in (False, True)
+        ))
+
+    async def _embed_and_store(
+        self,
+        store: VectorStore,
+        splits: List[Document],
+        ids: List[str],
+        progress: Optional[ProgressCallback] = None
+    ) -> int:
+        """
+        Embed chunks (reusing cached vectors) and upsert them into store in
+        batches of INGEST_BATCH_SIZE, at most INGEST_CONCURRENCY batches in flight.
+        Returns the number of embedding cache hits.
+        """
+        if not splits:
+            return 0
+
+        async def embed_batch(batch) -> int:
+            texts = [split.page_content for _, split in batch]
+            # Embed only chunks whose content hash is not cached yet
+            vectors, cache_hits = await with_backoff(lambda: self.embeddings.aembed_documents_cached(texts))
+            # One multi-row INSERT ... ON CONFLICT per batch
+            await store.aadd_embeddings(
+                texts=texts,
+                embeddings=vectors,
+                metadatas=[split.metadata for _, split in batch],
+                ids=[chunk_id for chunk_id, _ in batch]
+            )
+            return cache_hits
+
+        with span("embed_store"):
+            cache_hits = await run_batches(
+                list(zip(ids, splits)),
+                embed_batch,
+                batch_size=settings.INGEST_BATCH_SIZE,
+                concurrency=settings.INGEST_CONCURRENCY,
+                progress=progress
+            )
+        INGEST_CHUNKS_EMBEDDED.inc(len(splits))
+        logger.debug("Embedding cache hits: %d/%d", cache_hits, len(splits))
+        return cache_hits
+
+    @staticmethod
+    def _record_ingest(job_type: str, started: float, chunks: int):
+        INGEST_SECONDS.labels(job_type).observe(time.perf_counter() - started)
+        INGEST_DOCUMENTS.labels(job_type, "completed").inc()
+        INGEST_CHUNKS.labels(job_type).inc(chunks)
 
-Answer:"""
-        
-        # Create prompt template
-        prompt = ChatPromptTemplate.from_template(template)
-        
-        # Format documents function
-        def format_docs(docs):
-            return "\n\n".join(doc.page_content for doc in docs)
-        
-        # Create LCEL chain
-        rag_chain = (
-            {"context": retriever | format_docs, "question": RunnablePassthrough()}
-            | prompt
-            | llm_instance
-            | StrOutputParser()
-        )
-        
-        return rag_chain, retriever
-    
     async def process_document(
         self, 
-        file_content: bytes, 
+        file_path: str, 
         filename: str, 
         document_id: str,
-        is_company_policy: bool = False
-    ) -> bool:
-        """Process and embed a document into the vector store"""
+        is_company_policy: bool = False,
+        uploaded_by: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        """
+        Process and embed the uploaded file at file_path into the vector store
+        partition of its uploader (or the company-policy partition).
+        progress(chunks_done, chunks_total) is awaited after every batch.
+        Returns ingestion stats (chunk count, embedding cache hits); errors propagate.
+        """
+        started = time.perf_counter()
         try:
-            # Get current settings from database for dynamic chunk configuration
-            rag_settings = await self.get_settings()
-            chunk_size = rag_settings.get("chunk_size", settings.CHUNK_SIZE)
-            chunk_overlap = rag_settings.get("chunk_overlap", settings.CHUNK_OVERLAP)
-            
-            print(f"\n[DOCUMENT PROCESSING] Processing: {filename}")
-            print(f"  - document_id: {document_id}")
-            print(f"  - chunk_size (from DB): {chunk_size}")
-            print(f"  - chunk_overlap (from DB): {chunk_overlap}")
-            print(f"  - is_company_policy: {is_company_policy}")
-            
-            # Save file temporarily
-            file_extension = os.path.splitext(filename)[1].lower()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-                tmp_file.write(file_content)
-                tmp_path = tmp_file.name
+            splits = await self._split_document(file_path, filename, document_id, is_company_policy)
+            store = await self._partition_store(
+                partition_collection(settings.PGVECTOR_COLLECTION, is_company_policy, uploaded_by)
+            )
+            cache_hits = await self._embed_and_store(store, splits, self._chunk_ids(document_id, splits), progress)
+            logger.info(
+                "Indexed %s",
+                filename,
+                extra={"document_id": document_id, "chunks": len(splits), "embedding_cache_hits": cache_hits}
+            )
+            self._record_ingest("process", started, len(splits))
             
-            # Load document based on file type
-            if file_extension == '.pdf':
-                loader = PyPDFLoader(tmp_path)
-            elif file_extension in ['.docx', '.doc']:
-                loader = Docx2txtLoader(tmp_path)
-            elif file_extension == '.txt':
-                loader = TextLoader(tmp_path)
-            else:
-                raise ValueError(f"Unsupported file type: {file_extension}")
+            return {
+                "chunk_count": len(splits),
+                "embedding_cache_hits": cache_hits,
+                "embedding_cache_hit_ratio": round(cache_hits / len(splits), 4) if splits else 0.0
+            }
+        except Exception:
+            # The caller records the error (the worker stores it on the job)
+            INGEST_DOCUMENTS.labels("process", "failed").inc()
+            raise
+
+    async def update_document(
+        self,
+        file_path: str,
+        filename: str,
+        document_id: str,
+        is_company_policy: bool = False,
+        metadata_changed: bool = False,
+        uploaded_by: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> dict:
+        """
+        Re-index a new version of a document by diffing stable chunk IDs:
+        only new chunks are embedded and inserted, only removed chunks are deleted.
+        Unchanged chunks move partition when is_company_policy changed.
+        Returns diff stats; errors propagate.
+        """
+        started = time.perf_counter()
+        try:
+            splits = await self._split_document(file_path, filename, document_id, is_company_policy)
+            ids = self._chunk_ids(document_id, splits)
+            partition = partition_collection(settings.PGVECTOR_COLLECTION, is_company_policy, uploaded_by)
+            store = await self._partition_store(partition)
+            document_partitions = self._document_partitions(uploaded_by)
+            existing_ids = await get_document_chunk_ids(self.engine, document_partitions, document_id)
             
-            documents = loader.load()
-            print(f"  - loaded {len(documents)} pages/sections")
+            added = [(chunk_id, split) for chunk_id, split in zip(ids, splits) if chunk_id not in existing_ids]
+            removed_ids = existing_ids - set(ids)
+            kept_ids = existing_ids & set(ids)
             
-            # Split documents into chunks using settings from database
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap
+            # Insert before deleting so the document never disappears from search mid-update
+            cache_hits = await self._embed_and_store(
+                store,
+                [split for _, split in added],
+                [chunk_id for chunk_id, _ in added],
+                progress
             )
-            splits = text_splitter.split_documents(documents)
-            print(f"  - created {len(splits)} chunks with chunk_size={chunk_size}, overlap={chunk_overlap}")
-            
-            # Add metadata to each chunk
-            for split in splits:
-                split.metadata.update({
+            if removed_ids:
+                # Chunks live in the uploader's or the company-policy partition, not the base collection
+                await delete_chunks(self.engine, document_partitions, document_id, list(removed_ids))
+            if metadata_changed and kept_ids:
+                await update_chunk_metadata(
+                    self.engine,
+                    list(kept_ids),
+                    {"filename": filename, "is_company_policy": is_company_policy}
+                )
+                await move_document_chunks(
+                    self.engine,
+                    document_id,
+                    [name for name in document_partitions if name != partition],
+                    partition
+                )
+            logger.info(
+                "Re-indexed %s",
+                filename,
+                extra={
                     "document_id": document_id,
-                    "filename": filename,
-                    "is_company_policy": is_company_policy
-                })
-            
-            # Add to vector store
-            self.vector_store.add_documents(splits)
-            print(f"[DOCUMENT PROCESSING] Successfully added {len(splits)} chunks to vector store\n")
-            
-            # Clean up temporary file
-            os.unlink(tmp_path)
+                    "chunks_added": len(added),
+                    "chunks_removed": len(removed_ids),
+                    "chunks_unchanged": len(kept_ids),
+                    "embedding_cache_hits": cache_hits
+                }
+            )
+            self._record_ingest("update", started, len(splits))
             
-            return True
-        except Exception as e:
-            print(f"[DOCUMENT PROCESSING] Error processing document: {e}\n")
-            return False
+            return {
+                "chunk_count": len(splits),
+                "chunks_added": len(added),
+                "chunks_removed": len(removed_ids),
+                "chunks_unchanged": len(kept_ids),
+                "embedding_cache_hits": cache_hits,
+                "embedding_cache_hit_ratio": round(cache_hits / len(added), 4) if added else 0.0
+            }
+        except Exception:
+            INGEST_DOCUMENTS.labels("update", "failed").inc()
+            raise
     
+    async def _load_chat_settings(self) -> dict:
+        """Get latest settings (cached, refreshed on change)"""
+        with span("settings"):
+            rag_settings = await self.get_settings()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Chat settings", extra={
+                field: rag_settings.get(field)
+                for field in ("version", "model_name", "temperature", "top_p", "top_k", "search_type")
+            })
+        return rag_settings
+
+    async def _lookup_answer(
+        self,
+        query: str,
+        rag_settings: dict,
+        document_id: Optional[str],
+        use_company_policy: bool,
+        user_id: Optional[str]
+    ):
+        """
+        Return (scope, query_vector, cached answer or None) from the semantic
+        answer cache. The scope carries the cache generation, so an answer
+        retrieved from a corpus that changed meanwhile is not stored.
+        """
+        if self.answer_cache is None:
+            return None, None, None
+        scope = (
+            self.answer_cache.scope(rag_settings, document_id, use_company_policy, user_id),
+            self.answer_cache.generation
+        )
+        with span("embed"):
+            query_vector = await self.embeddings.aembed_query(query)
+        cached = self.answer_cache.lookup(scope[0], query_vector)
+        if cached is not None:
+            logger.info("Answer cache hit")
+        return scope, query_vector, cached
+
+    def _store_answer(self, scope, query_vector, answer: str, source_docs: List[str]):
+        if self.answer_cache is not None:
+            scope, generation = scope
+            self.answer_cache.store(scope, query_vector, answer, source_docs, generation)
+
+    async def _prepare_chat(
+        self,
+        query: str,
+        rag_settings: dict,
+        document_id: Optional[str] = None,
+        use_company_policy: bool = False,
+        user_id: Optional[str] = None
+    ):
+        """
+        Retrieve documents once (from the partitions the user may see), pack
+        them into the prompt context and return it with the RAG chain
+        """
+        # Reinitialize LLM and chain only if model or sampling parameters changed
+        self._ensure_llm(rag_settings)
+        count = await self._token_counter(self.llm.model_name)
+
+        # Retrieve relevant documents
+        retrieved_docs = await self.retrieve(query, rag_settings, document_id, use_company_policy, user_id)
+        if retrieved_docs and logger.isEnabledFor(logging.DEBUG):
+            sample = retrieved_docs[0]
+            logger.debug(
+                "Retrieved %d chunks, first: %s",
+                len(retrieved_docs),
+                sample.page_content[:100],
+                extra={"chunk_metadata": sample.metadata}
+            )
+
+        # Merge overlapping chunks, drop near-duplicates, fit the model's context window
+        with span("pack"):
+            context = self.context_builder.build(
+                retrieved_docs, self.llm.model_name, RAG_PROMPT_TEMPLATE + query, count
+            )
+
+        return context, self.rag_chain
+
+    @staticmethod
+    def _record_chat(mode: str, started: float, context: Optional[PackedContext], answer: str):
+        """
+        Chat duration and the request's stage timings into the metrics, and one
+        log line per answered chat (context is None for cached answers)
+        """
+        seconds = time.perf_counter() - started
+        trace = current_trace()
+        observe_chat(mode, context is None, seconds, trace.spans if trace else None)
+        message = "Chat streamed" if mode == "stream" else "Chat answered"
+        if context is None:
+            message += " from cache"
+        fields = {
+            "duration_ms": round(seconds * 1000, 2),
+            "answer_chars": len(answer),
+            "spans_ms": trace.spans_ms() if trace else None
+        }
+        if context is not None:
+            fields.update(
+                chunks=context.chunks,
+                passages=context.blocks,
+                context_tokens=context.tokens,
+                tokens_saved=context.tokens_saved
+            )
+        logger.info(message, extra=fields)
+
+    @staticmethod
+    def _record_coalesced(mode: str, started: float):
+        """A chat answered by joining an identical one already in flight"""
+        CHAT_COALESCED.labels(mode).inc()
+        logger.info(
+            "Chat joined an identical one in flight",
+            extra={"mode": mode, "duration_ms": round((time.perf_counter() - started) * 1000, 2)}
+        )
+
+    @staticmethod
+    def _flight_key(
+        query: str,
+        rag_settings: dict,
+        document_id: Optional[str],
+        use_company_policy: bool,
+        user_id: Optional[str]
+    ) -> tuple:
+        # Same scope rule as the answer cache: company-policy answers are shared between users
+        return (
+            normalize_query(query),
+            rag_settings.get("version", 0),
+            document_id,
+            use_company_policy,
+            None if use_company_policy else user_id
+        )
+
+    @staticmethod
+    def _source_filenames(docs) -> List[str]:
+        """Unique source filenames in retrieval order"""
+        source_docs = []
+        for doc in docs:
+            filename = doc.metadata.get("filename", "Unknown")
+            if filename not in source_docs:
+                source_docs.append(filename)
+        return source_docs
+
     async def chat(
         self, 
         query: str, 
         document_id: Optional[str] = None,
-        use_company_policy: bool = False
+        use_company_policy: bool = False,
+        user_id: Optional[str] = None
     ) -> tuple[str, List[str]]:
-        """Chat with documents using RAG chain - LCEL approach"""
+        """
+        Chat with documents using RAG chain - LCEL approach. Concurrent chats
+        with the same normalized question, scope and settings version share
+        one answer.
+        """
+        started = time.perf_counter()
         try:
-            print(f"\n{'='*70}")
-            print(f"[CHAT REQUEST] Received query: {query[:100]}...")
-            print(f"{'='*70}")
-            
-            # Get latest settings from database
-            rag_settings = await self.get_settings()
-            
-            print(f"\n[SETTINGS LOADED FROM DB]")
-            print(f"  - chunk_size: {rag_settings.get('chunk_size')}")
-            print(f"  - chunk_overlap: {rag_settings.get('chunk_overlap')}")
-            print(f"  - temperature: {rag_settings.get('temperature')}")
-            print(f"  - top_p: {rag_settings.get('top_p')}")
-            print(f"  - top_k: {rag_settings.get('top_k')}")
-            print(f"  - model_name: {rag_settings.get('model_name')}")
-            
-            top_k = rag_settings.get("top_k", settings.TOP_K)
-            
-            # Reinitialize LLM with latest settings to ensure model and parameters are up-to-date
-            self._initialize_llm(
-                model_name=rag_settings.get("model_name"),
-                temperature=rag_settings.get("temperature"),
-                top_p=rag_settings.get("top_p")
+            rag_settings = await self._load_chat_settings()
+            if self.chat_flights is None:
+                return await self._answer(query, rag_settings, document_id, use_company_policy, user_id, started)
+            key = self._flight_key(query, rag_settings, document_id, use_company_policy, user_id)
+            (answer, source_docs), joined = await self.chat_flights.run(
+                key, lambda: self._answer(query, rag_settings, document_id, use_company_policy, user_id, started)
             )
-
-            # Create retriever with top_k from settings
-            retriever = self._create_retriever(top_k, None)
-            
-            # Retrieve relevant documents
-            retrieved_docs = retriever.invoke(query)
-            self.last_retrieved_docs = retrieved_docs
-            
-            print(f"\n[RETRIEVAL RESULTS]")
-            print(f"  - Retrieved {len(retrieved_docs)} documents with top_k={top_k}")
-            if retrieved_docs:
-                sample = retrieved_docs[0]
-                print(f"  - Sample metadata: {sample.metadata}")
-                print(f"  - Sample content (first 100 chars): {sample.page_content[:100]}...")
-
-            # Create RAG chain with the selected retriever
-            print(f"\n[RAG CHAIN] Building RAG chain with LLM parameters:")
-            print(f"  - LLM Model: {self.llm.model_name}")
-            print(f"  - Temperature: {self.llm.temperature}")
-            print(f"  - Top P: {self.llm.top_p}")
-            
-            rag_chain, retriever_obj = self._create_rag_chain(retriever, self.llm)
-
-            # Invoke the RAG chain
-            print(f"\n[INVOKING RAG CHAIN] Processing query with LLM...")
-            answer = rag_chain.invoke(query)
-            print(f"[RAG CHAIN] Response received (length: {len(answer)} chars)\n")
-
-            # Extract source documents
-            source_docs = []
-            for doc in retrieved_docs:
-                filename = doc.metadata.get("filename", "Unknown")
-                if filename not in source_docs:
-                    source_docs.append(filename)
-
-            print(f"[CHAT COMPLETE] Sources: {source_docs}")
-            print(f"{'='*70}\n")
-            
+            if joined:
+                self._record_coalesced("chat", started)
             return answer, source_docs
 
         except Exception as e:
-            print(f"\n[CHAT ERROR] {str(e)}")
-            import traceback
-            traceback.print_exc()
-            print(f"{'='*70}\n")
+            logger.exception("Chat failed")
+            CHAT_ERRORS.labels("chat").inc()
             return f"Error: {str(e)}", []
-    
-    async def delete_document_embeddings(self, document_id: str) -> bool:
-        """Delete document embeddings from vector store"""
+
+    async def _answer(
+        self,
+        query: str,
+        rag_settings: dict,
+        document_id: Optional[str],
+        use_company_policy: bool,
+        user_id: Optional[str],
+        started: float
+    ) -> tuple[str, List[str]]:
+        """Answer from the answer cache or the RAG chain, returning (answer, source filenames)"""
+        scope, query_vector, cached = await self._lookup_answer(
+            query, rag_settings, document_id, use_company_policy, user_id
+        )
+        if cached is not None:
+            self._record_chat("chat", started, None, cached.answer)
+            return cached.answer, cached.source_documents
+
+        context, rag_chain = await self._prepare_chat(
+            query, rag_settings, document_id, use_company_policy, user_id
+        )
+
+        # Invoke the RAG chain
+        with span("llm"):
+            answer = await rag_chain.ainvoke({"context": context.text, "question": query})
+
+        # Extract source documents
+        source_docs = self._source_filenames(context.docs)
+
+        self._store_answer(scope, query_vector, answer, source_docs)
+        self._record_chat("chat", started, context, answer)
+        return answer, source_docs
+
+    async def chat_stream(
+        self,
+        query: str,
+        document_id: Optional[str] = None,
+        use_company_policy: bool = False,
+        user_id: Optional[str] = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Stream a RAG answer as (event, data) pairs: one "sources" event with
+        the source filenames, a "token" event per generated chunk, then "done".
+        Concurrent streams of the same normalized question, scope and settings
+        version share one upstream stream. Closing the generator (client
+        disconnect) cancels the upstream LLM call once no other stream shares it.
+        """
+        started = time.perf_counter()
+        try:
+            rag_settings = await self._load_chat_settings()
+        except Exception as e:
+            logger.exception("Chat stream failed")
+            CHAT_ERRORS.labels("stream").inc()
+            yield "error", f"Error: {str(e)}"
+            return
+
+        produce = lambda: self._stream_answer(query, rag_settings, document_id, use_company_policy, user_id, started)
+        if self.chat_flights is None:
+            events, joined = produce(), False
+        else:
+            key = self._flight_key(query, rag_settings, document_id, use_company_policy, user_id)
+            events, joined = self.chat_flights.stream(key, produce)
+        async with aclosing(events):
+            async for event, data in events:
+                yield event, data
+        if joined:
+            self._record_coalesced("stream", started)
+
+    async def _stream_answer(
+        self,
+        query: str,
+        rag_settings: dict,
+        document_id: Optional[str],
+        use_company_policy: bool,
+        user_id: Optional[str],
+        started: float
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """chat_stream events from the answer cache or the streamed RAG chain"""
         try:
-            # Pinecone delete by metadata filter
-            self.vector_store.delete(
-                ids=None,
-                filter={"document_id": document_id}
+            scope, query_vector, cached = await self._lookup_answer(
+                query, rag_settings, document_id, use_company_policy, user_id
             )
-            return True
+            if cached is not None:
+                self._record_chat("stream", started, None, cached.answer)
+                yield "sources", cached.source_documents
+                yield "token", cached.answer
+                yield "done", None
+                return
+
+            context, rag_chain = await self._prepare_chat(
+                query, rag_settings, document_id, use_company_policy, user_id
+            )
+            source_docs = self._source_filenames(context.docs)
+            yield "sources", source_docs
+
+            tokens = []
+            with span("llm"):
+                async with aclosing(rag_chain.astream({"context": context.text, "question": query})) as stream:
+                    async for token in stream:
+                        tokens.append(token)
+                        yield "token", token
+            answer = "".join(tokens)
+            self._store_answer(scope, query_vector, answer, source_docs)
+            self._record_chat("stream", started, context, answer)
+            yield "done", None
         except Exception as e:
-            print(f"Error deleting document embeddings: {e}")
-            return False
+            logger.exception("Chat stream failed")
+            CHAT_ERRORS.labels("stream").inc()
+            yield "error", f"Error: {str(e)}"
+    
+    async def ensure_vector_indexes(self):
+        """Create the PGVector tables and the full-text, metadata and ANN indexes (idempotent)"""
+        if self.engine is None:
+            return
+        await ensure_vector_store(self.vector_store)
+        await ensure_text_search_index(self.engine)
+        await ensure_metadata_indexes(self.engine)
+        if settings.VECTOR_INDEX_TYPE == "none" or await ensure_embedding_dimensions(
+            self.engine, settings.EMBEDDING_DIMENSIONS
+        ):
+            await ensure_ann_index(
+                self.engine,
+                settings.VECTOR_INDEX_TYPE,
+                hnsw_m=settings.HNSW_M,
+                hnsw_ef_construction=settings.HNSW_EF_CONSTRUCTION,
+                ivfflat_lists=settings.IVFFLAT_LISTS
+            )
+
+    def start_maintenance(self):
+        """Partition legacy chunks and build the vector indexes in the background"""
+        if self.engine is not None and self._maintenance is None:
+            self._maintenance = asyncio.create_task(self._maintain_vector_store())
+
+    async def _maintain_vector_store(self):
+        """
+        Vector store upkeep under the maintenance advisory lock, so parallel
+        API workers and the ingestion worker do not build the same indexes;
+        the others skip it. Chats search only the partitions, so chunks stored
+        before partitioning are moved first, right after the partition index
+        that makes moving them cheap; the full-text and ANN builds, which can
+        take hours on a large table, come last. Each step runs even if an
+        earlier one failed, and failures are logged.
+        """
+        steps = (
+            ("partition index", lambda: ensure_metadata_indexes(self.engine)),
+            ("legacy chunk migration", self.partition_legacy_chunks),
+            ("vector indexes", self.ensure_vector_indexes)
+        )
+        try:
+            async with maintenance_lock(self.engine) as locked:
+                if not locked:
+                    logger.info("Vector store maintenance is running in another process")
+                    return
+                started = time.perf_counter()
+                for name, step in steps:
+                    try:
+                        await step()
+                    except Exception:
+                        logger.exception("Vector store maintenance step failed: %s", name)
+                logger.info("Vector store maintenance done in %.1fs", time.perf_counter() - started)
+        except Exception:
+            logger.exception("Vector store maintenance failed")
+
+    async def partition_legacy_chunks(self):
+        """
+        Move chunks stored before partitioning (directly in PGVECTOR_COLLECTION)
+        into their uploader's or the company-policy partition. Idempotent.
+        """
+        if self.engine is None:
+            return
+        document_ids = [
+            ObjectId(document_id)
+            for document_id in await get_collection_document_ids(self.engine, settings.PGVECTOR_COLLECTION)
+            if ObjectId.is_valid(document_id)
+        ]
+        if not document_ids:
+            return
+        moved = 0
+        cursor = get_database().documents.find(
+            {"_id": {"$in": document_ids}}, {"uploaded_by": 1, "is_company_policy": 1}
+        )
+        async for document in cursor:
+            partition = partition_collection(
+                settings.PGVECTOR_COLLECTION, document.get("is_company_policy", False), document.get("uploaded_by")
+            )
+            await self._partition_store(partition)
+            moved += await move_document_chunks(
+                self.engine, str(document["_id"]), [settings.PGVECTOR_COLLECTION], partition
+            )
+        logger.info("Moved %d chunks of %d documents into partitions", moved, len(document_ids))
+
+    def invalidate_answers(self):
+        """Drop cached answers after the document corpus changed"""
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate()
+
+    async def delete_document_embeddings(self, document_id: str, uploaded_by: Optional[str] = None) -> int:
+        """
+        Delete document embeddings from its partitions in one transaction,
+        returning the number of chunks removed. Errors propagate so the caller
+        keeps the document record until its chunks are really gone.
+        """
+        deleted = await delete_document_chunks(self.engine, self._document_partitions(uploaded_by), document_id)
+        logger.info("Removed %d chunks of document %s", deleted, document_id)
+        return deleted
+
+    async def get_indexed_document_ids(self) -> Set[str]:
+        """document_ids that have chunks in any partition"""
+        return await get_partitioned_document_ids(self.engine, settings.PGVECTOR_COLLECTION)
+
+    async def delete_documents_embeddings(self, document_ids: List[str]) -> int:
+        """Delete the chunks of several documents from all partitions, returning the number removed"""
+        return await delete_partitioned_chunks(self.engine, settings.PGVECTOR_COLLECTION, document_ids)
+
+
+class RAGServiceHolder:
+    service: RAGService = None
+
+rag = RAGServiceHolder()
+
+async def init_rag_service():
+    """Create the shared RAG service on startup"""
+    rag.service = RAGService()
+    for store in (rag.service.embeddings.store, rag.service.embeddings.document_store):
+        if store is not None:
+            await store.ensure_indexes()
+    if rag.service.engine is not None:
+        # Tables now; indexes and the legacy chunk migration can take long on large tables
+        await ensure_vector_store(rag.service.vector_store)
+    rag.service.start_maintenance()
+    # Load the tokenizer (tiktoken may download it) before the first chat needs it
+    await asyncio.to_thread(token_counter, rag.service.llm.model_name)
+    logger.info("Initialized RAG service (collection: %s)", settings.PGVECTOR_COLLECTION)
+
+async def close_rag_service():
+    """Close the shared RAG service on shutdown"""
+    if rag.service is not None:
+        await rag.service.close()
+        rag.service = None
+    logger.info("Closed RAG service")
+
+def get_rag_service() -> RAGService:
+    """Get the shared RAG service instance (FastAPI dependency)"""
+    return rag.service
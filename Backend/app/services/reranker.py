@@ -0,0 +1,118 @@
+"""
+Cross-Encoder Reranker
+Rescores over-fetched retrieval candidates with a local ONNX cross-encoder (fastembed)
+and keeps only the chunks above a relevance cutoff
+"""
+import asyncio
+import importlib.util
+import logging
+import math
+from typing import Any, Iterable, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from app.core.logging import span
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """
+    Scores (query, chunk) pairs with a cross-encoder, which reads both texts
+    together and judges relevance far better than embedding distance. Runs on
+    CPU through fastembed's quantized ONNX models, batch_size pairs per forward
+    pass, off the event loop. fastembed is optional: it is imported (and the
+    model downloaded to cache_dir) on first use. A model object with fastembed's
+    rerank(query, documents, batch_size) interface can be injected instead.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 32,
+        threads: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        model: Any = None
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self.cache_dir = cache_dir
+        self._model = model
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Whether a model was injected or fastembed is installed to load one"""
+        return self._model is not None or importlib.util.find_spec("fastembed") is not None
+
+    def _load(self):
+        try:
+            from fastembed.rerank.cross_encoder import TextCrossEncoder
+        except ImportError as e:
+            raise RuntimeError("Reranking needs the fastembed package (pip install fastembed)") from e
+        logger.info("Loading cross-encoder %s", self.model_name)
+        return TextCrossEncoder(self.model_name, cache_dir=self.cache_dir, threads=self.threads)
+
+    async def _get_model(self):
+        if self._model is None:
+            async with self._lock:
+                if self._model is None:
+                    self._model = await asyncio.to_thread(self._load)
+        return self._model
+
+    def _score(self, model, query: str, texts: List[str]) -> List[float]:
+        logits: Iterable[float] = model.rerank(query, texts, batch_size=self.batch_size)
+        # Logits to 0..1 so one cutoff works across queries
+        return [1.0 / (1.0 + math.exp(-logit)) for logit in logits]
+
+    async def rerank(self, query: str, docs: List[Document], top_n: int, min_score: float) -> List[Document]:
+        """
+        The best top_n of docs by cross-encoder score, dropping those below
+        min_score but always keeping the best one. Scores are added to the
+        metadata as rerank_score.
+        """
+        if not docs:
+            return []
+        model = await self._get_model()
+        scores = await asyncio.to_thread(self._score, model, query, [doc.page_content for doc in docs])
+        ranked = sorted(zip(scores, range(len(docs))), key=lambda pair: pair[0], reverse=True)
+        kept = []
+        for score, index in ranked[:top_n]:
+            if kept and score < min_score:
+                break
+            doc = docs[index]
+            kept.append(Document(
+                id=doc.id,
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "rerank_score": round(score, 4)}
+            ))
+        return kept
+
+
+class RerankingRetriever(BaseRetriever):
+    """
+    Over-fetches candidates from base_retriever (built with k = the candidate
+    count) and passes on only the top_n the reranker scores at least
+    min_score, so the prompt gets as many chunks as are actually relevant.
+    """
+
+    base_retriever: BaseRetriever
+    reranker: Any
+    top_n: int = 4
+    min_score: float = 0.0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        raise NotImplementedError("RerankingRetriever is async only, use ainvoke()")
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        # Per-call search arguments (partitions, filter) go to the base retriever
+        candidates = await self.base_retriever.ainvoke(query, **kwargs)
+        with span("rerank"):
+            docs = await self.reranker.rerank(query, candidates, self.top_n, self.min_score)
+        logger.debug("Kept %d of %d candidates (min_score=%s)", len(docs), len(candidates), self.min_score)
+        return docs
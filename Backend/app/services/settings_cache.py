@@ -0,0 +1,131 @@
+"""
+RAG Settings Cache
+In-process cache of the rag_settings document with a version stamp
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+from pymongo.errors import PyMongoError
+from app.core.config import settings
+from app.db.session import get_database
+
+logger = logging.getLogger(__name__)
+
+# Fields that require rebuilding the ChatOpenAI client when they change
+LLM_FIELDS = ("model_name", "temperature", "top_p")
+# Fields that require a new retriever when they change
+RETRIEVAL_FIELDS = (
+    "top_k", "search_type", "hybrid_fetch_k", "rrf_k", "rerank_enabled", "rerank_fetch_k", "rerank_min_score"
+)
+
+
+def default_rag_settings() -> dict:
+    """RAG settings from .env, used until an admin saves settings"""
+    return {
+        "chunk_size": settings.CHUNK_SIZE,
+        "chunk_overlap": settings.CHUNK_OVERLAP,
+        "temperature": settings.TEMPERATURE,
+        "top_p": settings.TOP_P,
+        "top_k": settings.TOP_K,
+        "model_name": settings.MODEL_NAME,
+        "search_type": settings.SEARCH_TYPE,
+        "hybrid_fetch_k": settings.HYBRID_FETCH_K,
+        "rrf_k": settings.RRF_K,
+        "hnsw_ef_search": settings.HNSW_EF_SEARCH,
+        "ivfflat_probes": settings.IVFFLAT_PROBES,
+        "rerank_enabled": settings.RERANK_ENABLED,
+        "rerank_fetch_k": settings.RERANK_FETCH_K,
+        "rerank_min_score": settings.RERANK_MIN_SCORE,
+        "version": 0
+    }
+
+
+class RAGSettingsCache:
+    """
+    Keeps the current RAG settings in memory.
+
+    `PUT /settings` bumps the `version` field of the settings document.
+    Workers learn about changes through a MongoDB change stream; when change
+    streams are unavailable (standalone server) entries expire after
+    RAG_SETTINGS_CACHE_TTL seconds instead.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._settings: Optional[dict] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._watching = False
+
+    @property
+    def version(self) -> int:
+        return self._settings.get("version", 0) if self._settings else -1
+
+    def _is_fresh(self) -> bool:
+        if self._settings is None:
+            return False
+        if self._watching:
+            return True
+        return time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def get(self) -> dict:
+        """Get current RAG settings, hitting MongoDB only when stale"""
+        if self._is_fresh():
+            return self._settings
+        async with self._lock:
+            if not self._is_fresh():
+                await self.refresh()
+        return self._settings
+
+    async def refresh(self):
+        """Reload settings from MongoDB"""
+        db = get_database()
+        rag_settings = await db.rag_settings.find_one()
+        self._settings = None
+        self.update(rag_settings or default_rag_settings())
+
+    def update(self, rag_settings: dict):
+        """Store a settings document unless an equal or newer version is cached"""
+        if self._settings is not None and rag_settings.get("version", 0) < self.version:
+            return
+        self._settings = rag_settings
+        self._loaded_at = time.monotonic()
+
+    async def start_watching(self):
+        """Start following rag_settings changes in the background"""
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self):
+        """Stop the change stream task"""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        db = get_database()
+        try:
+            async with db.rag_settings.watch(full_document="updateLookup") as stream:
+                # Load after the stream is open so no change can slip in between
+                await self.refresh()
+                self._watching = True
+                logger.info("Watching rag_settings change stream")
+                async for change in stream:
+                    full_document = change.get("fullDocument")
+                    if full_document:
+                        self.update(full_document)
+                    else:
+                        await self.refresh()
+        except PyMongoError as e:
+            logger.warning("rag_settings change stream unavailable, using %ss TTL: %s", self.ttl_seconds, e)
+        finally:
+            self._watching = False
+
+
+rag_settings_cache = RAGSettingsCache(ttl_seconds=settings.RAG_SETTINGS_CACHE_TTL)
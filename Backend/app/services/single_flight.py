@@ -0,0 +1,123 @@
+"""
+Single Flight
+Concurrent calls with the same key share one in-flight computation or stream
+"""
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Broadcast:
+    """Items of one in-flight stream, replayed to every subscriber from the start"""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.updated = asyncio.Event()
+
+    def notify(self):
+        # A fresh event per update, so no subscriber ever has to clear one
+        updated, self.updated = self.updated, asyncio.Event()
+        updated.set()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent work by key. The first caller for a key starts
+    the work in a task; callers arriving before it finishes wait for that task
+    instead of starting their own, and the key is forgotten once it is done.
+
+    run() shares a result (or exception). A caller that is cancelled stops
+    waiting without cancelling the work the others wait for.
+
+    stream() shares an async iterator: every subscriber receives all items
+    from the first, including those produced before it joined. The producer
+    is cancelled (closing the source iterator) only when its last subscriber
+    leaves early.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self.started = 0
+        self.joined = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result of work(), whether it was shared with an earlier caller)"""
+        task = self._calls.get(key)
+        joined = task is not None
+        if joined:
+            self.joined += 1
+        else:
+            self.started += 1
+            task = asyncio.create_task(work())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish_call(key, done))
+        return await asyncio.shield(task), joined
+
+    def _finish_call(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Retrieved here in case every caller stopped waiting
+            task.exception()
+
+    def stream(self, key: Hashable, produce: Callable[[], AsyncIterator[Any]]) -> Tuple[AsyncIterator[Any], bool]:
+        """Return (items of produce(), whether they are shared with an earlier subscriber)"""
+        broadcast = self._streams.get(key)
+        joined = broadcast is not None
+        if joined:
+            self.joined += 1
+        else:
+            self.started += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.create_task(self._pump(key, broadcast, produce()))
+        # Counted now, so the producer is not cancelled before this subscriber starts reading
+        broadcast.subscribers += 1
+        return self._follow(key, broadcast), joined
+
+    def _forget_stream(self, key: Hashable, broadcast: _Broadcast):
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    async def _pump(self, key: Hashable, broadcast: _Broadcast, source: AsyncIterator[Any]):
+        try:
+            async with aclosing(source):
+                async for item in source:
+                    broadcast.items.append(item)
+                    broadcast.notify()
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            self._forget_stream(key, broadcast)
+            broadcast.done = True
+            broadcast.notify()
+
+    async def _follow(self, key: Hashable, broadcast: _Broadcast) -> AsyncIterator[Any]:
+        index = 0
+        try:
+            while True:
+                updated = broadcast.updated
+                if index < len(broadcast.items):
+                    index += 1
+                    yield broadcast.items[index - 1]
+                elif broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                else:
+                    await updated.wait()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                # Nobody is listening any more: stop the producer and let the next caller start afresh
+                self._forget_stream(key, broadcast)
+                broadcast.task.cancel()
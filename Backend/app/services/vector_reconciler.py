@@ -0,0 +1,189 @@
+"""
+Vector Reconciler
+Background garbage collection of embeddings whose document is gone, and of uploads stuck in processing
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.db.session import get_database
+from app.services.corpus_state import corpus_state
+from app.services.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+
+RECONCILER_STATE_ID = "vector_reconciler"
+
+# Document statuses
+PROCESSING = "processing"
+FAILED = "failed"
+DELETING = "deleting"
+
+
+def batches(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class VectorReconciler:
+    """
+    Periodically brings the vector store back in line with MongoDB
+    `documents`:
+    - finishes deletes left in the `deleting` status (chunks, then the record)
+    - deletes chunks whose document_id no longer has a document record
+    - fails documents stuck in `processing` without a live ingestion job,
+      dropping the partial chunks of uploads that never completed
+    Work is done in batches of batch_size documents. One process at a time
+    holds the run lease in `rag_state`, where cumulative counters of reclaimed
+    rows are kept as well.
+    """
+
+    def __init__(self, interval_seconds: float, batch_size: int, stuck_after_seconds: int):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.stuck_after_seconds = stuck_after_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def _acquire_lease(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await get_database().rag_state.update_one(
+                {"_id": RECONCILER_STATE_ID, "$or": [
+                    {"lease_until": {"$lt": now}},
+                    {"lease_until": {"$exists": False}}
+                ]},
+                {"$set": {"lease_until": now + timedelta(seconds=self.interval_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Another process holds the lease
+            return False
+
+    async def run_once(self, rag_service) -> Optional[dict]:
+        """Run one reconciliation pass if no other process is; returns its stats"""
+        if rag_service.engine is None or not await self._acquire_lease():
+            return None
+        start = time.perf_counter()
+        stats = {
+            "deleted_documents": await self._finish_deletes(rag_service),
+            "orphaned_documents": 0,
+            "orphaned_chunks": 0,
+            "stuck_documents": 0,
+            "stuck_chunks": 0
+        }
+        stats["orphaned_documents"], stats["orphaned_chunks"] = await self._delete_orphans(rag_service)
+        stats["stuck_documents"], stats["stuck_chunks"] = await self._fail_stuck(rag_service)
+        stats["chunks_reclaimed"] = stats["orphaned_chunks"] + stats["stuck_chunks"]
+        stats["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        if stats["deleted_documents"] or stats["chunks_reclaimed"]:
+            await corpus_state.bump()
+        counters = {key: value for key, value in stats.items() if key != "duration_ms"}
+        await get_database().rag_state.update_one(
+            {"_id": RECONCILER_STATE_ID},
+            {
+                "$inc": {"runs": 1, **counters},
+                "$set": {"last_run": {"finished_at": datetime.utcnow(), **stats}}
+            }
+        )
+        logger.info("Reconciled", extra=stats)
+        return stats
+
+    async def _finish_deletes(self, rag_service) -> int:
+        """Complete deletes whose request failed after marking the document"""
+        db = get_database()
+        finished = 0
+        async for document in db.documents.find({"status": DELETING}, {"uploaded_by": 1}):
+            document_id = str(document["_id"])
+            await job_queue.cancel_for_document(document_id)
+            await rag_service.delete_document_embeddings(document_id, document.get("uploaded_by"))
+            result = await db.documents.delete_one({"_id": document["_id"], "status": DELETING})
+            finished += result.deleted_count
+        return finished
+
+    async def _delete_orphans(self, rag_service) -> tuple:
+        """
+        Delete chunks whose document record is gone. Records are created before
+        any chunk is stored, so an indexed document_id without one was deleted.
+        """
+        db = get_database()
+        indexed = sorted(await rag_service.get_indexed_document_ids())
+        documents, chunks = 0, 0
+        for batch in batches(indexed, self.batch_size):
+            object_ids = [ObjectId(document_id) for document_id in batch if ObjectId.is_valid(document_id)]
+            existing = {
+                str(document["_id"])
+                async for document in db.documents.find({"_id": {"$in": object_ids}}, {"_id": 1})
+            }
+            orphans = [document_id for document_id in batch if document_id not in existing]
+            if orphans:
+                chunks += await rag_service.delete_documents_embeddings(orphans)
+                documents += len(orphans)
+        return documents, chunks
+
+    async def _fail_stuck(self, rag_service) -> tuple:
+        """Fail documents left in processing with no queued or running job"""
+        db = get_database()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stuck_after_seconds)
+        candidates = await db.documents.find(
+            {"status": PROCESSING, "$or": [
+                {"updated_at": {"$lt": cutoff}},
+                {"updated_at": None, "created_at": {"$lt": cutoff}}
+            ]},
+            {"chunk_count": 1}
+        ).to_list(length=None)
+        documents, chunks = 0, 0
+        for batch in batches(candidates, self.batch_size):
+            active = await job_queue.active_document_ids([str(document["_id"]) for document in batch])
+            stuck = [document for document in batch if str(document["_id"]) not in active]
+            if not stuck:
+                continue
+            result = await db.documents.update_many(
+                {"_id": {"$in": [document["_id"] for document in stuck]}, "status": PROCESSING},
+                {"$set": {"status": FAILED, "error": "Ingestion job lost", "updated_at": datetime.utcnow()}}
+            )
+            documents += result.modified_count
+            # A first upload that never completed leaves only partial chunks behind
+            incomplete: List[str] = [str(document["_id"]) for document in stuck if "chunk_count" not in document]
+            if incomplete:
+                chunks += await rag_service.delete_documents_embeddings(incomplete)
+        return documents, chunks
+
+    async def stats(self) -> dict:
+        """Cumulative counters and the last run"""
+        state = await get_database().rag_state.find_one({"_id": RECONCILER_STATE_ID}) or {}
+        state.pop("_id", None)
+        return state
+
+    async def _loop(self, rag_service):
+        while True:
+            try:
+                await self.run_once(rag_service)
+            except Exception:
+                logger.exception("Reconcile pass failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self, rag_service):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop(rag_service))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+vector_reconciler = VectorReconciler(
+    interval_seconds=settings.RECONCILE_INTERVAL,
+    batch_size=settings.RECONCILE_BATCH_SIZE,
+    stuck_after_seconds=settings.RECONCILE_STUCK_AFTER
+)
@@ -0,0 +1,214 @@
+"""
+Ingestion Worker
+Separate process that runs queued document processing jobs
+
+Run from Backend/:
+    python -m app.worker
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import socket
+import tempfile
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from prometheus_client import start_http_server
+from app.core.config import settings
+from app.core.logging import request_context, setup_logging
+from app.core.metrics import register_service_collector
+from app.db.session import connect_to_mongo, close_mongo_connection, get_database
+from app.services.corpus_state import corpus_state
+from app.services.job_queue import job_queue, PROCESS
+from app.services.rag_service import RAGService, init_rag_service, close_rag_service, get_rag_service
+from app.services.settings_cache import rag_settings_cache
+from app.services.vector_reconciler import vector_reconciler, DELETING
+
+logger = logging.getLogger(__name__)
+
+
+def track_progress(db, document_id: str):
+    """Progress callback that records chunks done / total on the document record"""
+    async def progress(chunks_done: int, chunks_total: int):
+        await db.documents.update_one(
+            {"_id": ObjectId(document_id)},
+            {"$max": {"chunks_done": chunks_done}, "$set": {"chunks_total": chunks_total}}
+        )
+    return progress
+
+
+async def keep_lease(job: dict):
+    """Heartbeat the job lease; returns once another worker owns the job"""
+    while True:
+        await asyncio.sleep(job_queue.lease_seconds / 3)
+        try:
+            if not await job_queue.heartbeat(job):
+                logger.warning("Lost lease on job %s", job["_id"])
+                return
+        except PyMongoError as e:
+            # The lease may still be valid; the next heartbeat tells
+            logger.warning("Heartbeat of job %s failed: %s", job["_id"], e)
+
+
+async def run_job(job: dict, rag_service: RAGService):
+    """
+    Process one claimed job and record the outcome on the job and the
+    document. Logs carry the request ID of the upload that queued the job.
+    """
+    with request_context(job.get("request_id")) as trace:
+        await _run_job(job, rag_service)
+        logger.info(
+            "Finished %s job %s",
+            job["type"],
+            job["_id"],
+            extra={"duration_ms": trace.elapsed_ms(), "spans_ms": trace.spans_ms()}
+        )
+
+
+async def ingest(job: dict, rag_service: RAGService, uploaded_by: Optional[str]) -> dict:
+    """Download the job's upload and index it, returning the ingestion stats"""
+    document_id = job["document_id"]
+    # The spooled upload is removed however the job ends
+    with tempfile.TemporaryDirectory(prefix="ingest-") as tmp_dir:
+        path = os.path.join(tmp_dir, "upload" + os.path.splitext(job["filename"])[1].lower())
+        await job_queue.download_to(job, path)
+        progress = track_progress(get_database(), document_id)
+        if job["type"] == PROCESS:
+            return await rag_service.process_document(
+                path, job["filename"], document_id, job["is_company_policy"],
+                uploaded_by=uploaded_by, progress=progress
+            )
+        return await rag_service.update_document(
+            path, job["filename"], document_id, job["is_company_policy"],
+            job["metadata_changed"], uploaded_by=uploaded_by, progress=progress
+        )
+
+
+async def _run_job(job: dict, rag_service: RAGService):
+    db = get_database()
+    document_id = job["document_id"]
+    logger.info(
+        "%s running %s job %s for %s (attempt %d/%d)",
+        job["worker_id"], job["type"], job["_id"], job["filename"], job["attempts"], job["max_attempts"],
+        extra={"document_id": document_id}
+    )
+    uploaded_by = job.get("uploaded_by")
+    if uploaded_by is None:
+        # Jobs queued before partitioning did not record the uploader
+        document = await db.documents.find_one({"_id": ObjectId(document_id)}, {"uploaded_by": 1})
+        uploaded_by = (document or {}).get("uploaded_by")
+
+    work = asyncio.create_task(ingest(job, rag_service, uploaded_by))
+    heartbeat = asyncio.create_task(keep_lease(job))
+    try:
+        await asyncio.wait({work, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        heartbeat.cancel()
+        if not work.done():
+            # Lease lost (or shutting down): the worker that reclaimed the job redoes it
+            work.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await work
+    if work.cancelled():
+        logger.warning("Abandoned job %s to the worker that reclaimed it", job["_id"])
+        return
+
+    stats, error = None, None
+    try:
+        stats = work.result()
+    except Exception as e:
+        logger.exception("Job %s failed", job["_id"])
+        error = f"{type(e).__name__}: {e}"
+
+    # A document deleted while its job ran is left to the delete (or the reconciler)
+    live_document = {"_id": ObjectId(document_id), "status": {"$ne": DELETING}}
+    if error is None:
+        if not await job_queue.complete(job, stats):
+            logger.warning("Job %s was reclaimed before it completed, leaving it to the new owner", job["_id"])
+            return
+        result = await db.documents.update_one(
+            live_document,
+            {"$set": {"status": "completed", "updated_at": datetime.utcnow(), **stats}}
+        )
+        if not result.matched_count:
+            # Chunks stored after the delete removed the document's would be orphaned
+            try:
+                await rag_service.delete_document_embeddings(document_id, uploaded_by)
+            except Exception as e:
+                logger.warning("Left chunks of deleted document %s to the reconciler: %s", document_id, e)
+        await corpus_state.bump()
+        return
+
+    will_retry = await job_queue.fail(job, error)
+    if will_retry is None:
+        logger.warning("Job %s was reclaimed before it failed, leaving it to the new owner", job["_id"])
+        return
+    await db.documents.update_one(
+        live_document,
+        {"$set": {"status": "processing" if will_retry else "failed", "updated_at": datetime.utcnow()}}
+    )
+
+
+async def wait_for_stop(stop: asyncio.Event):
+    """Sleep for the poll interval, waking early on shutdown"""
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=settings.INGEST_JOB_POLL_INTERVAL)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def worker_loop(worker_id: str, stop: asyncio.Event):
+    """Claim and run jobs until stop is set"""
+    rag_service = get_rag_service()
+    while not stop.is_set():
+        # A transient MongoDB error (e.g. AutoReconnect) must not stop the worker process;
+        # an interrupted job is reclaimed once its lease runs out
+        try:
+            job = await job_queue.claim(worker_id)
+            if job is not None:
+                await run_job(job, rag_service)
+                continue
+            for document_id in await job_queue.fail_abandoned():
+                await get_database().documents.update_one(
+                    {"_id": ObjectId(document_id), "status": {"$ne": DELETING}},
+                    {"$set": {"status": "failed", "updated_at": datetime.utcnow()}}
+                )
+        except Exception:
+            logger.exception("%s poll failed, retrying in %ss", worker_id, settings.INGEST_JOB_POLL_INTERVAL)
+        await wait_for_stop(stop)
+
+
+async def main():
+    setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+    await connect_to_mongo()
+    await init_rag_service()
+    await rag_settings_cache.start_watching()
+    await job_queue.ensure_indexes()
+    vector_reconciler.start(get_rag_service())
+    if settings.WORKER_METRICS_PORT:
+        # Ingestion metrics live in this process; Prometheus scrapes them here
+        register_service_collector(get_rag_service)
+        start_http_server(settings.WORKER_METRICS_PORT)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    concurrency = settings.INGEST_WORKER_CONCURRENCY
+    logger.info("Starting %d ingestion worker(s) (%s)", concurrency, prefix)
+    # In-flight jobs finish before shutdown; unfinished ones are reclaimed after their lease expires
+    await asyncio.gather(*(worker_loop(f"{prefix}-{i}", stop) for i in range(concurrency)))
+
+    await vector_reconciler.stop()
+    await rag_settings_cache.stop_watching()
+    await close_rag_service()
+    await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Chat Coalescing Benchmark
+A spike of concurrent chats asking the same question (differing only in case
+and spacing, as typed after an announcement), answered with and without
+single-flight coalescing against stub embeddings and a stub LLM: upstream
+embedding calls, vector searches and LLM calls for the whole spike, and chat
+latency. Streamed chats also check that every client got the full answer.
+
+Run from Backend/:
+    python -m benchmarks.bench_chat_coalescing --requests 200 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from app.services.single_flight import SingleFlight
+from benchmarks.stubs import StubRAGService, prime_settings, load_policy_corpus
+
+QUESTION = "When does the new remote work policy take effect?"
+
+
+def variant(question: str, i: int) -> str:
+    """The same question as different people type it"""
+    return [question, question.lower(), f"  {question}", question.replace(" ", "  ")][i % 4]
+
+
+async def spike(service: StubRAGService, question: str, requests: int, stream: bool) -> dict:
+    embeddings = service.embeddings.underlying_embeddings
+    embed_calls, vector_queries, llm_calls = embeddings.calls, service.vector_store.queries, service.llm.calls
+    latencies, answers = [], set()
+
+    async def one(i: int):
+        start = time.perf_counter()
+        if stream:
+            tokens = [data async for event, data in service.chat_stream(variant(question, i)) if event == "token"]
+            answers.add("".join(tokens))
+        else:
+            answer, _ = await service.chat(variant(question, i))
+            answers.add(answer)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "wall_seconds": round(elapsed, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 1),
+        "embedding_calls": embeddings.calls - embed_calls,
+        "vector_queries": service.vector_store.queries - vector_queries,
+        "llm_calls": service.llm.calls - llm_calls,
+        "distinct_answers": len(answers)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    prime_settings()
+    service = StubRAGService(
+        embed_latency=args.embed_latency, llm_latency=args.llm_latency, token_latency=args.token_latency
+    )
+    load_policy_corpus(service)
+
+    results = {}
+    for mode, stream in (("chat", False), ("stream", True)):
+        # A new question per run, so answers cached by an earlier run do not count
+        service.chat_flights = None
+        before = await spike(service, f"{QUESTION} ({mode}, before)", args.requests, stream)
+        service.chat_flights = SingleFlight()
+        after = await spike(service, f"{QUESTION} ({mode}, after)", args.requests, stream)
+        results[mode] = {"before_independent": before, "after_coalesced": after}
+        # One upstream computation for the whole spike, and every client got its answer
+        assert after["llm_calls"] == 1, "identical questions reached the LLM more than once"
+        assert after["distinct_answers"] == 1, "clients got different answers"
+        assert service.chat_flights.in_flight == 0, "finished chats left in flight"
+    print(json.dumps(results, indent=2))
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Chat Concurrency Benchmark
+Compares the old blocking chat path (invoke) with the async path (ainvoke)
+against stub embeddings and a stub LLM.
+
+Run from Backend/:
+    python -m benchmarks.bench_chat_concurrency --requests 50 --llm-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from benchmarks.stubs import StubRAGService, prime_settings, load_policy_corpus
+
+QUERY = "How many days of casual leave do I get?"
+
+
+async def blocking_chat(service: StubRAGService, query: str):
+    """The pre-async chat path: sync retriever and chain calls inside a coroutine"""
+    rag_settings = await service.get_settings()
+    retriever = service._get_retriever(rag_settings)
+    docs = retriever.invoke(query)
+    rag_chain = service._create_rag_chain(service.llm)
+    rag_chain.invoke({"context": "\n\n".join(doc.page_content for doc in docs), "question": query})
+
+
+async def async_chat(service: StubRAGService, query: str):
+    await service.chat(query)
+
+
+async def probe_loop_lag(stop: asyncio.Event, lags: list):
+    """Measures how late a 10ms sleep wakes up, i.e. how responsive /health would be"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def run(label: str, chat_fn, service: StubRAGService, requests: int) -> dict:
+    embed_calls = service.embeddings.underlying_embeddings.calls
+    vector_queries = service.vector_store.queries
+    stop = asyncio.Event()
+    lags = []
+    probe = asyncio.create_task(probe_loop_lag(stop, lags))
+    start = time.perf_counter()
+    # Distinct questions so the query embedding cache does not hide retrieval work
+    await asyncio.gather(*(chat_fn(service, f"{QUERY} ({label} #{i})") for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    return {
+        "requests": requests,
+        "wall_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "max_loop_lag_ms": round(max(lags or [0.0]) * 1000, 1),
+        "mean_loop_lag_ms": round(statistics.fmean(lags or [0.0]) * 1000, 1),
+        "embedding_calls_per_chat": (service.embeddings.underlying_embeddings.calls - embed_calls) / requests,
+        "vector_queries_per_chat": (service.vector_store.queries - vector_queries) / requests
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    prime_settings()
+    service = StubRAGService(embed_latency=args.embed_latency, llm_latency=args.llm_latency)
+    load_policy_corpus(service)
+
+    results = {
+        "before_blocking": await run("blocking", blocking_chat, service, args.requests),
+        "after_async": await run("async", async_chat, service, args.requests)
+    }
+    print(json.dumps(results, indent=2))
+    # Retrieval must happen exactly once per chat (one query embedding, one vector search)
+    assert results["after_async"]["embedding_calls_per_chat"] == 1, "query embedded more than once"
+    assert results["after_async"]["vector_queries_per_chat"] == 1, "vector store queried more than once"
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Chat Overhead Benchmark
+Measures the Python-side cost of a chat request with zero-latency stub
+embeddings and LLM over a small in-memory corpus, so no network time is
+included. Compares rebuilding the retriever and the RAG chain (prompt template
+parse and LCEL composition) on every request, as user- and document-scoped
+chats used to, with the retriever and chain built once per settings version
+and the request's partitions and filter passed at invocation.
+
+Run from Backend/:
+    python -m benchmarks.bench_chat_overhead --requests 2000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+from operator import itemgetter
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from app.services.rag_service import RAG_PROMPT_TEMPLATE
+from benchmarks.stubs import StubRAGService, load_policy_corpus, prime_settings
+
+QUERY = "How many days of casual leave do I get?"
+
+
+class RebuildingRAGService(StubRAGService):
+    """The previous per-request path: new retriever, prompt and chain for every chat"""
+
+    def _get_retriever(self, rag_settings: dict):
+        return self._create_retriever(rag_settings)
+
+    def _build_chain(self):
+        prompt = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
+        return (
+            {"context": itemgetter("context"), "question": itemgetter("question")}
+            | prompt
+            | self.llm
+            | StrOutputParser()
+        )
+
+    async def _prepare_chat(self, query: str, rag_settings: dict, *args):
+        context, _ = await super()._prepare_chat(query, rag_settings, *args)
+        return context, self._build_chain()
+
+
+def setup_cost(service: StubRAGService, rag_settings: dict, requests: int) -> float:
+    """Microseconds spent per request getting a retriever and chain, without running them"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(requests):
+            service._get_retriever(rag_settings)
+            service._ensure_llm(rag_settings)
+            if isinstance(service, RebuildingRAGService):
+                service._build_chain()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def run(service: StubRAGService, requests: int) -> dict:
+    rag_settings = await service.get_settings()
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Warm the query embedding cache and the LLM
+        await service.chat(QUERY, user_id="bench-user")
+        for _ in range(requests):
+            start = time.perf_counter()
+            await service.chat(QUERY, user_id="bench-user")
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "setup_us_per_request": round(setup_cost(service, rag_settings, requests), 1),
+        "chat_us_p50": round(statistics.median(latencies) * 1e6, 1),
+        "chat_us_p99": round(latencies[int(0.99 * (len(latencies) - 1))] * 1e6, 1),
+        "chats_per_second": round(len(latencies) / sum(latencies), 1)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=4)
+    args = parser.parse_args()
+
+    prime_settings(top_k=args.top_k)
+    results = {}
+    for label, service_class in (("rebuilt_per_request", RebuildingRAGService), ("prebuilt", StubRAGService)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            service = service_class(embed_latency=0.0, llm_latency=0.0)
+        # Every request must reach retrieval and the LLM
+        service.answer_cache = None
+        results["chunks"] = load_policy_corpus(service)
+        results[label] = await run(service, args.requests)
+        await service.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Chat Time-To-First-Byte Benchmark
+Compares time to first byte of RAGService.chat (full answer) with
+RAGService.chat_stream (first token) against stub embeddings and a stub LLM
+that emits one word every --token-latency seconds.
+
+Run from Backend/:
+    python -m benchmarks.bench_chat_ttfb --requests 20 --token-latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from benchmarks.stubs import StubRAGService, prime_settings, load_policy_corpus
+
+QUERY = "What are the work from home rules?"
+
+
+async def time_chat(service: StubRAGService) -> tuple[float, float]:
+    start = time.perf_counter()
+    await service.chat(QUERY)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+async def time_chat_stream(service: StubRAGService) -> tuple[float, float]:
+    start = time.perf_counter()
+    first_token = None
+    async for event, _ in service.chat_stream(QUERY):
+        if event == "token" and first_token is None:
+            first_token = time.perf_counter() - start
+    return first_token, time.perf_counter() - start
+
+
+def summarize(samples: list) -> dict:
+    ttfb = sorted(sample[0] for sample in samples)
+    total = sorted(sample[1] for sample in samples)
+    return {
+        "ttfb_p50_ms": round(statistics.median(ttfb) * 1000, 1),
+        "ttfb_max_ms": round(ttfb[-1] * 1000, 1),
+        "total_p50_ms": round(statistics.median(total) * 1000, 1)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    prime_settings()
+    service = StubRAGService(llm_latency=args.llm_latency, token_latency=args.token_latency)
+    # Every request must reach the LLM for a fair comparison
+    service.answer_cache = None
+    load_policy_corpus(service)
+
+    results = {
+        "chat": summarize(await asyncio.gather(*(time_chat(service) for _ in range(args.requests)))),
+        "chat_stream": summarize(await asyncio.gather(*(time_chat_stream(service) for _ in range(args.requests))))
+    }
+    print(json.dumps(results, indent=2))
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Context Packing Benchmark
+Answers policy questions against stub embeddings, an in-memory vector store
+and a stub LLM whose time to first token grows with the prompt. The corpus is
+chunked with overlap and loaded twice, as if every policy had been uploaded
+twice. Compares the plain context (retrieved chunks joined as-is) with the
+packed context (overlapping chunks merged, near-duplicates dropped, fitted to
+the token budget): prompt context tokens, tokens saved per request, packing
+time and end-to-end latency.
+
+Run from Backend/:
+    python -m benchmarks.bench_context_packing --top-k 8 --chunk-size 400 --chunk-overlap 200
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+from app.services.context_builder import ContextBuilder, _Block, token_counter
+from app.services.rag_service import RAG_PROMPT_TEMPLATE
+from benchmarks.stubs import StubRAGService, load_policy_corpus, prime_settings
+
+QUESTIONS = [
+    "How many days of casual leave do I get?",
+    "Is a medical certificate needed for sick leave?",
+    "Can earned leave be carried forward?",
+    "How many flexible holidays can I choose?",
+    "What happens if a holiday falls on a weekend?",
+    "What is the deadline for submitting reimbursement claims?",
+    "Who is eligible for WFH?",
+    "Whom do I tell about a conflict of interest?",
+]
+
+
+class PlainContextBuilder(ContextBuilder):
+    """The previous format_docs: every retrieved chunk, joined as-is"""
+
+    def _blocks(self, docs):
+        return [_Block(rank, doc) for rank, doc in enumerate(docs)]
+
+
+async def run(service: StubRAGService, builder: ContextBuilder, repeats: int) -> dict:
+    service.context_builder = builder
+    count = token_counter(service.llm.model_name)
+    tokens, saved, pack_ms, latencies, blocks = [], [], [], [], []
+    for question in QUESTIONS:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                await service.chat(question)
+            latencies.append(time.perf_counter() - start)
+        # The chunks the chat retrieved, packed again to time the packing alone
+        docs = await service.retrieve(question, await service.get_settings())
+        start = time.perf_counter()
+        context = builder.build(docs, service.llm.model_name, RAG_PROMPT_TEMPLATE + question)
+        pack_ms.append((time.perf_counter() - start) * 1000)
+        tokens.append(count(context.text))
+        saved.append(context.tokens_saved)
+        blocks.append(context.blocks)
+    latencies.sort()
+    return {
+        "passages_in_prompt": round(statistics.fmean(blocks), 2),
+        "context_tokens": round(statistics.fmean(tokens), 1),
+        "tokens_saved_per_request": round(statistics.fmean(saved), 1),
+        "pack_ms_p50": round(statistics.median(pack_ms), 3),
+        "end_to_end_p50_ms": round(statistics.median(latencies) * 1000, 2)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--chunk-size", type=int, default=400)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--copies", type=int, default=2, help="times the corpus is loaded (duplicate uploads)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0005,
+                        help="stub LLM seconds per prompt token (prefill cost)")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = StubRAGService(embed_latency=0.0, llm_latency=0.2, prompt_token_latency=args.prompt_token_latency)
+    # Every question must reach retrieval and the LLM
+    service.answer_cache = None
+    prime_settings(top_k=args.top_k)
+    chunks = load_policy_corpus(service, args.copies, args.chunk_size, args.chunk_overlap)
+    builder = service.context_builder
+    plain = await run(service, PlainContextBuilder(), args.repeats)
+    packed = await run(service, builder, args.repeats)
+    print(json.dumps({
+        "chunks": chunks,
+        "top_k": args.top_k,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "plain": plain,
+        "packed": packed
+    }, indent=2))
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
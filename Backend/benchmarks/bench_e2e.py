@@ -0,0 +1,501 @@
+"""
+End-to-end Benchmark
+Runs the API (benchmarks.e2e_server under uvicorn) and the ingestion worker
+against a fake OpenAI server (benchmarks.fake_openai), a scratch Postgres
+database and a scratch MongoDB database, then drives scenarios over HTTP:
+- chat: concurrent POST /chat/ requests (unique questions, so no answer cache hits)
+- chat_stream: concurrent POST /chat/stream requests, with time to first token
+- upload: bulk upload of Policy_files scaled up with synthetic pages, each
+  followed until the worker has indexed it
+- mixed: chat and upload at the same time
+Reports p50/p95/p99 latency, throughput and the RSS of the API and worker
+processes as JSON, tagged with the git commit for comparison across commits
+(--baseline adds the change against an earlier run).
+
+Needs a reachable Postgres with pgvector at PGVECTOR_CONNECTION, as a role
+that may create databases, and MongoDB at --mongo-uri (GridFS and the job
+queue need a real server). --mongomock runs the API on mongomock-motor
+instead, which only supports the chat scenarios.
+
+Run from Backend/:
+    python -m benchmarks.bench_e2e --output e2e.json
+    python -m benchmarks.bench_e2e --mongomock --scenarios chat,chat_stream
+    python -m benchmarks.bench_e2e --baseline e2e.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.config import settings
+from app.core.security import create_access_token
+from benchmarks.stubs import scaled_policy_files
+
+DATABASE = "bench_e2e"
+USER_ID = "65f0000000000000000000be"
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SCENARIOS = ("chat", "chat_stream", "upload", "mixed")
+# Upload scenarios use their own synthetic pages, so nothing hits the chunk embedding cache
+UPLOAD_CORPUS = 1000
+MIXED_CORPUS = 2000
+QUESTIONS = [
+    "How many days of casual leave do employees get?",
+    "Does sick leave need a medical certificate?",
+    "How do I claim travel reimbursement?",
+    "Which public holidays does the company observe?",
+    "How many days a week can I work from home?",
+    "What does the code of conduct say about conflicts of interest?",
+    "Who approves leave requests?",
+    "What is the deadline for submitting expense claims?"
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of pid and its descendants (e.g. parser processes), from /proc"""
+    children: Dict[int, List[int]] = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            status = Path(f"/proc/{current}/status").read_text()
+        except OSError:
+            if current == pid:
+                return None
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmRSS:"):
+                total += int(line.split()[1]) * 1024
+        pending.extend(children.get(current, []))
+    return total
+
+
+class RSSSampler:
+    """Samples the RSS of named processes every interval seconds while running"""
+
+    def __init__(self, pids: Dict[str, int], interval: float = 0.25):
+        self.pids = pids
+        self.interval = interval
+        self.samples: Dict[str, List[int]] = {name: [] for name in pids}
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self):
+        for name, pid in self.pids.items():
+            value = rss_bytes(pid)
+            if value is not None:
+                self.samples[name].append(value)
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+        self.sample()
+
+    def report(self) -> dict:
+        mb = lambda value: round(value / 1024 / 1024, 1)
+        return {
+            name: {"start_mb": mb(values[0]), "peak_mb": mb(max(values)), "end_mb": mb(values[-1])}
+            for name, values in self.samples.items() if values
+        }
+
+
+def latency_stats(latencies: List[float]) -> dict:
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    at = lambda q: round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 1)
+    return {
+        "p50_ms": at(0.50),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1)
+    }
+
+
+def question(i: int) -> str:
+    # A distinct suffix per request: every chat embeds, searches and calls the LLM
+    return f"{QUESTIONS[i % len(QUESTIONS)]} (request {i})"
+
+
+async def run_chat(client: httpx.AsyncClient, requests: int, concurrency: int, stream: bool, offset: int = 0) -> dict:
+    latencies, first_token, errors = [], [], 0
+    counter = iter(range(requests))
+
+    async def one(i: int):
+        nonlocal errors
+        body = {"query": question(offset + i)}
+        start = time.perf_counter()
+        if not stream:
+            response = await client.post("/api/v1/chat/", json=body)
+            if response.status_code != 200 or response.json()["answer"].startswith("Error"):
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            return
+        event, failed, first = None, False, None
+        async with client.stream("POST", "/api/v1/chat/stream", json=body) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[7:]
+                    failed |= event == "error"
+                    if event == "token" and first is None:
+                        first = time.perf_counter() - start
+        if response.status_code != 200 or failed or first is None:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - start)
+        first_token.append(first)
+
+    async def loop():
+        nonlocal errors
+        for i in counter:
+            try:
+                await one(i)
+            except httpx.HTTPError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency": latency_stats(latencies)
+    }
+    if stream:
+        result["first_token"] = latency_stats(first_token)
+    return result
+
+
+async def run_upload(
+    client: httpx.AsyncClient, copies: int, pages: int, concurrency: int, seed: int, timeout: float
+) -> dict:
+    """Upload every file, then follow it until the worker completes or fails it"""
+    files = scaled_policy_files(copies, pages, seed=seed)
+    upload_latencies, ingest_latencies = [], []
+    failed, chunks = 0, 0
+    pending = iter(files)
+
+    async def one(filename: str, content: str):
+        nonlocal failed, chunks
+        start = time.perf_counter()
+        response = await client.post(
+            "/api/v1/documents/upload",
+            files={"file": (filename, content.encode(), "text/plain")}
+        )
+        if response.status_code != 200:
+            failed += 1
+            return
+        upload_latencies.append(time.perf_counter() - start)
+        document_id = response.json()["id"]
+        while time.perf_counter() - start < timeout:
+            await asyncio.sleep(0.2)
+            status = (await client.get(f"/api/v1/documents/{document_id}/status")).json()
+            if status["status"] == "completed":
+                ingest_latencies.append(time.perf_counter() - start)
+                chunks += status["chunks_total"] or 0
+                return
+            if status["status"] == "failed":
+                break
+        failed += 1
+
+    async def loop():
+        nonlocal failed
+        for filename, content in pending:
+            try:
+                await one(filename, content)
+            except httpx.HTTPError:
+                failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "documents": len(files),
+        "bytes": sum(len(content.encode()) for _, content in files),
+        "concurrency": concurrency,
+        "failed": failed,
+        "chunks": chunks,
+        "duration_s": round(elapsed, 2),
+        "throughput_docs_per_s": round(len(ingest_latencies) / elapsed, 2),
+        "throughput_chunks_per_s": round(chunks / elapsed, 1),
+        "upload_latency": latency_stats(upload_latencies),
+        "ingest_latency": latency_stats(ingest_latencies)
+    }
+
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    """{"latency": {"p50_ms": 1}} -> {"latency.p50_ms": 1}"""
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(result: dict, baseline: dict) -> dict:
+    """Relative change of latencies and throughput against a baseline run"""
+    change = lambda new, old: round((new - old) / old * 100, 1) if old else None
+    comparison = {}
+    for name, scenario in result["scenarios"].items():
+        old_scenario = baseline.get("scenarios", {}).get(name)
+        if not old_scenario or "skipped" in scenario or "skipped" in old_scenario:
+            continue
+        new_values, old_values = flatten(scenario), flatten(old_scenario)
+        comparison[name] = {
+            f"{key}_change_pct": change(value, old_values[key])
+            for key, value in new_values.items()
+            if key in old_values and (key.endswith("_ms") or "throughput" in key)
+        }
+    return {"baseline_commit": baseline.get("meta", {}).get("commit"), "scenarios": comparison}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Processes:
+    """Child processes with their output in log files, terminated on exit"""
+
+    def __init__(self, env: dict, log_dir: str):
+        self.env = env
+        self.log_dir = log_dir
+        self.running: Dict[str, subprocess.Popen] = {}
+
+    def start(self, name: str, *args: str) -> subprocess.Popen:
+        log = open(os.path.join(self.log_dir, f"{name}.log"), "w")
+        process = subprocess.Popen(
+            [sys.executable, "-m", *args], cwd=BACKEND_DIR, env=self.env, stdout=log, stderr=subprocess.STDOUT
+        )
+        self.running[name] = process
+        return process
+
+    def log_tail(self, name: str, lines: int = 30) -> str:
+        path = os.path.join(self.log_dir, f"{name}.log")
+        return "".join(open(path).readlines()[-lines:])
+
+    async def wait_ready(self, name: str, url: str, timeout: float):
+        """Poll url until it answers; startup failures raise with the process log"""
+        process = self.running[name]
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{name} exited during startup:\n{self.log_tail(name)}")
+                try:
+                    await client.get(url, timeout=1.0)
+                    return
+                except httpx.HTTPError:
+                    await asyncio.sleep(0.2)
+        raise RuntimeError(f"{name} not ready after {timeout}s:\n{self.log_tail(name)}")
+
+    def stop(self):
+        for process in self.running.values():
+            process.terminate()
+        for name, process in self.running.items():
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--mongomock", action="store_true", help="run the API on mongomock-motor (chat scenarios only)")
+    parser.add_argument("--chat-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent chat clients")
+    parser.add_argument("--warmup", type=int, default=10, help="chats before measuring")
+    parser.add_argument("--seed-copies", type=int, default=4, help="copies of Policy_files indexed before the run")
+    parser.add_argument("--upload-copies", type=int, default=10, help="copies of Policy_files uploaded by upload/mixed")
+    parser.add_argument("--pages", type=int, default=4, help="synthetic pages added to every seeded or uploaded copy")
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--ingest-timeout", type=float, default=300.0, help="seconds to wait for one upload to be indexed")
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--embed-input-latency", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument(
+        "--no-tokenize", action="store_true",
+        help="send embedding inputs as strings (OPENAI_EMBEDDING_TOKENIZE=false; needs no tiktoken download)"
+    )
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    args = parser.parse_args()
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    admin = create_async_engine(settings.PGVECTOR_CONNECTION, isolation_level="AUTOCOMMIT")
+    async with admin.connect() as conn:
+        await conn.execute(text(f"DROP DATABASE IF EXISTS {DATABASE}"))
+        await conn.execute(text(f"CREATE DATABASE {DATABASE}"))
+    mongo = None if args.mongomock else AsyncIOMotorClient(args.mongo_uri)
+    if mongo is not None:
+        await mongo.drop_database(DATABASE)
+
+    # Children take their settings from the environment; tokens are minted with the same key
+    settings.SECRET_KEY = secrets.token_hex(32)
+    openai_port, api_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        PGVECTOR_CONNECTION=make_url(settings.PGVECTOR_CONNECTION).set(database=DATABASE).render_as_string(
+            hide_password=False
+        ),
+        PGVECTOR_COLLECTION=DATABASE,
+        EMBEDDING_DIMENSIONS=str(args.dims),
+        MONGODB_URI=args.mongo_uri,
+        MONGODB_DB_NAME=DATABASE,
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}/v1",
+        OPENAI_EMBEDDING_TOKENIZE="false" if args.no_tokenize else "true",
+        SECRET_KEY=settings.SECRET_KEY,
+        LOG_LEVEL="WARNING",
+        WORKER_METRICS_PORT="0",
+        INGEST_JOB_POLL_INTERVAL="0.2",
+        RECONCILE_INTERVAL="0"
+    )
+    if args.mongomock:
+        # mongomock's bulk_write rejects the ReplaceOne operations the chunk embedding cache writes
+        env["DOCUMENT_EMBEDDING_CACHE_ENABLED"] = "false"
+    processes = Processes(env, tempfile.mkdtemp(prefix="bench-e2e-"))
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "mongo": "mongomock (no chunk embedding cache)" if args.mongomock else "mongodb",
+            "logs": processes.log_dir,
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "mongo_uri")}
+        },
+        "scenarios": {}
+    }
+    try:
+        processes.start(
+            "fake_openai", "benchmarks.fake_openai", "--port", str(openai_port), "--dims", str(args.dims),
+            "--embed-latency", str(args.embed_latency), "--embed-input-latency", str(args.embed_input_latency),
+            "--llm-latency", str(args.llm_latency), "--token-latency", str(args.token_latency)
+        )
+        await processes.wait_ready("fake_openai", f"http://127.0.0.1:{openai_port}/docs", timeout=30)
+
+        server_args = [
+            "benchmarks.e2e_server", "--port", str(api_port), "--user-id", USER_ID,
+            "--seed-copies", str(args.seed_copies), "--seed-pages", str(args.pages)
+        ]
+        api = processes.start("api", *server_args, *(["--mongomock"] if args.mongomock else []))
+        # Startup seeds the corpus before the API answers
+        started = time.perf_counter()
+        await processes.wait_ready("api", f"http://127.0.0.1:{api_port}/health", timeout=args.ingest_timeout)
+        result["meta"]["startup_s"] = round(time.perf_counter() - started, 2)
+        pids = {"api": api.pid}
+        if not args.mongomock:
+            pids["worker"] = processes.start("worker", "app.worker").pid
+
+        token = create_access_token({"sub": USER_ID}, expires_delta=timedelta(hours=12))
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{api_port}",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=httpx.Timeout(120.0),
+            limits=httpx.Limits(max_connections=args.concurrency + args.upload_concurrency * 2)
+        ) as client:
+            if args.warmup:
+                await run_chat(client, args.warmup, min(args.concurrency, args.warmup), stream=False)
+            offset = args.warmup
+            for name in scenarios:
+                if args.mongomock and name in ("upload", "mixed"):
+                    result["scenarios"][name] = {"skipped": "needs GridFS and the worker (run against MongoDB)"}
+                    continue
+                with RSSSampler(pids) as rss:
+                    if name in ("chat", "chat_stream"):
+                        scenario = await run_chat(
+                            client, args.chat_requests, args.concurrency, name == "chat_stream", offset
+                        )
+                    elif name == "upload":
+                        scenario = await run_upload(
+                            client, args.upload_copies, args.pages, args.upload_concurrency,
+                            UPLOAD_CORPUS, args.ingest_timeout
+                        )
+                    else:
+                        chat, upload = await asyncio.gather(
+                            run_chat(client, args.chat_requests, args.concurrency, False, offset),
+                            run_upload(
+                                client, args.upload_copies, args.pages, args.upload_concurrency,
+                                MIXED_CORPUS, args.ingest_timeout
+                            )
+                        )
+                        scenario = {"chat": chat, "upload": upload}
+                scenario["rss"] = rss.report()
+                offset += args.chat_requests
+                result["scenarios"][name] = scenario
+                print(json.dumps({name: scenario}), file=sys.stderr, flush=True)
+    finally:
+        processes.stop()
+        if mongo is not None:
+            await mongo.drop_database(DATABASE)
+            mongo.close()
+        async with admin.connect() as conn:
+            await conn.execute(text(f"DROP DATABASE IF EXISTS {DATABASE}"))
+        await admin.dispose()
+
+    if args.baseline:
+        result["comparison"] = compare(result, json.loads(Path(args.baseline).read_text()))
+    output = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
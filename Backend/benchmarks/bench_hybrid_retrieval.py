@@ -0,0 +1,117 @@
+"""
+Hybrid Retrieval Benchmark
+Indexes Policy_files/ into a scratch PGVector collection and compares vector
+similarity retrieval with hybrid (full-text + vector, RRF) retrieval on a set
+of labelled policy questions: hit rate at top_k, mean reciprocal rank and
+retrieval latency.
+
+Needs a reachable Postgres with pgvector at PGVECTOR_CONNECTION. Uses OpenAI
+embeddings when OPENAI_API_KEY is set, otherwise stub embeddings (vector
+ranking is then noise, which isolates what the keyword half contributes).
+
+Run from Backend/:
+    python -m benchmarks.bench_hybrid_retrieval --top-k 2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from app.core.config import settings
+from app.db.vector_store import ensure_text_search_index, ensure_vector_store
+from app.services.rag_service import RAGService
+from benchmarks.stubs import StubEmbeddings, prime_settings, spool
+
+# (question, phrase the right chunk contains)
+QUESTIONS = [
+    ("How many days of casual leave do I get?", "12 days of casual leave"),
+    ("Is a medical certificate needed for sick leave?", "medical certificate"),
+    ("Can earned leave be carried forward?", "carried forward up to"),
+    ("What is Leave Without Pay (LWP)?", "granted as leave without pay"),
+    ("Is Gandhi Jayanti a company holiday?", "gandhi jayanti"),
+    ("How many flexible holidays can I choose?", "2 flexible holidays"),
+    ("What happens if a holiday falls on a weekend?", "falls on a weekend"),
+    ("Do I get a compensatory off for working on a holiday?", "compensatory off"),
+    ("What is the deadline for submitting reimbursement claims?", "within 30 days"),
+    ("How long do I have to claim international travel expenses?", "within 60 days"),
+    ("Who is eligible for WFH?", "at least 3 months"),
+    ("Can new hires work from home?", "new hires"),
+    ("Are fines and penalties reimbursable?", "fines, penalties"),
+    ("Whom do I tell about a conflict of interest?", "conflicts of interest"),
+    ("When can confidential information be disclosed without authorization?", "required by law"),
+]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+async def evaluate(service: RAGService, search_type: str, top_k: int, repeats: int) -> dict:
+    prime_settings(search_type=search_type, top_k=top_k)
+    retriever = service._get_retriever(await service.get_settings())
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for question, phrase in QUESTIONS:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            docs = await retriever.ainvoke(question)
+            latencies.append(time.perf_counter() - start)
+        rank = next((i + 1 for i, doc in enumerate(docs) if phrase in normalize(doc.page_content)), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    latencies.sort()
+    return {
+        "search_type": search_type,
+        f"hit_rate_at_{top_k}": round(hits / len(QUESTIONS), 3),
+        "mrr": round(statistics.fmean(reciprocal_ranks), 3),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--chunk-size", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--collection", default="bench_hybrid_retrieval")
+    args = parser.parse_args()
+
+    settings.PGVECTOR_COLLECTION = args.collection
+    embeddings = None if settings.OPENAI_API_KEY else StubEmbeddings(latency=0.0, size=settings.EMBEDDING_DIMENSIONS)
+    # The chat model is built but never called
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "unused"
+    service = RAGService(embeddings=embeddings)
+    # No MongoDB in benchmarks: chunk embeddings are not cached across uploads
+    service.embeddings.document_store = None
+    prime_settings(chunk_size=args.chunk_size, chunk_overlap=50)
+
+    policy_dir = Path(__file__).resolve().parents[2] / "Policy_files"
+    try:
+        await ensure_vector_store(service.vector_store)
+        await ensure_text_search_index(service.engine)
+        chunks = 0
+        with tempfile.TemporaryDirectory() as tmp_dir, contextlib.redirect_stdout(io.StringIO()):
+            for path in sorted(policy_dir.glob("*.txt")):
+                upload = spool(tmp_dir, path.name, path.read_bytes())
+                stats = await service.process_document(upload, path.name, path.stem, True)
+                chunks += stats["chunk_count"]
+        results = {
+            "embeddings": "openai" if embeddings is None else "stub",
+            "chunks": chunks,
+            "questions": len(QUESTIONS),
+            "similarity": await evaluate(service, "similarity", args.top_k, args.repeats),
+            "hybrid": await evaluate(service, "hybrid", args.top_k, args.repeats)
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        for store in (service.vector_store, *service._partition_stores.values()):
+            await store.adelete_collection()
+        await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""
+Ingestion Benchmark
+Ingests a synthetic N-page document through RAGService.process_document with a
+stub embedder whose latency grows with batch size, comparing one unbatched
+embedding call (the previous behaviour) with the batched, concurrent pipeline.
+
+Run from Backend/:
+    python -m benchmarks.bench_ingestion --pages 1000 --batch-size 64 --concurrency 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import tempfile
+import time
+from app.core.config import settings
+from benchmarks.stubs import StubRAGService, prime_settings, spool, synthetic_text
+
+
+async def ingest(path: str, batch_size: int, concurrency: int, args) -> dict:
+    settings.INGEST_BATCH_SIZE = batch_size
+    settings.INGEST_CONCURRENCY = concurrency
+    service = StubRAGService(embed_latency=args.embed_latency, per_text_latency=args.per_text_latency)
+    updates = []
+
+    async def progress(done: int, total: int):
+        updates.append(done)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = await service.process_document(path, "synthetic.txt", "synthetic", False, progress=progress)
+    elapsed = time.perf_counter() - start
+    await service.close()
+    return {
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "chunks": stats["chunk_count"],
+        "wall_seconds": round(elapsed, 2),
+        "chunks_per_second": round(stats["chunk_count"] / elapsed, 1),
+        "embedding_calls": service.embeddings.underlying_embeddings.calls,
+        "progress_updates": len(updates)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--embed-latency", type=float, default=0.1)
+    parser.add_argument("--per-text-latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    prime_settings()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = spool(tmp_dir, "synthetic.txt", synthetic_text(args.pages))
+        results = {
+            "pages": args.pages,
+            "unbatched": await ingest(path, 10 ** 9, 1, args),
+            "batched": await ingest(path, args.batch_size, args.concurrency, args)
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Parsing Benchmark
+Ingests a corpus of synthetic PDFs concurrently while chat requests keep
+arriving, comparing inline parsing on the event loop (PARSER_PROCESSES=0, the
+previous behaviour) with the process pool. Reports ingestion wall time and
+chat latency percentiles measured during ingestion.
+
+Run from Backend/:
+    python -m benchmarks.bench_parsing --pdfs 8 --pages 200 --processes 2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import tempfile
+import time
+from app.core.config import settings
+from benchmarks.stubs import StubRAGService, prime_settings, load_policy_corpus, spool, synthetic_pdf
+
+QUERY = "How many days of casual leave do I get?"
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def chat_during(service: StubRAGService, stop: asyncio.Event, interval: float, latencies: list):
+    """
+    Send a chat every interval seconds until stop is set. Latency is measured
+    from when the chat was due, so time the event loop spent blocked counts.
+    """
+    tasks = []
+
+    async def timed_chat(i: int, due: float):
+        await service.chat(f"{QUERY} (#{i})")
+        latencies.append(time.perf_counter() - due)
+
+    start = time.perf_counter()
+    i = 0
+    while not stop.is_set():
+        due = start + i * interval
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        # Chats that fell due while the loop was blocked are sent now, late
+        while due <= time.perf_counter() and not stop.is_set():
+            tasks.append(asyncio.create_task(timed_chat(i, due)))
+            i += 1
+            due = start + i * interval
+    await asyncio.gather(*tasks)
+
+
+async def run(processes: int, corpus: list, args) -> dict:
+    settings.PARSER_PROCESSES = processes
+    service = StubRAGService(embed_latency=args.embed_latency, llm_latency=args.llm_latency)
+    service.answer_cache = None
+    load_policy_corpus(service)
+    if service.parser.executor is not None:
+        # Start the worker processes before timing, like a warmed-up server
+        await asyncio.gather(*(service.parser._run(len, "") for _ in range(processes)))
+
+    stop = asyncio.Event()
+    latencies = []
+    chats = asyncio.create_task(chat_during(service, stop, args.chat_interval, latencies))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(
+            service.process_document(path, f"policy-{i}.pdf", f"pdf-{i}", True)
+            for i, path in enumerate(corpus)
+        ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await chats
+    await service.close()
+    return {
+        "parser_processes": processes,
+        "chunks": sum(result["chunk_count"] for result in results),
+        "ingest_wall_seconds": round(elapsed, 2),
+        "chats": len(latencies),
+        "chat_p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "chat_p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "chat_max_ms": round(max(latencies) * 1000, 1)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pdfs", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=settings.PARSER_PROCESSES)
+    parser.add_argument("--chat-interval", type=float, default=0.1)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    prime_settings()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus = [spool(tmp_dir, f"policy-{i}.pdf", synthetic_pdf(args.pages, seed=i)) for i in range(args.pdfs)]
+        results = {
+            "pdfs": args.pdfs,
+            "pages_per_pdf": args.pages,
+            "inline": await run(0, corpus, args),
+            "process_pool": await run(args.processes, corpus, args)
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
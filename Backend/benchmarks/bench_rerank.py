@@ -0,0 +1,184 @@
+"""
+Rerank Benchmark
+Indexes Policy_files/ into a scratch PGVector collection and answers labelled
+policy questions through RAGService.chat, without and with the cross-encoder
+rerank stage (over-fetch, rescore, keep chunks above the score cutoff):
+chunks and prompt tokens sent to the LLM, retrieval and end-to-end latency,
+how often the right chunk reached the prompt and, with a real LLM, how often
+the answer contains the expected fact.
+
+Needs a reachable Postgres with pgvector at PGVECTOR_CONNECTION. Uses OpenAI
+embeddings and chat when OPENAI_API_KEY is set, otherwise stubs (the stub LLM
+takes longer the longer the prompt). Uses the fastembed cross-encoder
+(RERANK_MODEL) when it can be loaded, otherwise a lexical stand-in.
+
+Run from Backend/:
+    python -m benchmarks.bench_rerank --top-k 4 --fetch-k 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from langchain_core.runnables import RunnableLambda
+from app.core.config import settings
+from app.db.vector_store import ensure_text_search_index, ensure_vector_store
+from app.services.context_builder import token_counter
+from app.services.rag_service import RAGService
+from benchmarks.stubs import StubChatModel, StubCrossEncoder, StubEmbeddings, prime_settings, spool
+
+# (question, phrase the right chunk contains, term the answer must contain)
+QUESTIONS = [
+    ("How many days of casual leave do I get?", "12 days of casual leave", "12"),
+    ("How many days of sick leave do I get per year?", "10 days of sick leave", "10"),
+    ("Up to how many days of earned leave can be carried forward?", "maximum of 30 days", "30"),
+    ("Is a medical certificate needed for sick leave?", "medical certificate", "certificate"),
+    ("How many flexible holidays can I choose?", "2 flexible holidays", "2"),
+    ("On which date is the Gandhi Jayanti holiday?", "october 2", "october 2"),
+    ("What is the deadline for submitting reimbursement claims?", "within 30 days", "30"),
+    ("How quickly are approved reimbursement claims paid?", "15 working days", "15"),
+    ("Who is eligible for WFH?", "at least 3 months", "3 months"),
+    ("Whom do I tell about a conflict of interest?", "conflicts of interest", "hr"),
+    ("What can happen if I violate the code of conduct?", "termination", "termination"),
+    ("Are fines and penalties reimbursable?", "fines, penalties", "not"),
+]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class BenchRAGService(RAGService):
+    """RAGService whose LLM is a stub unless a real OpenAI key is configured"""
+
+    def __init__(self, stub_llm: bool, prompt_token_latency: float, **kwargs):
+        self.stub_llm = stub_llm
+        self.prompt_token_latency = prompt_token_latency
+        super().__init__(**kwargs)
+
+    def _initialize_llm(self, model_name: str = None, temperature: float = None, top_p: float = None):
+        if not self.stub_llm:
+            return super()._initialize_llm(model_name, temperature, top_p)
+        self.llm = StubChatModel(latency=0.3, prompt_token_latency=self.prompt_token_latency)
+
+
+async def evaluate(service: RAGService, label: str, overrides: dict, repeats: int, count_tokens) -> dict:
+    prime_settings(chunk_size=300, chunk_overlap=50, **overrides)
+    # The chat prompt rendered to text instead of being sent to the LLM
+    render_prompt = service._create_rag_chain(RunnableLambda(lambda prompt: prompt.to_string()))
+    chunks, prompt_tokens, retrieval, end_to_end = [], [], [], []
+    context_hits, answer_hits = 0, 0
+    for question, phrase, answer_term in QUESTIONS:
+        for _ in range(repeats):
+            with contextlib.redirect_stdout(io.StringIO()):
+                retriever = service._get_retriever(await service.get_settings())
+                start = time.perf_counter()
+                await retriever.ainvoke(question)
+                retrieval.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                answer, _ = await service.chat(question)
+                end_to_end.append(time.perf_counter() - start)
+        context, _ = await service._prepare_chat(question, await service.get_settings())
+        docs = context.docs
+        prompt = await render_prompt.ainvoke({"context": context.text, "question": question})
+        chunks.append(len(docs))
+        prompt_tokens.append(count_tokens(prompt))
+        context_hits += any(phrase in normalize(doc.page_content) for doc in docs)
+        answer_hits += answer_term in normalize(answer)
+    retrieval.sort()
+    end_to_end.sort()
+    result = {
+        "config": label,
+        "chunks_in_prompt": round(statistics.fmean(chunks), 2),
+        "prompt_tokens": round(statistics.fmean(prompt_tokens), 1),
+        "retrieval_p50_ms": round(statistics.median(retrieval) * 1000, 2),
+        "end_to_end_p50_ms": round(statistics.median(end_to_end) * 1000, 2),
+        "end_to_end_p95_ms": round(end_to_end[int(0.95 * (len(end_to_end) - 1))] * 1000, 2),
+        "context_hit_rate": round(context_hits / len(QUESTIONS), 3)
+    }
+    if not service.stub_llm:
+        result["answer_hit_rate"] = round(answer_hits / len(QUESTIONS), 3)
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20, help="candidates over-fetched for the reranker")
+    parser.add_argument("--min-scores", default="0.0,0.1,0.5", help="rerank score cutoffs to compare")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0005,
+                        help="stub LLM seconds per prompt token (prefill cost)")
+    parser.add_argument("--stub-pair-latency", type=float, default=0.002,
+                        help="stand-in cross-encoder seconds per (query, chunk) pair")
+    parser.add_argument("--collection", default="bench_rerank")
+    args = parser.parse_args()
+
+    settings.PGVECTOR_COLLECTION = args.collection
+    # Every question must reach retrieval and the LLM
+    settings.ANSWER_CACHE_ENABLED = False
+    stub = not settings.OPENAI_API_KEY
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "unused"
+    service = BenchRAGService(
+        stub_llm=stub,
+        prompt_token_latency=args.prompt_token_latency,
+        embeddings=StubEmbeddings(latency=0.0, size=settings.EMBEDDING_DIMENSIONS) if stub else None
+    )
+    # No MongoDB in benchmarks: chunk embeddings are not cached across uploads
+    service.embeddings.document_store = None
+    reranker = "fastembed"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await service.reranker._get_model()
+    except Exception as e:
+        print(f"Cross-encoder {settings.RERANK_MODEL} unavailable ({type(e).__name__}), using the lexical stand-in")
+        service.reranker._model = StubCrossEncoder(pair_latency=args.stub_pair_latency)
+        reranker = "stub"
+    prime_settings(chunk_size=300, chunk_overlap=50)
+
+    policy_dir = Path(__file__).resolve().parents[2] / "Policy_files"
+    try:
+        await ensure_vector_store(service.vector_store)
+        await ensure_text_search_index(service.engine)
+        chunks = 0
+        with tempfile.TemporaryDirectory() as tmp_dir, contextlib.redirect_stdout(io.StringIO()):
+            for path in sorted(policy_dir.glob("*.txt")):
+                upload = spool(tmp_dir, path.name, path.read_bytes())
+                stats = await service.process_document(upload, path.name, path.stem, True)
+                chunks += stats["chunk_count"]
+        count_tokens = token_counter(service.llm.model_name)
+        runs = [await evaluate(service, f"top_k={args.top_k}", {"top_k": args.top_k}, args.repeats, count_tokens)]
+        for min_score in (float(value) for value in args.min_scores.split(",") if value):
+            runs.append(await evaluate(
+                service,
+                f"rerank fetch_k={args.fetch_k} top_k<={args.top_k} min_score={min_score}",
+                {
+                    "top_k": args.top_k,
+                    "rerank_enabled": True,
+                    "rerank_fetch_k": args.fetch_k,
+                    "rerank_min_score": min_score
+                },
+                args.repeats,
+                count_tokens
+            ))
+        results = {
+            "embeddings": "stub" if stub else "openai",
+            "llm": "stub" if stub else "openai",
+            "reranker": reranker,
+            "chunks": chunks,
+            "questions": len(QUESTIONS),
+            "runs": runs
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        for store in (service.vector_store, *service._partition_stores.values()):
+            await store.adelete_collection()
+        await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
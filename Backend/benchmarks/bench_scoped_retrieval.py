@@ -0,0 +1,189 @@
+"""
+Scoped Retrieval Benchmark
+Loads one user's documents (including a target document) into their
+partition, company-policy documents into the shared partition, and a growing
+number of other users' chunks into their own partitions, all in a scratch
+database. Then measures the retriever for that user's chat scopes (target
+document, company policy only, everything the user may see), for similarity
+and hybrid search: p50/p99 latency, whether every result is in scope and
+whether a full top_k came back.
+
+Needs a reachable Postgres with pgvector at PGVECTOR_CONNECTION, as a role
+that may create databases.
+
+Run from Backend/:
+    python -m benchmarks.bench_scoped_retrieval --sizes 0,20000,100000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+import uuid
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.config import settings
+from app.db.vector_store import COLLECTION_TABLE, EMBEDDING_TABLE, partition_collection
+from app.services.rag_service import RAGService
+from benchmarks.stubs import StubEmbeddings, prime_settings
+
+DATABASE = "bench_scoped_retrieval"
+USER_ID = "bench-user"
+TARGET_DOCUMENT = "target-document"
+OTHER_USERS = 100
+VOCABULARY = [f"term{i}" for i in range(20000)]
+
+
+def chunk(document_id: str, is_company_policy: bool = False) -> dict:
+    return {"document_id": document_id, "filename": f"{document_id}.pdf", "is_company_policy": is_company_policy}
+
+
+async def copy_chunks(service: RAGService, rng: np.random.Generator, count: int, dims: int, chunk_for):
+    """COPY count random chunks; chunk_for(i) gives each chunk's (uploaded_by, metadata)"""
+    collection_ids = {}
+    for i in range(count):
+        uploaded_by, metadata = chunk_for(i)
+        name = partition_collection(settings.PGVECTOR_COLLECTION, metadata["is_company_policy"], uploaded_by)
+        if name not in collection_ids:
+            await service._partition_store(name)
+            async with service.engine.connect() as conn:
+                collection_ids[name] = (await conn.execute(
+                    text(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :name"), {"name": name}
+                )).scalar()
+    async with service.engine.begin() as conn:
+        raw = await conn.get_raw_connection()
+        async with raw.driver_connection.cursor() as cursor:
+            async with cursor.copy(
+                f"COPY {EMBEDDING_TABLE} (id, collection_id, embedding, document, cmetadata) FROM STDIN"
+            ) as copy:
+                for start in range(0, count, 10_000):
+                    size = min(10_000, count - start)
+                    vectors = rng.uniform(-1.0, 1.0, (size, dims))
+                    words = rng.integers(0, len(VOCABULARY), (size, 40))
+                    rows = []
+                    for i, (vector, row) in enumerate(zip(vectors, words)):
+                        uploaded_by, metadata = chunk_for(start + i)
+                        name = partition_collection(
+                            settings.PGVECTOR_COLLECTION, metadata["is_company_policy"], uploaded_by
+                        )
+                        rows.append(
+                            f"{uuid.uuid4()}\t{collection_ids[name]}\t"
+                            f"[{','.join(f'{value:.5f}' for value in vector)}]\t"
+                            f"{' '.join(VOCABULARY[w] for w in row)}\t"
+                            f"{json.dumps(metadata)}\n"
+                        )
+                    await copy.write("".join(rows))
+
+
+async def measure(retriever, search_kwargs: dict, queries: list, in_scope, top_k: int) -> dict:
+    latencies, in_scope_results, full, results = [], 0, 0, 0
+    for query in queries:
+        start = time.perf_counter()
+        docs = await retriever.ainvoke(query, **search_kwargs)
+        latencies.append(time.perf_counter() - start)
+        results += len(docs)
+        in_scope_results += sum(in_scope(doc.metadata) for doc in docs)
+        full += len(docs) == top_k
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 2),
+        "in_scope": round(in_scope_results / max(results, 1), 3),
+        "full_top_k": round(full / len(queries), 3)
+    }
+
+
+async def bench_scopes(service: RAGService, queries: list, top_k: int) -> dict:
+    own_documents = lambda metadata: metadata["document_id"].startswith("own-") \
+        or metadata["document_id"] == TARGET_DOCUMENT
+    scopes = {
+        "document": (
+            # As resolved for a document of USER_ID (its record lives in MongoDB, not used here)
+            {"filter": {"document_id": TARGET_DOCUMENT}, "partitions": service._document_search_partitions(USER_ID)},
+            lambda metadata: metadata["document_id"] == TARGET_DOCUMENT
+        ),
+        "company_policy": (
+            await service._search_kwargs(use_company_policy=True, user_id=USER_ID),
+            lambda metadata: metadata["is_company_policy"]
+        ),
+        "user": (
+            await service._search_kwargs(user_id=USER_ID),
+            lambda metadata: metadata["is_company_policy"] or own_documents(metadata)
+        )
+    }
+    results = {}
+    for scope, (search_kwargs, in_scope) in scopes.items():
+        runs = {}
+        for search_type in ("similarity", "hybrid"):
+            rag_settings = dict(await service.get_settings(), search_type=search_type)
+            with contextlib.redirect_stdout(io.StringIO()):
+                retriever = service._get_retriever(rag_settings)
+            runs[search_type] = await measure(retriever, search_kwargs, queries, in_scope, top_k)
+        results[scope] = runs
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="0,20000,100000", help="other users' chunks loaded before each run")
+    parser.add_argument("--dims", type=int, default=128)
+    parser.add_argument("--target-chunks", type=int, default=200)
+    parser.add_argument("--own-chunks", type=int, default=800, help="the user's chunks in other documents")
+    parser.add_argument("--policy-chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=4)
+    args = parser.parse_args()
+
+    admin = create_async_engine(settings.PGVECTOR_CONNECTION, isolation_level="AUTOCOMMIT")
+    async with admin.connect() as conn:
+        await conn.execute(text(f"DROP DATABASE IF EXISTS {DATABASE}"))
+        await conn.execute(text(f"CREATE DATABASE {DATABASE}"))
+
+    url = make_url(settings.PGVECTOR_CONNECTION).set(database=DATABASE)
+    settings.PGVECTOR_CONNECTION = url.render_as_string(hide_password=False)
+    settings.PGVECTOR_COLLECTION = "bench_scoped_retrieval"
+    settings.EMBEDDING_DIMENSIONS = args.dims
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "unused"
+    service = RAGService(embeddings=StubEmbeddings(latency=0.0, size=args.dims))
+    prime_settings(top_k=args.top_k)
+    rng = np.random.default_rng(0)
+    queries = [
+        " ".join(VOCABULARY[w] for w in rng.integers(0, len(VOCABULARY), 5))
+        for _ in range(args.queries)
+    ]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await service.ensure_vector_indexes()
+            await copy_chunks(service, rng, args.target_chunks, args.dims, lambda i: (USER_ID, chunk(TARGET_DOCUMENT)))
+            await copy_chunks(service, rng, args.own_chunks, args.dims, lambda i: (USER_ID, chunk(f"own-{i % 4}")))
+            await copy_chunks(service, rng, args.policy_chunks, args.dims, lambda i: (None, chunk(f"policy-{i % 20}", True)))
+        visible = args.target_chunks + args.own_chunks + args.policy_chunks
+        results = {"dims": args.dims, "top_k": args.top_k, "queries": args.queries, "runs": []}
+        loaded = 0
+        for size in sorted(int(value) for value in args.sizes.split(",") if value):
+            with contextlib.redirect_stdout(io.StringIO()):
+                await copy_chunks(service, rng, size - loaded, args.dims, lambda i: (
+                    f"other-user-{i % OTHER_USERS}", chunk(f"other-{i % (OTHER_USERS * 10)}")
+                ))
+            loaded = size
+            async with service.engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text(f"VACUUM ANALYZE {EMBEDDING_TABLE}"))
+            run = {"other_users_chunks": size, "visible_chunks": visible}
+            run.update(await bench_scopes(service, queries, args.top_k))
+            results["runs"].append(run)
+            print(json.dumps(run), flush=True)
+        print(json.dumps(results, indent=2))
+    finally:
+        await service.close()
+        async with admin.connect() as conn:
+            await conn.execute(text(f"DROP DATABASE IF EXISTS {DATABASE}"))
+        await admin.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+"""
+Vector Index Benchmark
+Loads N synthetic clustered unit vectors into a scratch pgvector table and
+compares exact search (sequential scan) with HNSW and IVFFlat indexes built
+by app.db.vector_store.ensure_ann_index: build time, recall@k against exact
+results, and p50/p99 query latency for several ef_search / probes values
+(applied through VectorSearchParams, like the chat path).
+
+Needs a reachable Postgres with pgvector at PGVECTOR_CONNECTION.
+
+Run from Backend/:
+    python -m benchmarks.bench_vector_index --sizes 10000,100000,1000000 --dims 128
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.config import settings
+from app.db.vector_store import VectorSearchParams, ensure_ann_index
+
+TABLE = "bench_vector_index"
+
+
+def synthetic_vectors(rng: np.random.Generator, centers: np.ndarray, count: int, spread: float) -> np.ndarray:
+    """Unit vectors scattered around random cluster centers (embeddings are clustered, not uniform)"""
+    labels = rng.integers(0, len(centers), count)
+    vectors = centers[labels] + rng.normal(0.0, spread, (count, centers.shape[1])).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def vector_literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{value:.6f}" for value in vector) + "]"
+
+
+async def load(engine, size: int, args, rng: np.random.Generator, centers: np.ndarray) -> np.ndarray:
+    """(Re)create the table and COPY size vectors into it, returning them"""
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await conn.execute(text(f"CREATE TABLE {TABLE} (id bigint PRIMARY KEY, embedding vector({args.dims}))"))
+    batches = []
+    async with engine.begin() as conn:
+        raw = await conn.get_raw_connection()
+        async with raw.driver_connection.cursor() as cursor:
+            async with cursor.copy(f"COPY {TABLE} (id, embedding) FROM STDIN") as copy:
+                for start in range(0, size, 50_000):
+                    batch = synthetic_vectors(rng, centers, min(50_000, size - start), args.spread)
+                    batches.append(batch)
+                    await copy.write("".join(
+                        f"{start + i}\t{vector_literal(vector)}\n" for i, vector in enumerate(batch)
+                    ))
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"VACUUM ANALYZE {TABLE}"))
+    return np.concatenate(batches)
+
+
+def exact_neighbours(data: np.ndarray, queries: np.ndarray, k: int) -> list:
+    """Ground truth by brute force (vectors are unit length, so cosine order = dot product order)"""
+    neighbours = []
+    for query in queries:
+        scores = data @ query
+        top = np.argpartition(-scores, k)[:k]
+        neighbours.append(set(top.tolist()))
+    return neighbours
+
+
+async def run_queries(engine, queries: np.ndarray, k: int, truth: list, exact: bool = False) -> dict:
+    query_sql = text(f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k")
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        literal = vector_literal(query)
+        async with engine.connect() as conn:
+            if exact:
+                await conn.execute(text("SET LOCAL enable_indexscan = off"))
+            start = time.perf_counter()
+            ids = {row[0] for row in await conn.execute(query_sql, {"q": literal, "k": k})}
+            latencies.append(time.perf_counter() - start)
+        recalls.append(len(ids & expected) / k)
+    latencies.sort()
+    return {
+        f"recall_at_{k}": round(statistics.fmean(recalls), 4),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 2)
+    }
+
+
+async def bench_size(engine, search_params: VectorSearchParams, size: int, args) -> dict:
+    rng = np.random.default_rng(size)
+    centers = rng.normal(0.0, 1.0, (args.clusters, args.dims)).astype(np.float32)
+    start = time.perf_counter()
+    data = await load(engine, size, args, rng, centers)
+    result = {"vectors": size, "load_seconds": round(time.perf_counter() - start, 1)}
+    queries = synthetic_vectors(rng, centers, args.queries, args.spread)
+    truth = exact_neighbours(data, queries, args.k)
+    del data
+
+    result["exact"] = await run_queries(engine, queries, args.k, truth, exact=True)
+    for index_type, knob, values in (
+        ("hnsw", "ef_search", args.ef_search),
+        ("ivfflat", "probes", args.probes)
+    ):
+        lists = max(1, int(size ** 0.5)) if args.ivfflat_lists is None else args.ivfflat_lists
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await ensure_ann_index(
+                engine,
+                index_type,
+                table=TABLE,
+                hnsw_m=args.hnsw_m,
+                hnsw_ef_construction=args.hnsw_ef_construction,
+                ivfflat_lists=lists,
+                maintenance_work_mem=args.maintenance_work_mem,
+                company_policy_index=False
+            )
+        runs = {"build_seconds": round(time.perf_counter() - start, 1)}
+        if index_type == "ivfflat":
+            runs["lists"] = lists
+        for value in values:
+            search_params.update(
+                ef_search=value if index_type == "hnsw" else settings.HNSW_EF_SEARCH,
+                probes=value if index_type == "ivfflat" else settings.IVFFLAT_PROBES
+            )
+            runs[f"{knob}={value}"] = await run_queries(engine, queries, args.k, truth)
+        result[index_type] = runs
+    return result
+
+
+def int_list(value: str) -> list:
+    return [int(item) for item in value.split(",") if item]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int_list, default=[10_000, 100_000])
+    parser.add_argument("--dims", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--spread", type=float, default=1.0, help="noise around cluster centers (1.0 = center scale)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int_list, default=[20, 40, 100, 200])
+    parser.add_argument("--probes", type=int_list, default=[1, 10, 30])
+    parser.add_argument("--hnsw-m", type=int, default=settings.HNSW_M)
+    parser.add_argument("--hnsw-ef-construction", type=int, default=settings.HNSW_EF_CONSTRUCTION)
+    parser.add_argument("--ivfflat-lists", type=int, default=None, help="default: sqrt(vectors)")
+    parser.add_argument("--maintenance-work-mem", default="1GB")
+    args = parser.parse_args()
+
+    engine = create_async_engine(settings.PGVECTOR_CONNECTION, pool_size=1)
+    search_params = VectorSearchParams(engine)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        results = {"dims": args.dims, "k": args.k, "queries": args.queries, "runs": []}
+        for size in args.sizes:
+            results["runs"].append(await bench_size(engine, search_params, size, args))
+        print(json.dumps(results, indent=2))
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
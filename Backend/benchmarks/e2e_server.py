@@ -0,0 +1,113 @@
+"""
+End-to-end Benchmark Server
+Runs the FastAPI app under uvicorn for bench_e2e, seeding a benchmark user
+and a company-policy corpus (through the real ingestion path) at startup.
+With --mongomock the app runs on mongomock-motor instead of MongoDB; like a
+standalone server it has no change streams, and it has no GridFS, so only
+chat works there.
+
+Started by bench_e2e with the settings in its environment; by hand, from Backend/:
+    python -m benchmarks.e2e_server --port 8000 --user-id 65f000000000000000000001
+"""
+import argparse
+import logging
+import tempfile
+import time
+from datetime import datetime
+from bson import ObjectId
+import uvicorn
+from app.db import session
+
+logger = logging.getLogger(__name__)
+
+SEED_CORPUS = 0
+
+
+def use_mongomock():
+    """Point connect_to_mongo at an in-memory mongomock-motor client"""
+    from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+    from pymongo.errors import OperationFailure
+
+    def no_change_streams(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets")
+
+    AsyncMongoMockCollection.watch = no_change_streams
+    session.AsyncIOMotorClient = lambda uri, **kwargs: AsyncMongoMockClient()
+
+
+async def seed(user_id: str, copies: int, pages: int):
+    """Create the benchmark user and index `copies` copies of Policy_files as company policy"""
+    from app.services.corpus_state import corpus_state
+    from app.services.rag_service import get_rag_service
+    from benchmarks.stubs import scaled_policy_files, spool
+
+    db = session.get_database()
+    await db.users.update_one(
+        {"_id": ObjectId(user_id)},
+        {"$setOnInsert": {
+            "email": "bench@example.com",
+            "username": "bench",
+            "hashed_password": "",
+            "is_active": True,
+            "is_superuser": True,
+            "created_at": datetime.utcnow(),
+            "updated_at": None
+        }},
+        upsert=True
+    )
+    if not copies:
+        return
+
+    start = time.perf_counter()
+    rag_service = get_rag_service()
+    chunks = 0
+    with tempfile.TemporaryDirectory(prefix="bench-seed-") as tmp_dir:
+        for filename, text in scaled_policy_files(copies, pages, seed=SEED_CORPUS):
+            result = await db.documents.insert_one({
+                "filename": filename,
+                "original_filename": filename,
+                "file_type": "txt",
+                "file_size": len(text.encode()),
+                "is_company_policy": True,
+                "uploaded_by": user_id,
+                "status": "processing",
+                "created_at": datetime.utcnow(),
+                "updated_at": None
+            })
+            document_id = str(result.inserted_id)
+            stats = await rag_service.process_document(
+                spool(tmp_dir, filename, text), filename, document_id, True, uploaded_by=user_id
+            )
+            chunks += stats["chunk_count"]
+            await db.documents.update_one(
+                {"_id": result.inserted_id},
+                {"$set": {"status": "completed", "updated_at": datetime.utcnow(), **stats}}
+            )
+    await corpus_state.bump()
+    logger.info("Seeded %d chunks in %.1fs", chunks, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mongomock", action="store_true", help="run on mongomock-motor instead of MONGODB_URI")
+    parser.add_argument("--user-id", required=True, help="ObjectId of the benchmark user")
+    parser.add_argument("--seed-copies", type=int, default=1, help="copies of Policy_files indexed at startup")
+    parser.add_argument("--seed-pages", type=int, default=4, help="synthetic pages added to every seeded copy")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        use_mongomock()
+    from app.main import app
+
+    @app.on_event("startup")
+    async def seed_benchmark_data():
+        # Registered after the app's own startup handler, so MongoDB and the RAG service are up
+        await seed(args.user_id, args.seed_copies, args.seed_pages)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Fake OpenAI Server
+OpenAI-compatible /v1/embeddings and /v1/chat/completions for end-to-end
+benchmarks: hash-seeded embeddings (the same input always gets the same
+vector, token arrays included) and a canned answer, streamed or not, with
+configurable latencies. Point the app at it with OPENAI_BASE_URL.
+
+Run from Backend/:
+    python -m benchmarks.fake_openai --port 8001 --llm-latency 0.3 --token-latency 0.01
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import time
+import uuid
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = (
+    "According to the company policy, employees are entitled to 24 days of paid leave per year, "
+    "requested through the HR portal at least two weeks in advance and approved by their manager."
+)
+
+
+def create_app(
+    dims: int = 1536,
+    embed_latency: float = 0.05,
+    embed_input_latency: float = 0.0,
+    llm_latency: float = 0.5,
+    token_latency: float = 0.02,
+    answer: str = ANSWER
+) -> FastAPI:
+    """
+    embed_latency per embeddings request plus embed_input_latency per input;
+    llm_latency to the first token, then token_latency per answer word
+    """
+    app = FastAPI(title="Fake OpenAI")
+    words = answer.split(" ")
+    tokens = [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def vector(value, size: int) -> np.ndarray:
+        key = value if isinstance(value, str) else json.dumps(value)
+        seed = int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big")
+        values = np.random.default_rng(seed).standard_normal(size).astype(np.float32)
+        return values / np.linalg.norm(values)
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"]
+        # A string, a token array, or a list of either
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        await asyncio.sleep(embed_latency + embed_input_latency * len(inputs))
+        size = body.get("dimensions") or dims
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for index, value in enumerate(inputs):
+            values = vector(value, size)
+            embedding = base64.b64encode(values.tobytes()).decode() if as_base64 else values.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        prompt_tokens = sum(len(value) // 4 if isinstance(value, str) else len(value) for value in inputs)
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}
+        })
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "gpt-3.5-turbo")
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in body["messages"]) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens)
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(llm_latency + token_latency * len(tokens))
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        def chunk(choices: list, **extra) -> str:
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": model, "choices": choices, **extra
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            await asyncio.sleep(llm_latency)
+            yield chunk([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+            for token in tokens:
+                if token_latency:
+                    await asyncio.sleep(token_latency)
+                yield chunk([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+            yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield chunk([], usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--dims", type=int, default=1536, help="embedding size unless the request sets dimensions")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embeddings request")
+    parser.add_argument("--embed-input-latency", type=float, default=0.0, help="extra seconds per embedded input")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds to the first answer token")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="seconds per answer token")
+    args = parser.parse_args()
+
+    app = create_app(args.dims, args.embed_latency, args.embed_input_latency, args.llm_latency, args.token_latency)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
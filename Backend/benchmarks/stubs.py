@@ -0,0 +1,315 @@
+"""
+Benchmark Stubs
+Deterministic local stand-ins for OpenAI embeddings and chat completions
+"""
+import asyncio
+import hashlib
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.vectorstores import InMemoryVectorStore
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from app.services.rag_service import RAGService
+from app.services.settings_cache import rag_settings_cache, default_rag_settings
+
+
+class StubEmbeddings(Embeddings):
+    """Hash-seeded vectors; each call takes latency + per_text_latency * len(texts)"""
+
+    def __init__(self, latency: float = 0.05, size: int = 256, per_text_latency: float = 0.0):
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.size = size
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+        # numpy keeps the stub's own CPU cost negligible next to the code under test
+        return np.random.default_rng(seed).uniform(-1.0, 1.0, self.size).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        time.sleep(self.latency + self.per_text_latency * len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        await asyncio.sleep(self.latency + self.per_text_latency * len(texts))
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Returns a canned answer: `latency` seconds plus `prompt_token_latency`
+    per prompt token (~4 characters) to the first token, then `token_latency`
+    seconds per word.
+    """
+
+    model_name: str = "stub-chat"
+    temperature: float = 0.7
+    top_p: float = 1.0
+    latency: float = 0.5
+    prompt_token_latency: float = 0.0
+    token_latency: float = 0.0
+    answer: str = "Employees are entitled to 24 days of paid leave per year."
+    calls: int = 0
+
+    def _first_token_latency(self, messages: List[BaseMessage]) -> float:
+        prompt_tokens = sum(len(str(message.content)) for message in messages) / 4
+        return self.latency + self.prompt_token_latency * prompt_tokens
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        self.calls += 1
+        time.sleep(self._first_token_latency(messages) + self.token_latency * len(self.answer.split()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self._first_token_latency(messages) + self.token_latency * len(self.answer.split()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        await asyncio.sleep(self._first_token_latency(messages))
+        for i, word in enumerate(self.answer.split()):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else f" {word}"))
+
+
+class StubCrossEncoder:
+    """
+    Lexical stand-in for a fastembed cross-encoder: the logit grows with the
+    share of query words found in the chunk. Each call takes pair_latency
+    seconds per (query, chunk) pair.
+    """
+
+    STOPWORDS = {"the", "and", "for", "are", "can", "how", "what", "who", "whom", "when", "does", "get", "many", "much"}
+
+    def __init__(self, pair_latency: float = 0.0):
+        self.pair_latency = pair_latency
+        self.pairs = 0
+
+    def _words(self, text: str) -> set:
+        words = {word.strip(".,?!()'\"").lower() for word in text.split()}
+        return {word for word in words if len(word) > 2 and word not in self.STOPWORDS}
+
+    def rerank(self, query: str, documents: List[str], batch_size: int = 32) -> List[float]:
+        self.pairs += len(documents)
+        time.sleep(self.pair_latency * len(documents))
+        query_words = self._words(query)
+        return [
+            8.0 * len(query_words & self._words(document)) / max(len(query_words), 1) - 4.0
+            for document in documents
+        ]
+
+
+class CountingVectorStore(InMemoryVectorStore):
+    """In-memory vector store that counts similarity queries"""
+
+    def __init__(self, embedding: Embeddings):
+        super().__init__(embedding)
+        self.queries = 0
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        self.queries += 1
+        return super().similarity_search(query, k=k, **kwargs)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        self.queries += 1
+        return await super().asimilarity_search(query, k=k, **kwargs)
+
+    async def aadd_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        """Same signature as PGVector.aadd_embeddings"""
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        for id_, text, vector, metadata in zip(ids, texts, embeddings, metadatas):
+            self.store[id_] = {"id": id_, "vector": vector, "text": text, "metadata": metadata}
+        return ids
+
+
+class StubRAGService(RAGService):
+    """RAGService wired to stub embeddings, an in-memory store and a stub LLM"""
+
+    def __init__(
+        self,
+        embed_latency: float = 0.05,
+        llm_latency: float = 0.5,
+        token_latency: float = 0.0,
+        per_text_latency: float = 0.0,
+        prompt_token_latency: float = 0.0
+    ):
+        self.llm_latency = llm_latency
+        self.token_latency = token_latency
+        self.prompt_token_latency = prompt_token_latency
+        embeddings = StubEmbeddings(latency=embed_latency, per_text_latency=per_text_latency)
+        super().__init__(embeddings=embeddings, vector_store=CountingVectorStore(embeddings))
+        # Query through the cache-wrapped embeddings like PGVector does in production
+        self.vector_store.embedding = self.embeddings
+        # No MongoDB in benchmarks: chunk embeddings are not cached across uploads
+        self.embeddings.document_store = None
+
+    def _initialize_llm(self, model_name: str = None, temperature: float = None, top_p: float = None):
+        self.llm = StubChatModel(
+            model_name=model_name or "stub-chat",
+            temperature=temperature if temperature is not None else 0.7,
+            top_p=top_p if top_p is not None else 1.0,
+            latency=self.llm_latency,
+            prompt_token_latency=self.prompt_token_latency,
+            token_latency=self.token_latency
+        )
+
+
+def prime_settings(**overrides):
+    """Serve RAG settings from memory so benchmarks need no MongoDB"""
+    rag_settings = default_rag_settings()
+    rag_settings.update(overrides)
+    rag_settings_cache.ttl_seconds = float("inf")
+    rag_settings_cache._settings = None
+    rag_settings_cache.update(rag_settings)
+
+
+def load_policy_corpus(service: RAGService, repeat: int = 1, chunk_size: int = 1000, chunk_overlap: int = 200) -> int:
+    """Add Policy_files/*.txt to the service's vector store, return chunk count"""
+    policy_dir = Path(__file__).resolve().parents[2] / "Policy_files"
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    docs = []
+    for copy in range(repeat):
+        for path in sorted(policy_dir.glob("*.txt")):
+            document_id = f"{path.stem}-{copy}"
+            docs.append(Document(
+                page_content=path.read_text(encoding="utf-8"),
+                metadata={"document_id": document_id, "filename": path.name, "is_company_policy": True}
+            ))
+    splits = splitter.split_documents(docs)
+    service.vector_store.add_documents(splits)
+    return len(splits)
+
+
+def scaled_policy_files(copies: int, pages: int = 4, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    (filename, text) for every Policy_files/*.txt, `copies` times, each copy
+    followed by `pages` pages of its own synthetic_text so copies embed as new chunks
+    """
+    policy_dir = Path(__file__).resolve().parents[2] / "Policy_files"
+    files = []
+    for copy in range(copies):
+        for index, path in enumerate(sorted(policy_dir.glob("*.txt"))):
+            padding = synthetic_text(pages, seed=seed + copy * 1000 + index) if pages else ""
+            text = path.read_text(encoding="utf-8") + "\n\n" + padding
+            files.append((f"{path.stem}_{seed + copy}.txt", text))
+    return files
+
+
+WORDS = (
+    "leave policy employee manager approval casual sick annual holiday reimbursement "
+    "travel expense claim form submit days notice remote work office hours conduct "
+    "security device laptop allowance receipt payroll benefit quarter year month"
+).split()
+
+
+def synthetic_text(pages: int, chars_per_page: int = 2500, seed: int = 7) -> str:
+    """Deterministic policy-like text, one form feed separated block per page"""
+    rng = random.Random(seed)
+    page_texts = []
+    for page in range(pages):
+        words = []
+        length = 0
+        while length < chars_per_page:
+            word = rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+            if rng.random() < 0.08:
+                words[-1] += "."
+        page_texts.append(f"Page {page + 1}\n" + " ".join(words))
+    return "\n\n".join(page_texts)
+
+
+def spool(directory: str, filename: str, content) -> str:
+    """Write an upload to directory like the worker does, returning its path"""
+    path = Path(directory) / filename
+    if isinstance(content, str):
+        path.write_text(content, encoding="utf-8")
+    else:
+        path.write_bytes(content)
+    return str(path)
+
+
+def synthetic_pdf(pages: int, chars_per_page: int = 2500, seed: int = 7) -> bytes:
+    """Minimal text PDF with synthetic_text pages (no PDF library needed)"""
+    page_texts = synthetic_text(pages, chars_per_page, seed).split("\n\n")
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for text in page_texts:
+        words, lines, line = text.split(), [], ""
+        for word in words:
+            if len(line) + len(word) > 90:
+                lines.append(line)
+                line = ""
+            line += word + " "
+        lines.append(line)
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode())
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>".encode()
+        )
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
@@ -0,0 +1,59 @@
+"""
+Retrieval happens once per chat: one query embedding and one vector search,
+whether the chat is answered whole or streamed, alone or alongside others.
+Runs against the benchmark stubs, so it needs no OpenAI, MongoDB or Postgres.
+"""
+import asyncio
+import pytest
+from benchmarks.stubs import StubRAGService, prime_settings, load_policy_corpus
+
+QUERY = "How many days of casual leave do I get?"
+
+
+@pytest.fixture
+def service():
+    prime_settings()
+    service = StubRAGService(embed_latency=0.0, llm_latency=0.0)
+    load_policy_corpus(service)
+    yield service
+    asyncio.run(service.close())
+
+
+def calls(service: StubRAGService) -> tuple:
+    return service.embeddings.underlying_embeddings.calls, service.vector_store.queries
+
+
+async def stream(service: StubRAGService, query: str) -> str:
+    return "".join([data async for event, data in service.chat_stream(query) if event == "token"])
+
+
+def test_chat_embeds_and_searches_once(service):
+    before = calls(service)
+    answer, sources = asyncio.run(service.chat(QUERY))
+    assert not answer.startswith("Error")
+    assert sources
+    embedding_calls, vector_queries = calls(service)
+    assert embedding_calls - before[0] == 1
+    assert vector_queries - before[1] == 1
+
+
+def test_chat_stream_embeds_and_searches_once(service):
+    before = calls(service)
+    assert asyncio.run(stream(service, QUERY))
+    embedding_calls, vector_queries = calls(service)
+    assert embedding_calls - before[0] == 1
+    assert vector_queries - before[1] == 1
+
+
+def test_concurrent_chats_embed_and_search_once_each(service):
+    requests = 20
+
+    async def spike():
+        # Distinct questions, so neither coalescing nor the caches share work between them
+        await asyncio.gather(*(service.chat(f"{QUERY} (#{i})") for i in range(requests)))
+
+    before = calls(service)
+    asyncio.run(spike())
+    embedding_calls, vector_queries = calls(service)
+    assert embedding_calls - before[0] == requests
+    assert vector_queries - before[1] == requests